@@ -0,0 +1,183 @@
+"""
+Analytics - buffered recipe_analytics events, written in batches with a daily ingredient rollup
+"""
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from saved_recipes import is_duplicate_key, write_errors_by_index
+
+EVENTS_COLLECTION = "recipe_analytics"
+ROLLUP_COLLECTION = "ingredient_rollups"
+
+# Indexes created at startup: (collection, keys, options). The event indexes match deploy/mongo-init.js
+ANALYTICS_INDEXES = [
+    (EVENTS_COLLECTION, [("timestamp", -1)], {"name": "timestamp_-1"}),
+    (EVENTS_COLLECTION, [("recipe_id", 1)], {"name": "recipe_id_1"}),
+    (EVENTS_COLLECTION, [("user_id", 1)], {"name": "user_id_1"}),
+    (ROLLUP_COLLECTION, [("day", -1), ("queries", -1)], {"name": "day_-1_queries_-1"}),
+    (ROLLUP_COLLECTION, [("ingredient", 1), ("day", -1)], {"name": "ingredient_1_day_-1"}),
+]
+
+def pantry_ingredients(ingredients_input: str) -> List[str]:
+    """Distinct lower-cased ingredients of a comma-separated pantry, in input order"""
+    return list(dict.fromkeys(ing.strip().lower() for ing in ingredients_input.split(",") if ing.strip()))
+
+class AnalyticsBuffer:
+    """Bounded in-memory queue of analytics events, flushed to Mongo by a background task.
+
+    Request handlers call record_* without awaiting anything. The flusher writes a batch
+    with one unordered insert_many once batch_size events are queued or flush_interval
+    seconds have passed, and folds the batch into per-day ingredient counters with one
+    bulk upsert. While Mongo is slow or down the queue fills up, and once it holds max_size
+    events new ones are dropped and counted rather than slowing requests down. Events that
+    fail to insert are dropped too: analytics are best effort. A rollup that fails after its
+    events were inserted is counted separately, as the events themselves were written.
+
+    Events get their _id before the first insert attempt, so a batch put back on the queue
+    by a cancelled flush is retried without duplicating whatever had already been inserted.
+    """
+
+    def __init__(self, get_database: Callable[[], Any], max_size: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 1.0):
+        self.get_database = get_database
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: deque = deque()
+        self._wake: Optional[asyncio.Event] = None
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.rollup_failed = 0
+        self.flushes = 0
+
+    def record(self, event: Dict[str, Any]) -> bool:
+        """Queue an event; returns False (and counts a drop) when the buffer is full"""
+        if len(self._queue) >= self.max_size:
+            self.dropped += 1
+            return False
+        event.setdefault("timestamp", datetime.utcnow())
+        self._queue.append(event)
+        self.recorded += 1
+        if len(self._queue) >= self.batch_size and self._wake is not None:
+            self._wake.set()
+        return True
+
+    def record_generation(self, ingredients_input: str, recipe_names: Sequence[str]) -> bool:
+        """A generation request: the pantry and the recipes returned, best first"""
+        return self.record({"type": "generate", "pantry": pantry_ingredients(ingredients_input),
+                            "recipes": list(recipe_names)})
+
+    def record_save(self, recipe_id: str, recipe_name: str, ingredients: Sequence[str]) -> bool:
+        """A saved recipe and the ingredients it was saved with"""
+        return self.record({"type": "save", "recipe_id": recipe_id, "recipe": recipe_name,
+                            "pantry": [ing.strip().lower() for ing in ingredients]})
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        batch = []
+        while self._queue and len(batch) < self.batch_size:
+            batch.append(self._queue.popleft())
+        return batch
+
+    @staticmethod
+    def rollup(batch: Sequence[Dict[str, Any]]) -> List[UpdateOne]:
+        """Per-(day, ingredient) query and save counts of a batch, as upserts"""
+        counts: Dict[tuple, Dict[str, int]] = {}
+        for event in batch:
+            field = "queries" if event["type"] == "generate" else "saves"
+            day = event["timestamp"].date().isoformat()
+            for ing in event.get("pantry", ()):
+                entry = counts.setdefault((day, ing), {"queries": 0, "saves": 0})
+                entry[field] += 1
+        return [
+            UpdateOne({"_id": f"{day}:{ing}"},
+                      {"$inc": {key: value for key, value in entry.items() if value},
+                       "$setOnInsert": {"day": day, "ingredient": ing}},
+                      upsert=True)
+            for (day, ing), entry in counts.items()
+        ]
+
+    async def flush(self) -> int:
+        """Write every queued event, in batches; returns the number written"""
+        written = 0
+        while self._queue:
+            batch = self._take_batch()
+            try:
+                written += await self._write(batch)
+            finally:
+                self.flushes += 1
+        return written
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> int:
+        """Insert a batch and roll up the events that were inserted; returns how many were"""
+        database = self.get_database()
+        for event in batch:
+            event.setdefault("_id", ObjectId())
+        try:
+            await database[EVENTS_COLLECTION].insert_many(batch, ordered=False)
+            inserted = batch
+        except asyncio.CancelledError:
+            # Shutdown cancelled the insert; requeue the batch so the final flush writes it
+            self._queue.extendleft(reversed(batch))
+            raise
+        except BulkWriteError as e:
+            # Unordered, so every event without an error was inserted. Duplicate keys are events
+            # an interrupted attempt already inserted, whose rollup never ran
+            errors = write_errors_by_index(e.details)
+            inserted = [event for i, event in enumerate(batch) if i not in errors or is_duplicate_key(errors[i])]
+            logging.error(f"Error writing {len(batch) - len(inserted)} of {len(batch)} analytics events: {str(e)}")
+        except Exception as e:
+            self.failed += len(batch)
+            logging.error(f"Error writing {len(batch)} analytics events: {str(e)}")
+            return 0
+        self.failed += len(batch) - len(inserted)
+        self.written += len(inserted)
+
+        updates = self.rollup(inserted)
+        if updates:
+            try:
+                await database[ROLLUP_COLLECTION].bulk_write(updates, ordered=False)
+            except Exception as e:
+                self.rollup_failed += len(inserted)
+                logging.error(f"Error rolling up {len(inserted)} analytics events: {str(e)}")
+        return len(inserted)
+
+    async def run(self):
+        """Flush whenever a batch fills up or flush_interval passes, until cancelled"""
+        self._wake = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": len(self._queue),
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+            "rollup_failed": self.rollup_failed,
+            "flushes": self.flushes,
+        }
+
+def popular_ingredients_pipeline(since_day: str, limit: int, by: str = "queries") -> List[Dict[str, Any]]:
+    """Aggregation over the rollup: ingredients ranked by queries or saves on days from since_day (YYYY-MM-DD)"""
+    return [
+        {"$match": {"day": {"$gte": since_day}}},
+        {"$group": {"_id": "$ingredient", "queries": {"$sum": "$queries"}, "saves": {"$sum": "$saves"}}},
+        {"$sort": {by: -1, "_id": 1}},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "ingredient": "$_id", "queries": 1, "saves": 1}},
+    ]
@@ -0,0 +1 @@
+# Benchmarks for the ShelfChef backend. Run from backend/, e.g. python -m benchmarks.bench_compiled_templates
@@ -0,0 +1,85 @@
+"""
+Startup benchmark: generator construction time and RSS, in-memory templates vs a mapped catalog
+
+Each measurement runs in a fresh interpreter so imports and page cache effects are comparable.
+Besides peak RSS it reports steady-state RSS after serving --requests generation requests
+and one find_cookable call, so the mapped catalog's memory bound is measured under load
+rather than only at startup.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+CHILD = """
+import json, resource, sys, time
+from benchmarks.synthetic import make_catalog, make_pantries
+from recipe_generator import SmartRecipeGenerator
+mode, size, path, requests = sys.argv[1], int(sys.argv[2]), sys.argv[3], int(sys.argv[4])
+
+def current_rss_mb():
+    # Resident set right now (Linux); ru_maxrss only reports the peak
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / (1024 * 1024)
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+if mode == "in-memory":
+    templates = make_catalog(size, seed=7)
+    start = time.perf_counter()
+    generator = SmartRecipeGenerator(templates=templates)
+else:
+    start = time.perf_counter()
+    generator = SmartRecipeGenerator(catalog_path=path)
+ready = time.perf_counter() - start
+generator.generate_recipes("chicken, rice, onion, garlic")
+first = time.perf_counter() - start
+ready_rss = current_rss_mb()
+for pantry in make_pantries(requests, seed=7):
+    generator.generate_recipes(pantry)
+generator.find_cookable("chicken, rice, onion, garlic", 2)
+print(json.dumps({"ready_ms": ready * 1000, "first_request_ms": first * 1000, "ready_rss_mb": ready_rss,
+                  "steady_rss_mb": current_rss_mb(),
+                  "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+def compile_synthetic(size: int, output: Path):
+    from benchmarks.synthetic import make_catalog
+    from catalog import compile_catalog
+    from recipe_generator import SmartRecipeGenerator
+
+    templates = make_catalog(size, seed=7)
+    generator = SmartRecipeGenerator(templates=[])
+    compile_catalog(templates, generator.ingredient_substitutions, output, generator.normalize_ingredient,
+                    generator.normalization_fingerprint)
+
+def measure(mode: str, size: int, path: Path, requests: int) -> dict:
+    output = subprocess.run([sys.executable, "-c", CHILD, mode, str(size), str(path), str(requests)],
+                            cwd=BACKEND_DIR, check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--requests", type=int, default=500, help="generation requests before steady-state RSS")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = Path(tmp) / f"synthetic-{size}.shelfcat"
+            compile_synthetic(size, path)
+            for mode in ("in-memory", "mapped"):
+                result = measure(mode, size, path, args.requests)
+                print(f"{size:>7} {mode:>9}: ready {result['ready_ms']:8.1f} ms, "
+                      f"first request {result['first_request_ms']:8.1f} ms, "
+                      f"RSS ready {result['ready_rss_mb']:7.1f} MB, "
+                      f"after {args.requests} requests {result['steady_rss_mb']:7.1f} MB, "
+                      f"max {result['max_rss_mb']:7.1f} MB")
+
+if __name__ == "__main__":
+    main()
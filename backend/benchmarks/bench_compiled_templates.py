@@ -0,0 +1,45 @@
+"""
+Microbenchmark: compiled frozenset templates vs the list-based scoring helpers
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import make_generator, make_pantries
+
+def bench_list_based(generator, pantries):
+    for pantry in pantries:
+        user_ingredients = [ing.strip() for ing in pantry.split(",")]
+        for template in generator.recipe_templates:
+            all_ingredients = template.primary_ingredients + template.optional_ingredients
+            generator.calculate_match_percentage(user_ingredients, template.primary_ingredients)
+            generator.calculate_match_percentage(user_ingredients, all_ingredients)
+
+def bench_compiled(generator, pantries):
+    for pantry in pantries:
+        user_ingredients = [ing.strip() for ing in pantry.split(",")]
+        user_set = frozenset(generator.normalize_ingredient(ing) for ing in user_ingredients)
+        for compiled in generator.compiled_templates:
+            compiled.match_percentages(user_set)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--templates", type=int, default=2000)
+    parser.add_argument("--pantries", type=int, default=50)
+    args = parser.parse_args()
+    
+    generator = make_generator(args.templates)
+    pantries = make_pantries(args.pantries)
+    
+    results = {}
+    for label, bench in (("list-based", bench_list_based), ("compiled", bench_compiled)):
+        start = time.perf_counter()
+        bench(generator, pantries)
+        results[label] = time.perf_counter() - start
+    
+    scored = args.templates * args.pantries
+    for label, elapsed in results.items():
+        print(f"{label:>10}: {elapsed * 1000:9.1f} ms total, {elapsed / scored * 1e6:6.2f} us per template")
+    print(f"   speedup: {results['list-based'] / results['compiled']:.1f}x")
+
+if __name__ == "__main__":
+    main()
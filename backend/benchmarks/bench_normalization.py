@@ -0,0 +1,79 @@
+"""
+Benchmark: recall and throughput of ingredient normalization, legacy dict lookup vs lexicon pipeline
+
+Recall counts a labeled input as resolved when it normalizes to the same name as its
+intended ingredient, under the generator that does the normalizing.
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import make_pantries
+from ingredient_normalizer import LegacyNormalizer
+from recipe_generator import SmartRecipeGenerator
+
+# (free-form input, intended ingredient)
+LABELED_INPUTS = [
+    ("tomatoes", "tomato"), ("2 large tomatoes", "tomato"), ("Tomatoes, diced", "tomato"), ("tomatos", "tomato"),
+    ("onions", "onion"), ("1 chopped onion", "onion"), ("red onion", "onion"), ("onoin", "onion"),
+    ("eggs", "eggs"), ("3 eggs", "eggs"), ("Large Eggs", "eggs"), ("egs", "eggs"),
+    ("cheddar cheese", "cheddar"), ("sharp cheddar", "cheddar"), ("shredded mozzarella", "mozzarella"),
+    ("mozarella", "mozzarella"), ("parmesan cheese", "parmesan"), ("grated parmesan", "parmesan"),
+    ("chicken breasts", "chicken"), ("boneless skinless chicken thighs", "chicken"), ("chiken", "chicken"),
+    ("garlic", "garlic"), ("3 cloves garlic", "garlic"), ("garlic cloves", "garlic"), ("garlik", "garlic"),
+    ("minced garlic", "garlic"), ("mushroom", "mushrooms"), ("sliced mushrooms", "mushrooms"),
+    ("mushroms", "mushrooms"), ("bell peppers", "bell pepper"), ("red bell pepper", "bell pepper"),
+    ("capsicum", "bell pepper"), ("scallions", "green onion"), ("spring onions", "green onion"),
+    ("1 cup basmati rice", "rice"), ("brown rice", "rice"), ("cooked rice", "rice"), ("spagetti", "spaghetti"),
+    ("spaghetti", "spaghetti"), ("penne pasta", "penne"), ("brocoli", "broccoli"), ("broccoli florets", "broccoli"),
+    ("fresh spinach", "spinach"), ("baby spinach", "spinach"), ("2 carrots", "carrot"), ("carrots", "carrot"),
+    ("potatoes", "potato"), ("russet potatoes", "potato"), ("unsalted butter", "butter"), ("2 tbsp butter", "butter"),
+    ("extra virgin olive oil", "olive oil"), ("sourdough bread", "sourdough"), ("whole wheat bread", "whole wheat bread"),
+    ("cherry tomatoes", "cherry tomatoes"), ("grape tomatoes", "cherry tomatoes"), ("fresh basil leaves", "basil"),
+    ("ground beef", "beef"), ("1 lb ground beef", "beef"), ("tofu", "tofu"), ("firm tofu", "tofu"),
+    ("soy sauce", "soy sauce"), ("soya sauce", "soy sauce"), ("ginger", "ginger"), ("fresh ginger", "ginger"),
+    ("celery stalks", "celery"), ("herbs", "herbs"), ("dried oregano", "oregano"), ("kale", "kale"),
+]
+
+def recall(generator: SmartRecipeGenerator) -> float:
+    resolved = sum(
+        generator.match_ingredient(raw) == generator.match_ingredient(intended) for raw, intended in LABELED_INPUTS
+    )
+    return resolved / len(LABELED_INPUTS)
+
+def throughput(generator: SmartRecipeGenerator, tokens, memoized: bool) -> float:
+    """Normalized tokens per second over the token stream"""
+    matcher = generator.ingredient_matcher
+    normalizer = generator.normalizer
+    for memo_owner in (matcher, normalizer):
+        if memo_owner is not None and hasattr(memo_owner, "_memo"):
+            memo_owner._memo.clear()
+            memo_owner.memo_size = 65536 if memoized else 0
+    match = generator.match_ingredient
+    start = time.perf_counter()
+    for token in tokens:
+        match(token)
+    return len(tokens) / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pantries", type=int, default=20000)
+    args = parser.parse_args()
+
+    tokens = [ing.strip() for pantry in make_pantries(args.pantries) for ing in pantry.split(",")]
+    # Repeat traffic also carries the messy spellings, at the same skew as the catalog names
+    tokens += [raw for raw, _ in LABELED_INPUTS] * (len(tokens) // (10 * len(LABELED_INPUTS)))
+
+    generators = {
+        "legacy dict": SmartRecipeGenerator(normalizer=LegacyNormalizer(), fuzzy_matching=False),
+        "lexicon": SmartRecipeGenerator(fuzzy_matching=False),
+        "lexicon+fuzzy": SmartRecipeGenerator(),
+    }
+    print(f"{len(LABELED_INPUTS)} labeled inputs, {len(tokens)} tokens in the throughput stream")
+    for label, generator in generators.items():
+        cold = throughput(generator, tokens, memoized=False)
+        warm = throughput(generator, tokens, memoized=True)
+        print(f"{label:>14}: recall {recall(generator):6.1%}, "
+              f"unmemoized {cold / 1e3:8.1f}k tokens/s, memoized {warm / 1e3:8.1f}k tokens/s")
+
+if __name__ == "__main__":
+    main()
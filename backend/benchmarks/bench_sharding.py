@@ -0,0 +1,52 @@
+"""
+Benchmark: query latency of one generator vs the sharded engine over the same compiled catalog
+
+Shards only run in parallel with as many free cores as shards; on fewer cores this measures
+the scatter/merge overhead instead.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_catalog_startup import compile_synthetic
+from benchmarks.synthetic import make_pantries
+from recipe_generator import SmartRecipeGenerator
+from sharded_engine import ShardedRecipeEngine
+
+def time_per_query(engine, pantries, k):
+    start = time.perf_counter()
+    for pantry in pantries:
+        engine.generate_recipes(pantry, k)
+    return (time.perf_counter() - start) / len(pantries) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--templates", type=int, default=200000)
+    parser.add_argument("--shards", default="2,4,8")
+    parser.add_argument("--pantries", type=int, default=30)
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    pantries = make_pantries(args.pantries)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / f"synthetic-{args.templates}.shelfcat"
+        compile_synthetic(args.templates, path)
+
+        generator = SmartRecipeGenerator(catalog_path=str(path), jitter_seed=0)
+        for _ in generator.compiled_templates:
+            pass  # compile every template up front, as the shards do at start-up
+        single = time_per_query(generator, pantries, args.k)
+        print(f"{'shards':>7} {'ms/query':>9} {'speedup':>8}")
+        print(f"{1:>7} {single:>9.2f} {1:>7.1f}x")
+
+        for shards in (int(shards) for shards in args.shards.split(",")):
+            engine = ShardedRecipeEngine(shards, catalog_path=str(path), jitter_seed=0)
+            try:
+                sharded = time_per_query(engine, pantries, args.k)
+            finally:
+                engine.shutdown()
+            print(f"{shards:>7} {sharded:>9.2f} {single / sharded:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
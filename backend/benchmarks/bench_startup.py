@@ -0,0 +1,127 @@
+"""
+Startup benchmark: server import time, time to the first healthy /api/health and to the first generated recipes
+
+Every run starts a fresh interpreter (for the import) and a fresh uvicorn process (for the
+HTTP timings), so results reflect a cold worker. Mongo is never contacted: the client only
+connects on its first operation. With --output the results are written in the
+benchmarks.suite format, so two runs can be compared with `python -m benchmarks.suite compare`.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.suite import summarize
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+IMPORT_CHILD = """
+import time
+start = time.perf_counter()
+import server
+print((time.perf_counter() - start) * 1000)
+"""
+
+def child_env(warmup: bool) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    env.setdefault("DB_NAME", "shelfchef_bench")
+    env["GENERATION_WARMUP"] = "1" if warmup else "0"
+    return env
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def request(url: str, payload: Optional[dict] = None) -> int:
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=10) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+def wait_for(process: subprocess.Popen, url: str, payload: Optional[dict], start: float, timeout: float) -> float:
+    """Poll url until it answers 200; return milliseconds since start"""
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        if request(url, payload) == 200:
+            return (time.perf_counter() - start) * 1000
+        time.sleep(0.005)
+    raise TimeoutError(f"{url} did not answer 200 within {timeout} s")
+
+def rss_mb(pid: int) -> float:
+    """Resident set size of a process from /proc (Linux only; 0 elsewhere)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+def measure_import(warmup: bool) -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_CHILD], cwd=BACKEND_DIR, env=child_env(warmup),
+                            check=True, capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+def measure_server(warmup: bool, timeout: float) -> Dict[str, float]:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}/api"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=child_env(warmup), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        health_ms = wait_for(process, f"{base}/health", None, start, timeout)
+        recipes_ms = wait_for(process, f"{base}/generate-recipes", {"ingredients": "chicken, rice, onion"}, start, timeout)
+        return {"health_ms": health_ms, "first_recipes_ms": recipes_ms, "rss_mb": rss_mb(process.pid)}
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--no-warmup", action="store_true", help="start with GENERATION_WARMUP=0")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="write results in the benchmarks.suite JSON format")
+    args = parser.parse_args()
+
+    warmup = not args.no_warmup
+    samples: Dict[str, List[float]] = {"import_ms": [], "health_ms": [], "first_recipes_ms": [], "rss_mb": []}
+    for _ in range(args.runs):
+        samples["import_ms"].append(measure_import(warmup))
+        for name, value in measure_server(warmup, args.timeout).items():
+            samples[name].append(value)
+
+    print(f"{'metric':>17} {'median':>9} {'max':>9}")
+    for name, values in samples.items():
+        print(f"{name:>17} {sorted(values)[len(values) // 2]:>9.1f} {max(values):>9.1f}")
+
+    if args.output:
+        benchmarks = {
+            f"startup_{name[:-3]}": summarize([value / 1000 for value in samples[name]], len(samples[name]))
+            for name in ("import_ms", "health_ms", "first_recipes_ms")
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"benchmarks": benchmarks, "rss_mb": samples["rss_mb"]}, f, indent=2)
+            f.write("\n")
+
+if __name__ == "__main__":
+    main()
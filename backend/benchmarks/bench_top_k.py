@@ -0,0 +1,50 @@
+"""
+Benchmark: bounded-heap top-k ranking vs scoring and sorting every candidate
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import make_catalog, make_pantries
+from recipe_generator import SmartRecipeGenerator
+
+def rank_by_full_sort(generator, user_set, k):
+    """The previous ranking stage: score every candidate completely, then sort them all"""
+    if generator.use_index:
+        candidates = [generator.compiled_templates[i] for i in sorted(generator._candidate_ids(user_set))]
+    else:
+        candidates = generator.compiled_templates
+    matches = []
+    for compiled in candidates:
+        overall_match, primary_match = compiled.match_percentages(user_set)
+        if primary_match > 0:
+            matches.append((compiled, overall_match, primary_match))
+    matches.sort(key=lambda x: (x[1], x[2]), reverse=True)
+    return matches[:k]
+
+def time_per_query(rank, generator, user_sets, k):
+    start = time.perf_counter()
+    for user_set in user_sets:
+        rank(generator, user_set, k)
+    return (time.perf_counter() - start) / len(user_sets) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10,100,1000,10000,100000")
+    parser.add_argument("--pantries", type=int, default=30)
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+    
+    pantries = make_pantries(args.pantries)
+    print(f"{'templates':>10} {'path':>6} {'full sort ms':>13} {'top-k ms':>9} {'speedup':>8}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        catalog = make_catalog(size)
+        for use_index in (False, True):
+            generator = SmartRecipeGenerator(templates=catalog, use_index=use_index)
+            user_sets = [frozenset(generator.normalize_ingredient(ing) for ing in p.split(",")) for p in pantries]
+            full_sort = time_per_query(rank_by_full_sort, generator, user_sets, args.k)
+            top_k = time_per_query(lambda g, u, k: g.rank_templates(u, k), generator, user_sets, args.k)
+            path = "index" if use_index else "scan"
+            print(f"{size:>10} {path:>6} {full_sort:>13.3f} {top_k:>9.3f} {full_sort / top_k:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
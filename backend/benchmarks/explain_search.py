@@ -0,0 +1,93 @@
+"""
+Index check for saved-recipe search: explain() representative searches against a real MongoDB
+
+Seeds a scratch database with synthetic saved recipes, creates the server's indexes and
+prints the winning plan of each search. Exits with status 1 if any search scans the
+collection. Relevance-sorted searches always sort in memory (text indexes carry no score
+order), but only the top `limit` matches.
+
+    MONGO_URL=mongodb://localhost:27017 python -m benchmarks.explain_search --recipes 20000
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from pymongo import MongoClient
+
+from benchmarks.synthetic import ingredient_vocabulary
+from saved_recipes import FULL_PROJECTION, SAVED_RECIPES_INDEXES, plan_summary, search_filter, search_sort
+
+SEARCHES: List[Dict] = [
+    {"text": "chicken"},
+    {"text": "garlic soup", "min_match": 60},
+    {"text": "rice", "sort": "match"},
+    {"available": ["eggs"]},
+    {"available": ["eggs", "cheese"], "sort": "match"},
+    {"missing": ["salt"]},
+    {"difficulty": "Hard"},
+    {"difficulty": "Easy", "min_match": 80},
+    {"min_match": 90},
+    {"sort": "match"},
+    {},
+]
+
+def make_saved_recipes(count: int, seed: int = 0) -> List[Dict]:
+    rng = random.Random(seed)
+    vocabulary = ingredient_vocabulary()
+    start = datetime(2024, 1, 1)
+    recipes = []
+    for i in range(count):
+        ingredients = rng.sample(vocabulary, 6)
+        recipes.append({
+            "id": f"recipe-{i}",
+            "name": f"{ingredients[0].title()} {rng.choice(['Soup', 'Stir-fry', 'Bake', 'Salad', 'Omelet'])}",
+            "description": f"Made with {', '.join(ingredients[:3])}",
+            "cook_time": "20 mins",
+            "servings": "2 servings",
+            "difficulty": rng.choice(["Easy", "Medium", "Hard"]),
+            "available_ingredients": ingredients[:4],
+            "missing_ingredients": ingredients[4:] + ["salt"],
+            "instructions": ["Cook it"],
+            "match_percentage": rng.randint(40, 95),
+            "image_url": "",
+            "saved_at": start + timedelta(seconds=i),
+        })
+    return recipes
+
+def describe(search: Dict) -> str:
+    return " ".join(f"{key}={value}" for key, value in search.items()) or "(no filters)"
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--database", default="shelfchef_explain")
+    args = parser.parse_args()
+
+    client = MongoClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    collection = client[args.database].saved_recipes
+    collection.drop()
+    collection.insert_many(make_saved_recipes(args.recipes))
+    for keys, options in SAVED_RECIPES_INDEXES:
+        collection.create_index(keys, **options)
+
+    failed = False
+    try:
+        for search in SEARCHES:
+            options = dict(search)
+            sort = search_sort(options.pop("sort", None), options.get("text"))
+            cursor = collection.find(search_filter(**options), FULL_PROJECTION).sort(sort).limit(args.limit)
+            summary = plan_summary(cursor.explain())
+            failed = failed or summary["collection_scan"]
+            flags = "  COLLSCAN" if summary["collection_scan"] else ""
+            flags += "  SORT" if summary["blocking_sort"] else ""
+            print(f"{describe(search):<42} {','.join(summary['indexes']):<56}{flags}")
+    finally:
+        client.drop_database(args.database)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
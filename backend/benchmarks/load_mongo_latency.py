@@ -0,0 +1,113 @@
+"""
+Load test: latency of the Mongo-backed endpoints while generation traffic runs concurrently.
+
+Compares GENERATION_MODE values in-process over ASGI. With "inline", generation blocks the
+event loop and /api/saved-recipes latency tracks generation time; thread and process modes
+keep the loop free.
+"""
+import argparse
+import asyncio
+import functools
+import logging
+import os
+import statistics
+import time
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "shelfchef_bench")
+
+import httpx
+
+import server
+from benchmarks.mongo_standin import AsyncDatabase
+from benchmarks.synthetic import make_generator, make_pantries
+from generation_executor import GenerationExecutor
+
+SAMPLE_RECIPE = {
+    "name": "Benchmark Omelet",
+    "description": "Saved during the load test",
+    "cook_time": "10 mins",
+    "servings": "2 servings",
+    "difficulty": "Easy",
+    "available_ingredients": ["eggs"],
+    "missing_ingredients": ["salt"],
+    "instructions": ["Beat eggs", "Cook"],
+    "match_percentage": 80,
+}
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+async def generation_traffic(client, pantries, stop):
+    statuses = []
+    while not stop.is_set():
+        for pantry in pantries:
+            if stop.is_set():
+                break
+            response = await client.post("/api/generate-recipes", json={"ingredients": pantry})
+            statuses.append(response.status_code)
+            # In-process ASGI calls never wait on a socket; yield like a real client would
+            await asyncio.sleep(0)
+    return statuses
+
+async def mongo_traffic(client, requests):
+    latencies = []
+    for i in range(requests):
+        start = time.perf_counter()
+        if i % 5 == 0:
+            await client.post("/api/save-recipe", json=SAMPLE_RECIPE)
+        else:
+            await client.get("/api/saved-recipes")
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+async def run_mode(mode, args, generator):
+    factory = functools.partial(make_generator, args.templates)
+    executor = GenerationExecutor(generator, generator_factory=factory, mode=mode,
+                                  max_workers=args.workers, max_pending=args.max_pending)
+    server.generation_executor = executor
+    server.db = AsyncDatabase()
+    if mode == "process":
+        # Let every worker finish loading its catalog before measuring
+        await asyncio.gather(*(executor.run("generate_recipes", "eggs", 3) for _ in range(args.workers)))
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+        pantries = make_pantries(50)
+        generators = [asyncio.ensure_future(generation_traffic(client, pantries, stop)) for _ in range(args.concurrency)]
+        await asyncio.sleep(0.1)
+        latencies = await mongo_traffic(client, args.requests)
+        stop.set()
+        statuses = [status for result in await asyncio.gather(*generators) for status in result]
+    executor.shutdown()
+
+    return {
+        "mode": mode,
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": percentile(latencies, 0.99),
+        "generations": len(statuses),
+        "rejected": statuses.count(503),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--templates", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--modes", default="inline,thread,process")
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    generator = make_generator(args.templates)
+    print(f"{'mode':>8} {'p50 ms':>8} {'p99 ms':>8} {'generations':>12} {'503s':>6}")
+    for mode in args.modes.split(","):
+        result = asyncio.run(run_mode(mode, args, generator))
+        print(f"{result['mode']:>8} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+              f"{result['generations']:>12} {result['rejected']:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+In-process async stand-in for the Motor database, backed by mongomock (pip install mongomock)
+"""
+import asyncio
+import functools
+
+import mongomock
+
+class AsyncCursor:
+    def __init__(self, cursor, latency: float):
+        self._cursor = cursor
+        self._latency = latency
+
+    def __getattr__(self, name):
+        method = getattr(self._cursor, name)
+
+        @functools.wraps(method)
+        def chain(*args, **kwargs):
+            method(*args, **kwargs)
+            return self
+        return chain
+
+    async def to_list(self, length=None):
+        await asyncio.sleep(self._latency)
+        documents = []
+        for document in self._cursor:
+            documents.append(document)
+            if length is not None and len(documents) >= length:
+                break
+        return documents
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        await asyncio.sleep(self._latency)
+        for document in self._cursor:
+            yield document
+
+class AsyncCollection:
+    def __init__(self, collection, latency: float):
+        self._collection = collection
+        self._latency = latency
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self._collection.find(*args, **kwargs), self._latency)
+
+    def aggregate(self, *args, **kwargs):
+        return AsyncCursor(self._collection.aggregate(*args, **kwargs), self._latency)
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        @functools.wraps(method)
+        async def call(*args, **kwargs):
+            # Every round trip yields to the event loop, like a real driver would
+            await asyncio.sleep(self._latency)
+            return method(*args, **kwargs)
+        return call
+
+class AsyncDatabase:
+    """Drop-in for server.db: collections expose Motor-style awaitable methods"""
+
+    def __init__(self, name: str = "shelfchef_bench", latency: float = 0.001):
+        self._database = mongomock.MongoClient()[name]
+        self._latency = latency
+
+    def __getattr__(self, name):
+        return AsyncCollection(self._database[name], self._latency)
+
+    def __getitem__(self, name):
+        return getattr(self, name)
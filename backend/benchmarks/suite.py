@@ -0,0 +1,265 @@
+"""
+Benchmark suite: engine microbenchmarks and an in-process HTTP load test, saved as JSON.
+
+    python -m benchmarks.suite run --output results.json
+    python -m benchmarks.suite run --baseline baseline.json --output results.json
+    python -m benchmarks.suite compare baseline.json results.json
+
+Each result records the median and p95 time per operation. compare (or run --baseline)
+flags every benchmark whose median slowed down by more than its threshold in
+benchmarks/thresholds.json and exits with status 1. Only compare results from the same
+machine.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from benchmarks.synthetic import make_catalog, make_pantries
+from recipe_generator import SmartRecipeGenerator
+
+DEFAULT_THRESHOLDS_PATH = Path(__file__).parent / "thresholds.json"
+RESULTS_VERSION = 1
+
+# Each benchmark stops after this long once it has MIN_SAMPLES timings, so large catalogs stay quick
+DEFAULT_BUDGET_SECONDS = 3.0
+MIN_SAMPLES = 25
+
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def summarize(per_op_seconds: Sequence[float], operations: int) -> Dict[str, float]:
+    """Median and p95 time per operation (in microseconds) over a list of samples"""
+    median = statistics.median(per_op_seconds)
+    return {
+        "median_us": round(median * 1e6, 3),
+        "p95_us": round(percentile(per_op_seconds, 0.95) * 1e6, 3),
+        "ops_per_sec": round(1 / median, 1) if median else 0.0,
+        "operations": operations,
+    }
+
+def measure(operation: Callable[[object], object], inputs: Sequence, rounds: int,
+            budget: float = DEFAULT_BUDGET_SECONDS) -> Dict[str, float]:
+    """Time each call over `rounds` passes through inputs, stopping early once the time budget is spent"""
+    for item in inputs[:MIN_SAMPLES]:
+        operation(item)  # warm memos and lazily compiled templates
+    samples = []
+    deadline = time.perf_counter() + budget
+    for _ in range(rounds):
+        for item in inputs:
+            start = time.perf_counter()
+            operation(item)
+            end = time.perf_counter()
+            samples.append(end - start)
+            if end > deadline and len(samples) >= MIN_SAMPLES:
+                return summarize(samples, len(samples))
+    return summarize(samples, len(samples))
+
+def engine_benchmarks(sizes: Sequence[int], pantries: Sequence[str], rounds: int,
+                      budget: float = DEFAULT_BUDGET_SECONDS) -> Dict[str, Dict[str, float]]:
+    """Microbenchmarks for the per-template helpers, and for generate_recipes and find_cookable at each catalog size"""
+    results = {}
+    generator = SmartRecipeGenerator(templates=make_catalog(200))
+    user_lists = [[ing.strip() for ing in pantry.split(",")] for pantry in pantries]
+    # One (pantry, template) pair per pantry, cycling through the catalog
+    pairs = [(user, generator.recipe_templates[i % len(generator.recipe_templates)])
+             for i, user in enumerate(user_lists)]
+    available = [(generator.find_available_ingredients(user, template.primary_ingredients + template.optional_ingredients), template)
+                 for user, template in pairs]
+
+    results["calculate_match_percentage"] = measure(
+        lambda pair: generator.calculate_match_percentage(pair[0], pair[1].primary_ingredients + pair[1].optional_ingredients),
+        pairs, rounds, budget
+    )
+    results["find_available_ingredients"] = measure(
+        lambda pair: generator.find_available_ingredients(pair[0], pair[1].primary_ingredients + pair[1].optional_ingredients),
+        pairs, rounds, budget
+    )
+    results["generate_missing_ingredients"] = measure(
+        lambda pair: generator.generate_missing_ingredients(pair[1], pair[0]), available, rounds, budget
+    )
+    results["customize_instructions"] = measure(
+        lambda pair: generator.customize_instructions(pair[1], pair[0]), available, rounds, budget
+    )
+
+    for size in sizes:
+        # No cache, so every call ranks and renders from scratch
+        sized = SmartRecipeGenerator(templates=make_catalog(size), jitter_seed=0)
+        results[f"generate_recipes[templates={size}]"] = measure(
+            lambda pantry: sized.generate_recipes(pantry, 3), pantries, rounds, budget
+        )
+        results[f"find_cookable[templates={size}]"] = measure(
+            lambda pantry: sized.find_cookable(pantry, 1, 50), pantries, rounds, budget
+        )
+    return results
+
+async def _drive(app, pantries: Sequence[str], requests: int, concurrency: int) -> Dict[str, float]:
+    import httpx
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    next_request = iter(range(requests))
+
+    async def client_loop(client):
+        for i in next_request:
+            start = time.perf_counter()
+            response = await client.post("/api/generate-recipes", json={"ingredients": pantries[i % len(pantries)]})
+            latencies.append(time.perf_counter() - start)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    result = summarize(latencies, len(latencies))
+    result["p99_us"] = round(percentile(latencies, 0.99) * 1e6, 3)
+    result["requests_per_sec"] = round(len(latencies) / elapsed, 1)
+    result["statuses"] = statuses
+    return result
+
+def http_benchmark(size: int, pantries: Sequence[str], requests: int, concurrency: int) -> Dict[str, float]:
+    """Drive POST /api/generate-recipes in-process over ASGI, with Mongo replaced by the mongomock stand-in.
+
+    Importing server reads (and, through load_dotenv, extends) the environment; it is put
+    back afterwards, along with every server global the benchmark replaces.
+    """
+    environ = dict(os.environ)
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "shelfchef_bench")
+    try:
+        import server
+    finally:
+        os.environ.clear()
+        os.environ.update(environ)
+    from benchmarks.mongo_standin import AsyncDatabase
+    from generation_executor import GenerationExecutor
+
+    generator = SmartRecipeGenerator(templates=make_catalog(size), jitter_seed=0)
+    saved = server.db, server.generation_executor, server.analytics
+    server.db = AsyncDatabase()
+    server.generation_executor = GenerationExecutor(generator, mode="thread", max_pending=max(64, concurrency))
+    # Benchmark requests are not user activity, so they are kept out of the analytics buffer
+    server.analytics = None
+    try:
+        return asyncio.run(_drive(server.app, pantries, requests, concurrency))
+    finally:
+        server.generation_executor.shutdown()
+        server.db, server.generation_executor, server.analytics = saved
+
+def run_suite(sizes: Sequence[int], pantry_count: int = 200, rounds: int = 15, http_templates: Optional[int] = 1000,
+              http_requests: int = 500, concurrency: int = 8, budget: float = DEFAULT_BUDGET_SECONDS) -> Dict:
+    """Run every benchmark and return the results document"""
+    pantries = make_pantries(pantry_count)
+    benchmarks = engine_benchmarks(sizes, pantries, rounds, budget)
+    if http_templates:
+        benchmarks[f"http_generate_recipes[templates={http_templates}]"] = http_benchmark(
+            http_templates, pantries, http_requests, concurrency
+        )
+    return {
+        "version": RESULTS_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "benchmarks": benchmarks,
+    }
+
+def load_thresholds(path: Optional[Path] = None) -> Dict[str, float]:
+    with open(path or DEFAULT_THRESHOLDS_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+def threshold_for(name: str, thresholds: Dict[str, float]) -> float:
+    """Allowed slowdown for a benchmark: the entry for its base name (before any [...]) or the default"""
+    return thresholds.get(name, thresholds.get(name.split("[", 1)[0], thresholds["default"]))
+
+def find_regressions(baseline: Dict, current: Dict, thresholds: Dict[str, float]) -> List[Dict]:
+    """Compare median times benchmark by benchmark; returns one row per benchmark in both runs"""
+    rows = []
+    for name, result in current["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if before is None or not before["median_us"]:
+            continue
+        change = result["median_us"] / before["median_us"] - 1
+        allowed = threshold_for(name, thresholds)
+        rows.append({
+            "name": name,
+            "baseline_us": before["median_us"],
+            "current_us": result["median_us"],
+            "change": round(change, 4),
+            "threshold": allowed,
+            "regressed": change > allowed,
+        })
+    return rows
+
+def print_results(document: Dict):
+    print(f"{'benchmark':<44} {'median us':>11} {'p95 us':>11} {'ops/s':>11}")
+    for name, result in document["benchmarks"].items():
+        print(f"{name:<44} {result['median_us']:>11.2f} {result['p95_us']:>11.2f} {result['ops_per_sec']:>11.1f}")
+
+def print_comparison(rows: List[Dict]) -> bool:
+    """Print the comparison table and return whether any benchmark regressed"""
+    print(f"{'benchmark':<44} {'baseline us':>11} {'current us':>11} {'change':>8} {'limit':>7}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regressed"] else ""
+        print(f"{row['name']:<44} {row['baseline_us']:>11.2f} {row['current_us']:>11.2f} "
+              f"{row['change']:>+8.1%} {row['threshold']:>+7.0%}{flag}")
+    return any(row["regressed"] for row in rows)
+
+def read_json(path: str) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the suite and write the results as JSON")
+    run.add_argument("--sizes", default="10,1000,10000,100000", help="catalog sizes for generate_recipes")
+    run.add_argument("--pantries", type=int, default=200)
+    run.add_argument("--rounds", type=int, default=15, help="passes over the pantries per benchmark")
+    run.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS, help="seconds per benchmark before stopping early")
+    run.add_argument("--http-templates", type=int, default=1000, help="catalog size for the HTTP load test (0 skips it)")
+    run.add_argument("--http-requests", type=int, default=500)
+    run.add_argument("--concurrency", type=int, default=8)
+    run.add_argument("--output", help="write results to this file")
+    run.add_argument("--baseline", help="compare against this results file")
+    run.add_argument("--thresholds", type=Path)
+
+    compare = commands.add_parser("compare", help="compare two results files")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--thresholds", type=Path)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        document = run_suite(
+            [int(size) for size in args.sizes.split(",")], args.pantries, args.rounds,
+            args.http_templates, args.http_requests, args.concurrency, args.budget
+        )
+        print_results(document)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(document, f, indent=2)
+                f.write("\n")
+        if not args.baseline:
+            return 0
+        baseline = read_json(args.baseline)
+    else:
+        baseline, document = read_json(args.baseline), read_json(args.current)
+
+    print()
+    regressed = print_comparison(find_regressions(baseline, document, load_thresholds(args.thresholds)))
+    return 1 if regressed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+Synthetic catalogs and pantries for benchmarking the recipe engine
+"""
+import random
+from typing import List
+
+from recipe_generator import RecipeTemplate, SmartRecipeGenerator
+
+PANTRY_STAPLES = [
+    "eggs", "cheese", "tomato", "onion", "garlic", "rice", "pasta", "bread", "chicken",
+    "butter", "spinach", "mushrooms", "bell pepper", "potato", "carrot", "celery",
+    "broccoli", "ginger", "soy sauce", "herbs", "vegetables", "milk", "flour",
+]
+
+def ingredient_vocabulary() -> List[str]:
+    """All ingredient names known to the built-in catalog, including substitutes"""
+    generator = SmartRecipeGenerator()
+    vocabulary = set(PANTRY_STAPLES)
+    for template in generator.recipe_templates:
+        vocabulary.update(template.primary_ingredients)
+        vocabulary.update(template.optional_ingredients)
+    for ing, subs in generator.ingredient_substitutions.items():
+        vocabulary.add(ing)
+        vocabulary.update(subs)
+    return sorted(vocabulary)
+
+def make_catalog(size: int, seed: int = 0) -> List[RecipeTemplate]:
+    """Build `size` templates by recombining built-in templates with random ingredients"""
+    rng = random.Random(seed)
+    base_templates = SmartRecipeGenerator().recipe_templates
+    vocabulary = ingredient_vocabulary()
+    
+    catalog = []
+    for i in range(size):
+        base = base_templates[i % len(base_templates)]
+        primary = rng.sample(vocabulary, rng.randint(1, 2))
+        optional = rng.sample(vocabulary, rng.randint(2, 6))
+        catalog.append(RecipeTemplate(
+            name=f"{base.name} #{i}",
+            description=base.description,
+            primary_ingredients=primary,
+            optional_ingredients=[ing for ing in optional if ing not in primary],
+            cook_time=base.cook_time,
+            servings=base.servings,
+            difficulty=base.difficulty,
+            instructions_template=base.instructions_template,
+            category=base.category,
+            image_url=base.image_url
+        ))
+    return catalog
+
+def make_pantries(count: int, seed: int = 0) -> List[str]:
+    """Build comma-separated pantries, skewed towards common staples"""
+    rng = random.Random(seed)
+    vocabulary = ingredient_vocabulary()
+    # Zipf-like weights: staples first and most frequent, the long tail rare
+    ordered = PANTRY_STAPLES + [ing for ing in vocabulary if ing not in PANTRY_STAPLES]
+    weights = [1.0 / (rank + 1) for rank in range(len(ordered))]
+    
+    pantries = []
+    for _ in range(count):
+        size = rng.randint(1, 8)
+        picked = dict.fromkeys(rng.choices(ordered, weights=weights, k=size))
+        pantries.append(", ".join(picked))
+    return pantries
+
+def make_generator(size: int, seed: int = 0, **kwargs) -> SmartRecipeGenerator:
+    """Create a generator whose catalog is replaced by a synthetic one of `size` templates"""
+    catalog = make_catalog(size, seed)
+    return SmartRecipeGenerator(templates=catalog, **kwargs)
@@ -0,0 +1,344 @@
+"""
+Recipe Catalog - compiles JSON/CSV recipe sources into a memory-mapped binary catalog
+
+The binary format keeps every string once in a string table and refers to strings,
+ingredients and instructions by 32-bit IDs. Templates are fixed-size records, and the
+primary-ingredient inverted index is stored pre-built, so opening a catalog costs the
+same for eight recipes as for 100k and the pages are shared read-only between workers.
+
+Layout (little-endian, every section 8-byte aligned):
+
+    header        magic, version, counts, normalization fingerprint, section offsets
+    string index  uint32[n_strings + 1] byte offsets into the string blob
+    string blob   UTF-8 bytes
+    templates     uint32[n_templates][13] string IDs and (offset, length) into the ID pool
+    id pool       uint32[] ingredient and instruction string IDs
+    substitutions uint32[n_substitutions][3] ingredient string ID, (offset, length) into the ID pool
+    tokens        uint32[n_tokens][3] token string ID, (offset, length) into postings
+    postings      uint32[] template IDs, ascending per token
+
+Usage:
+    python -m catalog compile data/default_catalog.json
+    python -m catalog compile recipes.csv --substitutions substitutions.json -o recipes.shelfcat
+"""
+import argparse
+import csv
+import json
+import mmap
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from ingredient_normalizer import NORMALIZERS, make_normalizer, normalize_substitutions
+from recipe_generator import RecipeTemplate
+
+DATA_DIR = Path(__file__).parent / "data"
+DEFAULT_CATALOG_PATH = DATA_DIR / "default_catalog.shelfcat"
+DEFAULT_CATALOG_SOURCE = DATA_DIR / "default_catalog.json"
+
+MAGIC = b"SHCATLG\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sIIIII32s7Q")
+TEMPLATE_FIELDS = 13
+
+# Fields stored as string IDs in a template record, in record order
+STRING_FIELDS = ("name", "description", "cook_time", "servings", "difficulty", "category", "image_url")
+
+# Separator for list-valued columns in CSV sources
+CSV_LIST_SEPARATOR = "|"
+
+class CatalogError(ValueError):
+    """Raised for malformed catalog sources or binary files"""
+
+# Sources
+
+def _template_from_dict(data: Dict) -> RecipeTemplate:
+    try:
+        return RecipeTemplate(
+            name=data["name"],
+            description=data["description"],
+            primary_ingredients=list(data["primary_ingredients"]),
+            optional_ingredients=list(data.get("optional_ingredients", [])),
+            cook_time=data["cook_time"],
+            servings=data["servings"],
+            difficulty=data["difficulty"],
+            instructions_template=list(data["instructions_template"]),
+            category=data.get("category", "main"),
+            image_url=data.get("image_url", "")
+        )
+    except KeyError as e:
+        raise CatalogError(f"Recipe template is missing field {e}") from e
+
+def _split_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(CSV_LIST_SEPARATOR) if item.strip()]
+
+def load_json_source(path: Path) -> Tuple[List[RecipeTemplate], Dict[str, List[str]]]:
+    """Read {"templates": [...], "substitutions": {...}} from a JSON source"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    templates = [_template_from_dict(item) for item in data.get("templates", [])]
+    return templates, {ing: list(subs) for ing, subs in data.get("substitutions", {}).items()}
+
+def load_csv_source(path: Path) -> List[RecipeTemplate]:
+    """Read one template per row; list columns are separated by '|'"""
+    templates = []
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            for column in ("primary_ingredients", "optional_ingredients", "instructions_template"):
+                row[column] = _split_list(row.get(column) or "")
+            if not row.get("category"):
+                row.pop("category", None)
+            templates.append(_template_from_dict(row))
+    return templates
+
+def load_source(path: Path, substitutions_path: Optional[Path] = None) -> Tuple[List[RecipeTemplate], Dict[str, List[str]]]:
+    """Load templates and substitutions from a JSON or CSV source"""
+    path = Path(path)
+    if path.suffix == ".csv":
+        templates, substitutions = load_csv_source(path), {}
+    else:
+        templates, substitutions = load_json_source(path)
+    if substitutions_path is not None:
+        with open(substitutions_path, encoding="utf-8") as f:
+            substitutions = {ing: list(subs) for ing, subs in json.load(f).items()}
+    return templates, substitutions
+
+# Compiler
+
+def build_primary_index(templates: Iterable[RecipeTemplate], substitutions: Dict[str, List[str]],
+                        normalize: Callable[[str], str]) -> Dict[str, List[int]]:
+    """Map each normalized primary ingredient and its substitutes to ascending template IDs"""
+    substitution_sets = normalize_substitutions(substitutions, normalize)
+    index: Dict[str, List[int]] = {}
+    for template_id, template in enumerate(templates):
+        keys = set()
+        for ing in template.primary_ingredients:
+            normalized = normalize(ing)
+            keys.add(normalized)
+            keys.update(substitution_sets.get(normalized, ()))
+        for key in keys:
+            index.setdefault(key, []).append(template_id)
+    return index
+
+class _StringTable:
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def intern(self, value: str) -> int:
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+def _align(buffer: bytearray):
+    buffer.extend(b"\0" * (-len(buffer) % 8))
+
+def _uint32(values) -> bytes:
+    data = array("I", values)
+    if sys.byteorder != "little":
+        data.byteswap()
+    return data.tobytes()
+
+def compile_catalog(templates: List[RecipeTemplate], substitutions: Dict[str, List[str]], output: Path,
+                    normalize: Callable[[str], str], fingerprint: str) -> Path:
+    """Write templates and substitutions as a binary catalog with a pre-built primary index"""
+    strings = _StringTable()
+    id_pool: List[int] = []
+
+    def pool(values: Iterable[str]) -> Tuple[int, int]:
+        offset = len(id_pool)
+        id_pool.extend(strings.intern(value) for value in values)
+        return offset, len(id_pool) - offset
+
+    records: List[int] = []
+    for template in templates:
+        records.extend(strings.intern(getattr(template, field)) for field in STRING_FIELDS)
+        records.extend(pool(template.primary_ingredients))
+        records.extend(pool(template.optional_ingredients))
+        records.extend(pool(template.instructions_template))
+
+    substitution_records: List[int] = []
+    for ing, subs in substitutions.items():
+        substitution_records.append(strings.intern(ing))
+        substitution_records.extend(pool(subs))
+
+    token_records: List[int] = []
+    postings: List[int] = []
+    for token, template_ids in sorted(build_primary_index(templates, substitutions, normalize).items()):
+        token_records.extend((strings.intern(token), len(postings), len(template_ids)))
+        postings.extend(template_ids)
+
+    encoded = [value.encode("utf-8") for value in strings.strings]
+    string_offsets = [0]
+    for value in encoded:
+        string_offsets.append(string_offsets[-1] + len(value))
+
+    body = bytearray(b"\0" * HEADER.size)
+    _align(body)
+    offsets = []
+    for section in (_uint32(string_offsets), b"".join(encoded), _uint32(records), _uint32(id_pool),
+                    _uint32(substitution_records), _uint32(token_records), _uint32(postings)):
+        offsets.append(len(body))
+        body.extend(section)
+        _align(body)
+
+    HEADER.pack_into(body, 0, MAGIC, VERSION, len(encoded), len(templates), len(substitutions),
+                     len(token_records) // 3, fingerprint.encode("ascii")[:32], *offsets)
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_suffix(output.suffix + ".tmp")
+    tmp.write_bytes(bytes(body))
+    # Atomic replace: workers that already mapped the old file keep reading it safely
+    tmp.replace(output)
+    return output
+
+# Memory-mapped reader
+
+class MappedCatalog(Sequence):
+    """Read-only view of a binary catalog; templates are materialized on access"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        if len(self._buffer) < HEADER.size:
+            raise CatalogError(f"{self.path} is not a recipe catalog")
+
+        (magic, version, n_strings, n_templates, n_substitutions, n_tokens, fingerprint,
+         strings_off, blob_off, templates_off, pool_off, subs_off, tokens_off, postings_off) = HEADER.unpack_from(self._buffer)
+        if magic != MAGIC:
+            raise CatalogError(f"{self.path} is not a recipe catalog")
+        if version != VERSION:
+            raise CatalogError(f"{self.path} has unsupported catalog version {version}")
+
+        self.fingerprint = fingerprint.rstrip(b"\0").decode("ascii")
+        self._string_offsets = self._uint32_view(strings_off, n_strings + 1)
+        self._blob = self._buffer[blob_off:]
+        self._templates = self._uint32_view(templates_off, n_templates * TEMPLATE_FIELDS)
+        self._pool = self._uint32_view(pool_off, (subs_off - pool_off) // 4)
+        self._tokens = self._uint32_view(tokens_off, n_tokens * 3)
+        self._postings = self._uint32_view(postings_off, (len(self._buffer) - postings_off) // 4)
+        self._n_templates = n_templates
+
+        # Substitutions are small; decode them once
+        self.substitutions: Dict[str, List[str]] = {}
+        subs = self._uint32_view(subs_off, n_substitutions * 3)
+        for i in range(0, len(subs), 3):
+            self.substitutions[self._string(subs[i])] = self._strings(subs[i + 1], subs[i + 2])
+
+    def _uint32_view(self, offset: int, count: int):
+        raw = self._buffer[offset:offset + count * 4]
+        if sys.byteorder == "little":
+            return raw.cast("I")
+        data = array("I", bytes(raw))
+        data.byteswap()
+        return data
+
+    def _string(self, string_id: int) -> str:
+        offsets = self._string_offsets
+        return str(self._blob[offsets[string_id]:offsets[string_id + 1]], "utf-8")
+
+    def _strings(self, offset: int, length: int) -> List[str]:
+        return [self._string(string_id) for string_id in self._pool[offset:offset + length]]
+
+    def __len__(self) -> int:
+        return self._n_templates
+
+    def __getitem__(self, template_id):
+        if isinstance(template_id, slice):
+            return [self[i] for i in range(*template_id.indices(len(self)))]
+        if template_id < 0:
+            template_id += self._n_templates
+        if not 0 <= template_id < self._n_templates:
+            raise IndexError("catalog index out of range")
+
+        base = template_id * TEMPLATE_FIELDS
+        record = self._templates[base:base + TEMPLATE_FIELDS]
+        fields = {field: self._string(record[i]) for i, field in enumerate(STRING_FIELDS)}
+        return RecipeTemplate(
+            primary_ingredients=self._strings(record[7], record[8]),
+            optional_ingredients=self._strings(record[9], record[10]),
+            instructions_template=self._strings(record[11], record[12]),
+            **fields
+        )
+
+    def names(self) -> List[str]:
+        """Template names in catalog order, without materializing the templates"""
+        return [self._string(self._templates[template_id * TEMPLATE_FIELDS]) for template_id in range(self._n_templates)]
+
+    def primary_index(self) -> "MappedIndex":
+        """The pre-built primary-ingredient index stored in the file"""
+        return MappedIndex(self)
+
+    def close(self):
+        try:
+            self._buffer.release()
+            self._mmap.close()
+        except BufferError:
+            # Views handed out to compiled templates or the index keep the mapping alive
+            pass
+
+class MappedIndex:
+    """dict-like token -> ascending template IDs, backed by the catalog's postings"""
+
+    def __init__(self, catalog: MappedCatalog):
+        self._postings = catalog._postings
+        tokens = catalog._tokens
+        self._spans: Dict[str, Tuple[int, int]] = {}
+        for i in range(0, len(tokens), 3):
+            self._spans[catalog._string(tokens[i])] = (tokens[i + 1], tokens[i + 2])
+
+    def get(self, token: str, default=None):
+        span = self._spans.get(token)
+        if span is None:
+            return default
+        offset, length = span
+        return self._postings[offset:offset + length]
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._spans
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def keys(self):
+        return self._spans.keys()
+
+def open_catalog(path: Optional[Path] = None) -> Tuple[Sequence, Dict[str, List[str]]]:
+    """Open a binary catalog (memory-mapped) or load a JSON/CSV source, returning (templates, substitutions)"""
+    path = Path(path) if path is not None else DEFAULT_CATALOG_PATH
+    if path.suffix in (".json", ".csv"):
+        return load_source(path)
+    catalog = MappedCatalog(path)
+    return catalog, catalog.substitutions
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compile recipe catalogs")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    compile_parser = subcommands.add_parser("compile", help="compile a JSON or CSV source into a binary catalog")
+    compile_parser.add_argument("source", type=Path)
+    compile_parser.add_argument("-o", "--output", type=Path)
+    compile_parser.add_argument("--substitutions", type=Path, help="JSON file of ingredient substitutions")
+    compile_parser.add_argument("--normalizer", choices=NORMALIZERS, default="lexicon",
+                                help="normalizer the stored index is built with (must match the server's)")
+    compile_parser.add_argument("--lexicon", type=Path, help="lexicon file for the lexicon normalizer")
+    args = parser.parse_args(argv)
+
+    from recipe_generator import SmartRecipeGenerator
+
+    templates, substitutions = load_source(args.source, args.substitutions)
+    output = args.output or args.source.with_suffix(".shelfcat")
+    generator = SmartRecipeGenerator(templates=[], substitutions=substitutions,
+                                     normalizer=make_normalizer(args.normalizer, args.lexicon), fuzzy_matching=False)
+    compile_catalog(templates, substitutions, output, generator.normalize_ingredient, generator.normalization_fingerprint)
+    print(f"Compiled {len(templates)} templates into {output}")
+
+if __name__ == "__main__":
+    main()
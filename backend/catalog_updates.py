@@ -0,0 +1,78 @@
+"""
+Catalog Updates - template and substitution changes applied to a running generator, and a source file watcher
+"""
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from catalog import load_source
+from recipe_generator import RecipeTemplate
+
+class CatalogChanges:
+    """Templates to add or replace (matched by name), template names to remove, and substitution entries.
+
+    A substitution entry maps an ingredient to its new substitutes, or to None to delete it.
+    """
+
+    def __init__(self, templates: Optional[List[RecipeTemplate]] = None, removed: Optional[List[str]] = None,
+                 substitutions: Optional[Dict[str, Optional[List[str]]]] = None):
+        self.templates = templates or []
+        self.removed = removed or []
+        self.substitutions = substitutions or {}
+
+    def __bool__(self) -> bool:
+        return bool(self.templates or self.removed or self.substitutions)
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "templates": len(self.templates),
+            "removed": len(self.removed),
+            "substitutions": len(self.substitutions),
+        }
+
+def diff_sources(old: Tuple[List[RecipeTemplate], Dict[str, List[str]]],
+                 new: Tuple[List[RecipeTemplate], Dict[str, List[str]]]) -> CatalogChanges:
+    """Changes that turn one loaded (templates, substitutions) source into another"""
+    old_templates = {template.name: vars(template) for template in old[0]}
+    new_templates = {template.name: template for template in new[0]}
+    old_substitutions, new_substitutions = old[1], new[1]
+    return CatalogChanges(
+        templates=[template for name, template in new_templates.items() if old_templates.get(name) != vars(template)],
+        removed=[name for name in old_templates if name not in new_templates],
+        substitutions={
+            **{ing: subs for ing, subs in new_substitutions.items() if old_substitutions.get(ing) != subs},
+            **{ing: None for ing in old_substitutions if ing not in new_substitutions},
+        }
+    )
+
+class CatalogWatcher:
+    """Polls a JSON or CSV catalog source and reports edits as CatalogChanges.
+
+    The file's contents when the watcher starts are taken to be what is being served, so
+    point it at the source the running catalog was built from. A file that fails to load
+    (e.g. half written) raises from poll and is read again on the next one.
+    """
+
+    def __init__(self, path: Path, substitutions_path: Optional[Path] = None):
+        self.path = Path(path)
+        self.substitutions_path = Path(substitutions_path) if substitutions_path is not None else None
+        self._stamp = self._read_stamp()
+        self._source = load_source(self.path, self.substitutions_path)
+
+    def _read_stamp(self) -> Tuple[int, ...]:
+        stamp = ()
+        for path in (self.path, self.substitutions_path):
+            if path is not None:
+                stat = os.stat(path)
+                stamp += (stat.st_mtime_ns, stat.st_size)
+        return stamp
+
+    def poll(self) -> Optional[CatalogChanges]:
+        """Changes since the last successful poll, or None if the source is unchanged"""
+        stamp = self._read_stamp()
+        if stamp == self._stamp:
+            return None
+        source = load_source(self.path, self.substitutions_path)
+        changes = diff_sources(self._source, source)
+        self._stamp, self._source = stamp, source
+        return changes or None
@@ -0,0 +1,177 @@
+"""
+Cookable Index - finds every template a pantry covers up to a number of missing ingredients
+"""
+import copy
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from overlay import REMOVED, patch_mapping
+
+# Deepest max_missing answered from the prefix index; larger values check every template
+MAX_INDEXED_MISSING = 4
+
+def popcount(mask: int) -> int:
+    return bin(mask).count("1")
+
+class CookableIndex:
+    """Per-template ingredient bitmasks plus a prefix index over each template's rarest ingredients.
+
+    A template with s distinct ingredients and at most n missing must have at least one of
+    its n + 1 rarest ingredients covered, so a query only probes the first n + 1 prefix
+    positions of the pantry's ingredients, and templates with s <= n come straight from the
+    size groups. Candidates are then checked with one AND against their bitmask, so the work
+    tracks the number of templates returned rather than the catalog size.
+    """
+
+    def __init__(self, compiled_templates: Iterable, substitutions: Dict[str, FrozenSet[str]],
+                 max_indexed_missing: int = MAX_INDEXED_MISSING):
+        self.max_indexed_missing = max_indexed_missing
+        templates = [(compiled.template_id, tuple(compiled.ingredient_counts)) for compiled in compiled_templates]
+
+        self.covers = self._covers(substitutions)
+
+        frequency: Dict[str, int] = {}
+        for _, ingredients in templates:
+            for ing in ingredients:
+                frequency[ing] = frequency.get(ing, 0) + 1
+        # Rarest ingredients get the lowest bits and come first in every prefix
+        self.bits: Dict[str, int] = {
+            ing: 1 << bit for bit, ing in enumerate(sorted(frequency, key=lambda ing: (frequency[ing], ing)))
+        }
+
+        self.masks: Dict[int, int] = {}
+        self.sizes: Dict[int, int] = {}
+        # Templates by number of distinct ingredients, for those with at most max_indexed_missing
+        self.small: List[List[int]] = [[] for _ in range(max_indexed_missing + 1)]
+        # Ingredient -> template IDs having it at prefix position 0, 1, ... max_indexed_missing
+        self.prefixes: Dict[str, List[List[int]]] = {}
+        for template_id, ingredients in templates:
+            ordered = self._ordered(ingredients)
+            mask = 0
+            for ing in ordered:
+                mask |= self.bits[ing]
+            self.masks[template_id] = mask
+            self.sizes[template_id] = len(ordered)
+            if len(ordered) <= max_indexed_missing:
+                self.small[len(ordered)].append(template_id)
+            for position, ing in enumerate(ordered[:max_indexed_missing + 1]):
+                lists = self.prefixes.setdefault(ing, [])
+                while len(lists) <= position:
+                    lists.append([])
+                lists[position].append(template_id)
+
+    @staticmethod
+    def _covers(substitutions: Dict[str, FrozenSet[str]]) -> Dict[str, Set[str]]:
+        """Recipe ingredients a user ingredient also covers, through the substitution table"""
+        covers: Dict[str, Set[str]] = {}
+        for ing, subs in substitutions.items():
+            for sub in subs:
+                covers.setdefault(sub, set()).add(ing)
+        return covers
+
+    def _ordered(self, ingredients: Iterable[str]) -> List[str]:
+        """A template's distinct ingredients, rarest (lowest bit) first"""
+        return sorted(ingredients, key=lambda ing: self.bits[ing])
+
+    def patched(self, removed: Iterable, added: Iterable,
+                substitutions: Optional[Dict[str, FrozenSet[str]]] = None) -> "CookableIndex":
+        """Copy of this index with the removed compiled templates taken out and the added ones put in.
+
+        Only the masks and prefix lists of the templates involved are copied; the rest is
+        shared with this index, which keeps answering for its own catalog version. Unseen
+        ingredients take the next free bits, so the prefixes of new templates are ordered by
+        first appearance rather than rarity: still exact, just less selective.
+        """
+        index = copy.copy(self)
+        if substitutions is not None:
+            index.covers = self._covers(substitutions)
+        added = list(added)
+
+        new_bits: Dict[str, int] = {}
+        for compiled in added:
+            for ing in compiled.ingredient_counts:
+                if ing not in self.bits and ing not in new_bits:
+                    new_bits[ing] = 1 << (len(self.bits) + len(new_bits))
+        index.bits = patch_mapping(self.bits, new_bits)
+
+        masks: Dict[int, object] = {}
+        sizes: Dict[int, object] = {}
+        small = list(self.small)
+        prefixes: Dict[str, List[List[int]]] = {}
+
+        def prefix_lists(ing: str) -> List[List[int]]:
+            lists = prefixes.get(ing)
+            if lists is None:
+                lists = prefixes[ing] = [list(template_ids) for template_ids in self.prefixes.get(ing, ())]
+            return lists
+
+        for compiled in removed:
+            template_id = compiled.template_id
+            ordered = index._ordered(compiled.ingredient_counts)
+            masks[template_id] = sizes[template_id] = REMOVED
+            if len(ordered) <= self.max_indexed_missing:
+                small[len(ordered)] = [other for other in small[len(ordered)] if other != template_id]
+            for position, ing in enumerate(ordered[:self.max_indexed_missing + 1]):
+                prefix_lists(ing)[position].remove(template_id)
+
+        for compiled in added:
+            template_id = compiled.template_id
+            ordered = index._ordered(compiled.ingredient_counts)
+            mask = 0
+            for ing in ordered:
+                mask |= index.bits[ing]
+            masks[template_id] = mask
+            sizes[template_id] = len(ordered)
+            if len(ordered) <= self.max_indexed_missing:
+                small[len(ordered)] = small[len(ordered)] + [template_id]
+            for position, ing in enumerate(ordered[:self.max_indexed_missing + 1]):
+                lists = prefix_lists(ing)
+                while len(lists) <= position:
+                    lists.append([])
+                lists[position].append(template_id)
+
+        index.masks = patch_mapping(self.masks, masks)
+        index.sizes = patch_mapping(self.sizes, sizes)
+        index.small = small
+        index.prefixes = patch_mapping(self.prefixes, prefixes)
+        return index
+
+    def covered(self, user_set: FrozenSet[str]) -> Set[str]:
+        """Recipe ingredients the user has directly or through a substitute"""
+        covered = set(user_set)
+        for ing in user_set:
+            covered.update(self.covers.get(ing, ()))
+        return covered
+
+    def find(self, user_set: FrozenSet[str], max_missing: int) -> List[Tuple[int, int]]:
+        """Return (missing count, template ID) for every template missing at most max_missing, fewest first"""
+        if max_missing < 0:
+            return []
+        covered = self.covered(user_set)
+        covered_mask = 0
+        for ing in covered:
+            bit = self.bits.get(ing)
+            if bit:
+                covered_mask |= bit
+
+        if max_missing > self.max_indexed_missing:
+            candidates: Iterable[int] = self.masks
+        else:
+            found: Set[int] = set()
+            for size in range(max_missing + 1):
+                found.update(self.small[size])
+            depth = max_missing + 1
+            for ing in covered:
+                lists = self.prefixes.get(ing)
+                if lists:
+                    for template_ids in lists[:depth]:
+                        found.update(template_ids)
+            candidates = found
+
+        masks = self.masks
+        results = []
+        for template_id in candidates:
+            missing = popcount(masks[template_id] & ~covered_mask)
+            if missing <= max_missing:
+                results.append((missing, template_id))
+        results.sort()
+        return results
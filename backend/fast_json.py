@@ -0,0 +1,33 @@
+"""
+Fast JSON - bytes encoding for trusted engine results, with orjson when it is installed
+"""
+import json
+from typing import Any, Dict
+
+from pydantic import BaseModel
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON, byte-for-byte what FastAPI's default JSONResponse would send"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+def fields(model: BaseModel) -> Dict[str, Any]:
+    """Field values of a model built by the engine, without running pydantic serialization.
+
+    Only for models whose fields are already JSON types (strings, ints, lists of strings).
+    """
+    return model.__dict__
+
+class FastJSONResponse(Response):
+    """application/json response encoded with dumps; skips FastAPI's response_model pass"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
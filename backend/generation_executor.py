@@ -0,0 +1,219 @@
+"""
+Generation Executor - runs CPU-bound recipe generation off the asyncio event loop
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from recipe_generator import UnsupportedCatalogUpdate
+
+# Generator instance of the current worker process (process mode only)
+_worker_generator = None
+# Stage timings recorded in this worker since the last call returned
+_worker_stages: List[Tuple[str, float]] = []
+
+def _init_worker(generator_factory: Callable[[], Any], record_stages: bool = False):
+    """Pre-load the generator once per worker process"""
+    global _worker_generator
+    _worker_generator = generator_factory()
+    if record_stages:
+        _worker_generator.stage_observer = _record_stage
+
+def _record_stage(stage: str, seconds: float):
+    _worker_stages.append((stage, seconds))
+
+def _drain_stages() -> List[Tuple[str, float]]:
+    stages = _worker_stages[:]
+    _worker_stages.clear()
+    return stages
+
+def _call_worker(method: str, args: tuple) -> Tuple[Any, List[Tuple[str, float]]]:
+    result = getattr(_worker_generator, method)(*args)
+    return result, _drain_stages()
+
+def _collect_worker(method: str, args: tuple) -> Tuple[list, List[Tuple[str, float]]]:
+    items = list(getattr(_worker_generator, method)(*args))
+    return items, _drain_stages()
+
+def _warm_worker() -> int:
+    # The initializer has already built the generator by the time this runs
+    return multiprocessing.current_process().pid
+
+# Returned by next() once a generator running in the pool is exhausted
+_EXHAUSTED = object()
+
+class ExecutorSaturated(Exception):
+    """Raised when the number of pending generation calls reaches max_pending"""
+
+class GenerationExecutor:
+    """Dispatches generator calls inline, to a thread pool, or to a pre-loaded process pool.
+
+    At most max_pending calls may be running or queued at once; further calls fail fast
+    with ExecutorSaturated instead of piling up behind a busy pool. In process mode, stage
+    timings recorded by the workers are passed back to stage_observer after each call.
+
+    Without a generator, inline and thread modes build one from generator_factory on first
+    use (or in warm_up), so constructing the executor does not load the catalog.
+    """
+    MODES = ("inline", "thread", "process")
+
+    def __init__(self, generator: Any, generator_factory: Optional[Callable[[], Any]] = None,
+                 mode: str = "thread", max_workers: Optional[int] = None, max_pending: int = 64,
+                 stage_observer: Optional[Callable[[str, float], None]] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown generation mode: {mode}")
+        if mode == "process" and generator_factory is None:
+            raise ValueError("Process mode needs a picklable generator_factory")
+        if generator is None and generator_factory is None:
+            raise ValueError("Need a generator or a generator_factory")
+
+        self._generator = generator
+        self._generator_factory = generator_factory
+        self._generator_lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self._max_workers = max_workers
+        self.mode = mode
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self.stage_observer = stage_observer
+        self._pool: Optional[Executor] = None
+        if mode == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="recipe-generation")
+        elif mode == "process":
+            # Spawned workers import only the generator module, not the web app
+            self._pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(generator_factory, stage_observer is not None)
+            )
+
+    @property
+    def generator(self) -> Any:
+        """The in-process generator, built from generator_factory on first use"""
+        if self._generator is None:
+            with self._generator_lock:
+                if self._generator is None:
+                    generator = self._generator_factory()
+                    if self.stage_observer is not None:
+                        generator.stage_observer = self.stage_observer
+                    self._generator = generator
+        return self._generator
+
+    @property
+    def loaded_generator(self) -> Optional[Any]:
+        """The in-process generator if it has been built, without building it"""
+        return self._generator
+
+    async def warm_up(self):
+        """Build the generator (thread and inline modes) or start every worker process ahead of traffic"""
+        loop = asyncio.get_running_loop()
+        if self.mode == "process":
+            workers = self._max_workers or multiprocessing.cpu_count()
+            await asyncio.gather(*(loop.run_in_executor(self._pool, _warm_worker) for _ in range(workers)))
+        else:
+            await loop.run_in_executor(self._pool, lambda: self.generator)
+
+    async def update(self, method: str, *args) -> Any:
+        """Replace the generator with generator.<method>(*args), which returns the updated copy.
+
+        Updates run one at a time. The swap is a single reference assignment, so each call
+        runs entirely on the generator it started with. Process workers each hold their own
+        generator and cannot be reached individually, so process mode does not support updates.
+        """
+        if self.mode == "process":
+            raise UnsupportedCatalogUpdate("Generator updates are not supported with GENERATION_MODE=process")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self._update, method, args)
+
+    def _update(self, method: str, args: tuple) -> Any:
+        with self._update_lock:
+            updated = getattr(self.generator, method)(*args)
+            self._generator = updated
+            return updated
+
+    def _call(self, method: str, args: tuple) -> Any:
+        return getattr(self.generator, method)(*args)
+
+    def _start(self, method: str, args: tuple) -> Iterator[Any]:
+        return iter(getattr(self.generator, method)(*args))
+
+    async def run(self, method: str, *args) -> Any:
+        """Call generator.<method>(*args) according to the configured mode"""
+        if self.mode == "inline":
+            return getattr(self.generator, method)(*args)
+
+        self.check_capacity()
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            if self.mode == "thread":
+                return await loop.run_in_executor(self._pool, self._call, method, args)
+            result, stages = await loop.run_in_executor(self._pool, _call_worker, method, args)
+            self._replay(stages)
+            return result
+        finally:
+            self.pending -= 1
+
+    def _replay(self, stages: List[Tuple[str, float]]):
+        if self.stage_observer is not None:
+            for stage, seconds in stages:
+                self.stage_observer(stage, seconds)
+
+    def check_capacity(self):
+        """Raise ExecutorSaturated if another call would exceed max_pending"""
+        if self.mode != "inline" and self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ExecutorSaturated(f"{self.pending} generation requests already pending")
+
+    async def stream(self, method: str, *args) -> AsyncIterator[Any]:
+        """Iterate generator.<method>(*args), advancing it according to the configured mode.
+
+        Thread mode runs each step in the pool, so items arrive as soon as they are produced.
+        Process workers cannot hand back a live generator, so process mode collects the items
+        in the worker and yields them when it finishes. A stream counts as one pending call
+        while it runs; call check_capacity first to fail fast before a response starts.
+        """
+        if self.mode == "inline":
+            for item in getattr(self.generator, method)(*args):
+                yield item
+            return
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            if self.mode == "process":
+                items, stages = await loop.run_in_executor(self._pool, _collect_worker, method, args)
+                self._replay(stages)
+                for item in items:
+                    yield item
+                return
+
+            iterator = await loop.run_in_executor(self._pool, self._start, method, args)
+            while True:
+                item = await loop.run_in_executor(self._pool, next, iterator, _EXHAUSTED)
+                if item is _EXHAUSTED:
+                    return
+                yield item
+        finally:
+            self.pending -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        # Generators that own worker processes (the sharded engine) stop them too
+        close = getattr(self._generator, "shutdown", None)
+        if close is not None:
+            close()
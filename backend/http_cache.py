@@ -0,0 +1,99 @@
+"""
+HTTP Cache - ETags, conditional requests and Cache-Control policies for API responses
+"""
+import hashlib
+import os
+import time
+from typing import Any, Callable, Iterable, Optional
+
+from pymongo import ReturnDocument
+
+# Cache-Control for responses whose route sets none: API responses are not cacheable by default
+DEFAULT_CACHE_CONTROL = "no-store"
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag over the given parts, which must determine the response body"""
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode("utf-8"), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str, method: str = "GET") -> bool:
+    """Whether an If-None-Match header matches etag, using weak comparison (RFC 9110 13.1.2).
+
+    "*" only matches for GET and HEAD: for other methods a failed If-None-Match: * calls
+    for 412 rather than 304, and routes that answer POST conditionally only revalidate
+    the ETags they issued.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return method in ("GET", "HEAD")
+    # nginx turns strong ETags weak when it compresses a response, so W/ prefixes are ignored
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def file_fingerprint(paths: Iterable[Optional[str]]) -> str:
+    """Identifies the current contents of a set of files by path, size and modification time"""
+    stamps = []
+    for path in paths:
+        if path:
+            try:
+                stat = os.stat(path)
+                stamps.append(f"{path}:{stat.st_size}:{stat.st_mtime_ns}")
+            except OSError:
+                stamps.append(f"{path}:missing")
+    return ";".join(stamps)
+
+class ChangeCounter:
+    """Version number of a collection, bumped after every write to it.
+
+    The number lives in a Mongo document so every server process sees writes made by the
+    others. Reads are served from memory for ttl seconds, so a conditional request within
+    that window costs no database round trip; writes made by another process can therefore
+    take up to ttl seconds to invalidate ETags here. Writes made by this process update
+    the in-memory value immediately.
+    """
+
+    def __init__(self, get_collection: Callable[[], Any], name: str, ttl: float = 1.0):
+        self.get_collection = get_collection
+        self.name = name
+        self.ttl = ttl
+        self._version: Optional[int] = None
+        self._read_at = 0.0
+
+    def _remember(self, version: int):
+        self._version = version
+        self._read_at = time.monotonic()
+
+    async def current(self) -> int:
+        if self._version is not None and time.monotonic() - self._read_at < self.ttl:
+            return self._version
+        document = await self.get_collection().find_one({"_id": self.name})
+        self._remember(document["version"] if document else 0)
+        return self._version
+
+    async def bump(self) -> int:
+        document = await self.get_collection().find_one_and_update(
+            {"_id": self.name}, {"$inc": {"version": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        self._remember(document["version"])
+        return self._version
+
+class CacheControlMiddleware:
+    """ASGI middleware adding DEFAULT_CACHE_CONTROL to HTTP responses that set no Cache-Control"""
+
+    def __init__(self, app, default: str = DEFAULT_CACHE_CONTROL):
+        self.app = app
+        self.header = (b"cache-control", default.encode("latin-1"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_default(message):
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                if not any(name.lower() == b"cache-control" for name, _ in headers):
+                    message["headers"] = list(headers) + [self.header]
+            await send(message)
+
+        await self.app(scope, receive, send_with_default)
@@ -0,0 +1,331 @@
+"""
+Ingredient Normalizer - maps free-form ingredient text to canonical names for matching
+"""
+import json
+import re
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# Common normalizations (the original dictionary lookup, kept as the legacy normalizer)
+INGREDIENT_NORMALIZATIONS = {
+    "tomatoes": "tomato",
+    "onions": "onion",
+    "eggs": "egg",
+    "chickens": "chicken",
+    "cheeses": "cheese",
+    "mushroom": "mushrooms",
+    "bell peppers": "bell pepper",
+    "green onions": "green onion",
+    "scallions": "green onion"
+}
+
+DEFAULT_LEXICON_PATH = Path(__file__).parent / "data" / "ingredient_lexicon.json"
+
+# Bumped whenever the pipeline below changes, so catalogs compiled with older rules are re-indexed
+PIPELINE_VERSION = 1
+
+# Words: runs of letters, optionally joined by hyphens or apostrophes; digits and fractions are dropped
+WORD_PATTERN = re.compile(r"[^\W\d_]+(?:['-][^\W\d_]+)*")
+PARENTHETICAL_PATTERN = re.compile(r"\([^)]*\)")
+
+MEMO_SIZE = 65536
+
+def _remember(memo: Dict[str, str], memo_size: int, raw: str, result: str):
+    """Memoize result for raw; a full memo starts over rather than track recency on the hot path"""
+    if len(memo) >= memo_size:
+        if not memo_size:
+            return
+        memo.clear()
+    memo[raw] = result
+
+class LegacyNormalizer:
+    """Lower-cases and looks the ingredient up in INGREDIENT_NORMALIZATIONS"""
+    name = "legacy"
+
+    @property
+    def fingerprint(self) -> str:
+        table = json.dumps(sorted(INGREDIENT_NORMALIZATIONS.items()))
+        return f"legacy-{zlib.crc32(table.encode()):08x}"
+
+    @property
+    def vocabulary(self) -> FrozenSet[str]:
+        return frozenset(INGREDIENT_NORMALIZATIONS.values())
+
+    @property
+    def synonyms(self) -> Dict[str, str]:
+        return {}
+
+    @property
+    def modifiers(self) -> FrozenSet[str]:
+        return frozenset()
+
+    def normalize(self, ingredient: str) -> str:
+        ingredient = ingredient.lower().strip()
+        return INGREDIENT_NORMALIZATIONS.get(ingredient, ingredient)
+
+class LexiconNormalizer:
+    """Tokenizes, strips quantities, units and descriptors, singularizes and applies synonyms.
+
+    The pipeline is deterministic and does not depend on any catalog, so recipe and user
+    ingredients normalize the same way. Results are memoized per raw string.
+    """
+    name = "lexicon"
+
+    def __init__(self, lexicon: Dict, memo_size: int = MEMO_SIZE):
+        self.lexicon = lexicon
+        self.memo_size = memo_size
+        self._memo: Dict[str, str] = {}
+        self._dropped = frozenset(lexicon.get("quantity_words", ())) | frozenset(lexicon.get("units", ()))
+        self._descriptors = frozenset(lexicon.get("descriptors", ()))
+        self._invariant = frozenset(lexicon.get("invariant", ()))
+        self._irregular: Dict[str, str] = dict(lexicon.get("irregular_plurals", {}))
+        # Synonyms and vocabulary are written in natural form and compiled through the same pipeline
+        self._synonyms: Dict[str, str] = {}
+        for alias, canonical in lexicon.get("synonyms", {}).items():
+            self._synonyms[self._canonical_form(alias)] = self._canonical_form(canonical)
+        self._vocabulary = frozenset(self._synonyms.values()) | frozenset(
+            self.normalize(term) for term in lexicon.get("vocabulary", ())
+        )
+        # Modifiers only steer IngredientMatcher, not normalization, so they are not fingerprinted
+        self._modifiers = frozenset(lexicon.get("modifiers", ()))
+        rules = {key: value for key, value in lexicon.items() if key != "modifiers"}
+        self.fingerprint = "lexicon-%08x" % zlib.crc32(
+            json.dumps([PIPELINE_VERSION, rules], sort_keys=True, ensure_ascii=False).encode()
+        )
+
+    @classmethod
+    def from_file(cls, path: Optional[Path] = None) -> "LexiconNormalizer":
+        with open(path or DEFAULT_LEXICON_PATH, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @property
+    def vocabulary(self) -> FrozenSet[str]:
+        """Canonical names known to the lexicon"""
+        return self._vocabulary
+
+    @property
+    def synonyms(self) -> Dict[str, str]:
+        """Normalized alias -> canonical name"""
+        return self._synonyms
+
+    @property
+    def modifiers(self) -> FrozenSet[str]:
+        """Leading words that qualify an ingredient without changing it ("basmati" rice, "cherry" tomatoes)"""
+        return self._modifiers
+
+    def singularize(self, word: str) -> str:
+        """Rule-based singular form of a single word"""
+        irregular = self._irregular.get(word)
+        if irregular is not None:
+            return irregular
+        if len(word) <= 3 or word in self._invariant or not word.endswith("s"):
+            return word
+        if word.endswith(("ss", "us", "is")):
+            return word
+        if word.endswith("ies"):
+            return word[:-3] + "y"
+        if word.endswith(("oes", "ches", "shes", "sses", "xes", "zzes")):
+            return word[:-2]
+        return word[:-1]
+
+    def tokenize(self, ingredient: str) -> List[str]:
+        """Lower-cased words with quantities, units and descriptors removed"""
+        text = PARENTHETICAL_PATTERN.sub(" ", ingredient.lower())
+        words = [word for word in WORD_PATTERN.findall(text) if word[0].isalpha()]
+        kept = [word for word in words if word not in self._dropped and word not in self._descriptors]
+        # "cloves" or "dried" on their own are the ingredient, not a modifier
+        return kept or words
+
+    def _canonical_form(self, ingredient: str) -> str:
+        tokens = self.tokenize(ingredient)
+        if not tokens:
+            return ingredient.lower().strip()
+        tokens[-1] = self.singularize(tokens[-1])
+        return " ".join(tokens)
+
+    def normalize(self, ingredient: str) -> str:
+        normalized = self._memo.get(ingredient)
+        if normalized is None:
+            canonical = self._canonical_form(ingredient)
+            normalized = self._synonyms.get(canonical, canonical)
+            _remember(self._memo, self.memo_size, ingredient, normalized)
+        return normalized
+
+NORMALIZERS = ("lexicon", "legacy")
+
+def make_normalizer(name: str = "lexicon", lexicon_path: Optional[Path] = None):
+    """Create a normalizer by name; lexicon_path only applies to the lexicon normalizer"""
+    if name not in NORMALIZERS:
+        raise ValueError(f"Unknown ingredient normalizer: {name}")
+    if name == "legacy":
+        return LegacyNormalizer()
+    return LexiconNormalizer.from_file(lexicon_path)
+
+def normalize_substitutions(substitutions: Dict[str, List[str]], normalize: Callable[[str], str]) -> Dict[str, FrozenSet[str]]:
+    """Normalize both sides of a substitution table, merging entries that collapse together"""
+    normalized: Dict[str, set] = {}
+    for ing, subs in substitutions.items():
+        normalized.setdefault(normalize(ing), set()).update(normalize(sub) for sub in subs)
+    return {ing: frozenset(subs) for ing, subs in normalized.items()}
+
+# Typo-tolerant matching
+
+def levenshtein(a: str, b: str, max_distance: int) -> int:
+    """Edit distance between a and b, or max_distance + 1 once it is known to exceed max_distance"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+class BKTree:
+    """Burkhard-Keller tree over a vocabulary for bounded edit-distance lookups"""
+
+    def __init__(self, words: Iterable[str]):
+        self._root: Optional[Tuple[str, Dict[int, tuple]]] = None
+        for word in sorted(set(words)):
+            self.add(word)
+
+    def add(self, word: str):
+        if self._root is None:
+            self._root = (word, {})
+            return
+        node = self._root
+        while True:
+            parent, children = node
+            distance = levenshtein(word, parent, len(word) + len(parent))
+            if distance == 0:
+                return
+            child = children.get(distance)
+            if child is None:
+                children[distance] = (word, {})
+                return
+            node = child
+
+    def extended(self, words: Iterable[str]) -> "BKTree":
+        """Tree that also holds words; nodes along each insertion path are copied, so this tree is unchanged"""
+        tree = BKTree(())
+        tree._root = self._root
+        for word in sorted(set(words)):
+            tree._add_copying(word)
+        return tree
+
+    def _add_copying(self, word: str):
+        if self._root is None:
+            self._root = (word, {})
+            return
+        parent, children = self._root
+        self._root = (parent, dict(children))
+        node = self._root
+        while True:
+            parent, children = node
+            distance = levenshtein(word, parent, len(word) + len(parent))
+            if distance == 0:
+                return
+            child = children.get(distance)
+            if child is None:
+                children[distance] = (word, {})
+                return
+            # children is already a copy owned by this tree; copy the child before descending into it
+            child = (child[0], dict(child[1]))
+            children[distance] = child
+            node = child
+
+    def search(self, word: str, max_distance: int) -> List[Tuple[int, str]]:
+        """Return (distance, term) for every term within max_distance, closest first"""
+        if self._root is None:
+            return []
+        found = []
+        stack = [self._root]
+        while stack:
+            term, children = stack.pop()
+            distance = levenshtein(word, term, max(max_distance, len(word) + len(term)))
+            if distance <= max_distance:
+                found.append((distance, term))
+            for edge in range(distance - max_distance, distance + max_distance + 1):
+                child = children.get(edge)
+                if child is not None:
+                    stack.append(child)
+        found.sort()
+        return found
+
+def max_typo_distance(word: str) -> int:
+    """Edits tolerated for a word of this length: none for short words, where typos are ambiguous"""
+    if len(word) < 4:
+        return 0
+    if len(word) < 8:
+        return 1
+    return 2
+
+class IngredientMatcher:
+    """Resolves user input against a vocabulary of known ingredients.
+
+    Exact normalized names win; otherwise the longest known trailing phrase whose dropped
+    leading words are all modifiers ("basmati rice" -> "rice", but "coconut milk" stays
+    itself), then the unique closest vocabulary term or synonym alias within
+    max_typo_distance. Results are memoized per raw string, so repeat inputs cost one dict
+    lookup.
+    """
+
+    def __init__(self, normalize: Callable[[str], str], vocabulary: Iterable[str],
+                 synonyms: Optional[Dict[str, str]] = None, memo_size: int = MEMO_SIZE,
+                 modifiers: Iterable[str] = ()):
+        self.normalize = normalize
+        self.vocabulary = frozenset(vocabulary)
+        self.synonyms = synonyms or {}
+        self.modifiers = frozenset(modifiers)
+        self.memo_size = memo_size
+        self._tree = BKTree(self.vocabulary | self.synonyms.keys())
+        self._memo: Dict[str, str] = {}
+
+    def extended(self, words: Iterable[str]) -> "IngredientMatcher":
+        """Matcher whose vocabulary also has words, with an empty memo.
+
+        The BK-tree is extended by copying only the nodes on each new word's insertion path,
+        so this matcher keeps resolving exactly as before while sharing the unchanged nodes.
+        """
+        matcher = IngredientMatcher.__new__(IngredientMatcher)
+        matcher.normalize = self.normalize
+        matcher.vocabulary = self.vocabulary | frozenset(words)
+        matcher.synonyms = self.synonyms
+        matcher.modifiers = self.modifiers
+        matcher.memo_size = self.memo_size
+        matcher._tree = self._tree.extended(matcher.vocabulary - self.vocabulary - self.synonyms.keys())
+        matcher._memo = {}
+        return matcher
+
+    def match(self, ingredient: str) -> str:
+        matched = self._memo.get(ingredient)
+        if matched is None:
+            matched = self._resolve(self.normalize(ingredient))
+            _remember(self._memo, self.memo_size, ingredient, matched)
+        return matched
+
+    def _resolve(self, normalized: str) -> str:
+        vocabulary = self.vocabulary
+        if normalized in vocabulary:
+            return normalized
+
+        # Only modifiers may be dropped: "coconut milk" and "egg noodles" are not milk and noodles
+        tokens = normalized.split(" ")
+        for start in range(1, len(tokens)):
+            if tokens[start - 1] not in self.modifiers:
+                break
+            suffix = " ".join(tokens[start:])
+            if suffix in vocabulary:
+                return suffix
+
+        max_distance = max_typo_distance(normalized)
+        if max_distance:
+            candidates = self._tree.search(normalized, max_distance)
+            if len(candidates) == 1 or (candidates and candidates[0][0] < candidates[1][0]):
+                term = candidates[0][1]
+                return self.synonyms.get(term, term)
+        return normalized
@@ -0,0 +1,106 @@
+"""
+Instruction Renderer - parses instruction templates once and fills their placeholders in a single pass
+"""
+import re
+from typing import Dict, List, Sequence, Tuple
+
+# Placeholder -> (lower-cased ingredients that fill it, text used when none are available, first match only)
+CATEGORY_PLACEHOLDERS: Dict[str, Tuple[Tuple[str, ...], str, bool]] = {
+    "fillings": (("cheese", "tomato", "onion", "spinach", "mushrooms"), "your choice of fillings", False),
+    "protein": (("chicken", "beef", "eggs", "tofu"), "protein of choice", True),
+    "aromatics": (("onion", "garlic", "ginger"), "onion and garlic", False),
+    "vegetables": (("tomato", "bell pepper", "mushrooms", "spinach", "carrot"), "your choice of vegetables", False),
+    "toppings": (("cheese", "herbs", "tomato"), "desired toppings", False),
+    "hard_vegetables": (("carrot", "potato", "celery", "onion"), "carrots and celery", False),
+    "soft_vegetables": (("tomato", "spinach", "mushrooms"), "tomatoes and leafy greens", False),
+}
+
+# Placeholders that always render the same text
+FIXED_PLACEHOLDERS: Dict[str, str] = {
+    "eggs_count": "2-3",
+    "seasonings": "salt, pepper, and seasonings to taste",
+}
+
+PLACEHOLDER_PATTERN = re.compile(r"\{(\w+)\}")
+
+def _ingredient_categories() -> Dict[str, Tuple[str, ...]]:
+    categories: Dict[str, Tuple[str, ...]] = {}
+    for placeholder, (members, _, _) in CATEGORY_PLACEHOLDERS.items():
+        for member in members:
+            categories[member] = categories.get(member, ()) + (placeholder,)
+    return categories
+
+# Lower-cased ingredient -> category placeholders it can fill
+INGREDIENT_CATEGORIES = _ingredient_categories()
+
+def _escape(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+def fill_placeholders(placeholders: Sequence[str], available_ingredients: Sequence[str],
+                      categories: Dict[str, Tuple[str, ...]] = INGREDIENT_CATEGORIES) -> Dict[str, str]:
+    """Compute the text for each category placeholder from one pass over the available ingredients"""
+    matches: Dict[str, List[str]] = {placeholder: [] for placeholder in placeholders}
+    for ing in available_ingredients:
+        filled = categories.get(ing.lower())
+        if filled:
+            for placeholder in filled:
+                matches[placeholder].append(ing)
+
+    fillers = {}
+    for placeholder, found in matches.items():
+        _, default, first_only = CATEGORY_PLACEHOLDERS[placeholder]
+        if not found:
+            fillers[placeholder] = default
+        else:
+            fillers[placeholder] = found[0] if first_only else ", ".join(found)
+    return fillers
+
+class CompiledInstructions:
+    """An instructions_template parsed into per-line format strings.
+
+    Fixed placeholders are resolved at parse time, category placeholders become named
+    fields, and literal braces (including unknown placeholders such as "{cheese}") are
+    escaped, so rendering is one format_map call per templated line.
+    """
+    __slots__ = ("lines", "placeholders", "categories")
+
+    def __init__(self, instructions_template: Sequence[str]):
+        lines: List[Tuple[str, bool]] = []
+        placeholders: Dict[str, None] = {}
+        for instruction in instructions_template:
+            parts = PLACEHOLDER_PATTERN.split(instruction)
+            if len(parts) == 1:
+                lines.append((instruction, False))
+                continue
+
+            segments = [_escape(parts[0])]
+            templated = False
+            for i in range(1, len(parts), 2):
+                name, literal = parts[i], parts[i + 1]
+                if name in CATEGORY_PLACEHOLDERS:
+                    segments.append("{" + name + "}")
+                    placeholders[name] = None
+                    templated = True
+                elif name in FIXED_PLACEHOLDERS:
+                    segments.append(_escape(FIXED_PLACEHOLDERS[name]))
+                else:
+                    segments.append("{{" + name + "}}")
+                segments.append(_escape(literal))
+
+            line = "".join(segments)
+            lines.append((line, True) if templated else (line.format(), False))
+        self.lines: Tuple[Tuple[str, bool], ...] = tuple(lines)
+        self.placeholders: Tuple[str, ...] = tuple(placeholders)
+        # Only the ingredients that can fill one of this template's placeholders
+        self.categories: Dict[str, Tuple[str, ...]] = {}
+        for ing, filled in INGREDIENT_CATEGORIES.items():
+            used = tuple(placeholder for placeholder in filled if placeholder in placeholders)
+            if used:
+                self.categories[ing] = used
+
+    def render(self, available_ingredients: Sequence[str]) -> List[str]:
+        """Render every line with placeholders filled from the available ingredients"""
+        if not self.placeholders:
+            return [line for line, _ in self.lines]
+        fillers = fill_placeholders(self.placeholders, available_ingredients, self.categories)
+        return [line.format_map(fillers) if templated else line for line, templated in self.lines]
@@ -0,0 +1,190 @@
+"""
+Metrics - Prometheus request latency, generation stage and Mongo operation metrics
+"""
+import threading
+import time
+from typing import Dict, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from pymongo import monitoring
+
+# Request latencies span cache hits (sub-millisecond) to large streamed listings (seconds)
+REQUEST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Generator stages are typically tens of microseconds
+STAGE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1)
+
+UNMATCHED_ROUTE = "unmatched"
+
+class Metrics:
+    """All application metrics, kept in their own registry"""
+
+    def __init__(self):
+        self.registry = CollectorRegistry()
+        self.requests = Counter(
+            "http_requests_total", "HTTP requests by route and status code",
+            ["method", "route", "status"], registry=self.registry
+        )
+        self.request_latency = Histogram(
+            "http_request_duration_seconds", "Time from request start to the last response byte",
+            ["method", "route"], buckets=REQUEST_BUCKETS, registry=self.registry
+        )
+        self.in_flight = Gauge(
+            "http_requests_in_flight", "HTTP requests currently being served",
+            ["method"], registry=self.registry
+        )
+        self.stage_latency = Histogram(
+            "recipe_generation_stage_seconds", "Time spent in each recipe generation stage",
+            ["stage"], buckets=STAGE_BUCKETS, registry=self.registry
+        )
+        self.mongo_latency = Histogram(
+            "mongo_operation_duration_seconds", "MongoDB command round-trip time",
+            ["collection", "command"], buckets=REQUEST_BUCKETS, registry=self.registry
+        )
+        self.mongo_failures = Counter(
+            "mongo_operation_failures_total", "MongoDB commands that returned an error",
+            ["collection", "command"], registry=self.registry
+        )
+        # Labelled children resolved once per stage; labels() takes a lock on every call
+        self._stage_children: Dict[str, Histogram] = {}
+
+    def observe_stage(self, stage: str, seconds: float):
+        child = self._stage_children.get(stage)
+        if child is None:
+            child = self._stage_children[stage] = self.stage_latency.labels(stage)
+        child.observe(seconds)
+
+    def register_generation_stats(self, executor):
+        """Export recipe cache counters and generation queue depth, read at scrape time"""
+        self.registry.register(GenerationStatsCollector(executor))
+
+    def register_analytics_stats(self, buffer):
+        """Export analytics buffer depth and event outcomes, read at scrape time"""
+        self.registry.register(AnalyticsStatsCollector(buffer))
+
+    def register_pool_stats(self, pool_stats):
+        """Export MongoDB connection pool occupancy and events, read at scrape time"""
+        self.registry.register(PoolStatsCollector(pool_stats))
+
+    def render(self) -> Tuple[bytes, str]:
+        """Return (body, content type) in the Prometheus text exposition format"""
+        return generate_latest(self.registry), CONTENT_TYPE_LATEST
+
+class GenerationStatsCollector:
+    """Reads GenerationExecutor and in-process RecipeCache stats when Prometheus scrapes"""
+
+    def __init__(self, executor):
+        self.executor = executor
+
+    def collect(self):
+        # A scrape must not load the catalog, so the cache is only reported once the generator exists
+        generator = self.executor.loaded_generator
+        cache = generator.cache if generator is not None else None
+        if cache is not None:
+            stats = cache.stats()
+            for name in ("hits", "misses", "evictions", "expirations"):
+                yield CounterMetricFamily(f"recipe_cache_{name}", f"Recipe cache {name}", value=stats[name])
+            yield GaugeMetricFamily("recipe_cache_size", "Entries in the recipe cache", value=stats["size"])
+        stats = self.executor.stats()
+        yield GaugeMetricFamily("generation_pending", "Generation calls running or queued", value=stats["pending"])
+        yield CounterMetricFamily("generation_rejected", "Generation calls rejected as saturated", value=stats["rejected"])
+
+class AnalyticsStatsCollector:
+    """Reads AnalyticsBuffer counters when Prometheus scrapes"""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    def collect(self):
+        stats = self.buffer.stats()
+        yield GaugeMetricFamily("analytics_events_queued", "Analytics events waiting to be written", value=stats["queued"])
+        events = CounterMetricFamily("analytics_events", "Analytics events by outcome", labels=["outcome"])
+        for outcome in ("recorded", "dropped", "written", "failed", "rollup_failed"):
+            events.add_metric([outcome], stats[outcome])
+        yield events
+        yield CounterMetricFamily("analytics_flushes", "Analytics batch writes attempted", value=stats["flushes"])
+
+class PoolStatsCollector:
+    """Reads MongoDB connection pool counters when Prometheus scrapes"""
+
+    def __init__(self, pool_stats):
+        self.pool_stats = pool_stats
+
+    def collect(self):
+        stats = self.pool_stats.stats()
+        connections = GaugeMetricFamily("mongo_pool_connections", "MongoDB connections by state", labels=["state"])
+        for state in ("open", "in_use", "waiting"):
+            connections.add_metric([state], stats[state])
+        yield connections
+        events = CounterMetricFamily("mongo_pool_events", "MongoDB connection pool events", labels=["event"])
+        for event in ("created", "closed", "checkout_failed", "pool_cleared"):
+            events.add_metric([event], stats[event])
+        yield events
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, status counts and in-flight requests.
+
+    Routes are labelled by their path template (e.g. /api/saved-recipes/{recipe_id}),
+    which FastAPI leaves in the scope once routing has run.
+    """
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = self.metrics.in_flight.labels(method)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.dec()
+            route = scope.get("route")
+            route = getattr(route, "path", UNMATCHED_ROUTE)
+            self.metrics.requests.labels(method, route, str(status)).inc()
+            self.metrics.request_latency.labels(method, route).observe(elapsed)
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """pymongo command listener timing every command by collection"""
+
+    def __init__(self, metrics: Metrics):
+        self.metrics = metrics
+        # (connection, request ID) -> collection from the started event; later events only carry the command name
+        self._collections: Dict[Tuple[object, int], str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = (
+                collection if isinstance(collection, str) else ""
+            )
+
+    def _finish(self, event) -> Tuple[str, str]:
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), "")
+        self.metrics.mongo_latency.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        return collection, event.command_name
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self.metrics.mongo_failures.labels(*self._finish(event)).inc()
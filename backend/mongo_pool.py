@@ -0,0 +1,124 @@
+"""
+Mongo Pool - connection pool settings from the environment, pool event counters and warm-up pings
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Dict
+
+import pymongo
+from pymongo import monitoring
+
+# MONGO_* variable -> (client option, default). Values set here override the same option in
+# MONGO_URL. Server selection and connecting fail fast instead of after pymongo's 30 seconds,
+# and MONGO_TIMEOUT_MS bounds every single operation (each getMore of a cursor included), so a
+# slow or unreachable database turns into errors instead of handlers waiting indefinitely.
+# The wait for a pooled connection is part of the operation: while timeoutMS is set pymongo
+# ignores waitQueueTimeoutMS, so MONGO_WAIT_QUEUE_TIMEOUT_MS only applies with MONGO_TIMEOUT_MS=0
+POOL_SETTINGS = {
+    "MONGO_MAX_POOL_SIZE": ("maxPoolSize", 50),
+    "MONGO_MIN_POOL_SIZE": ("minPoolSize", 2),
+    "MONGO_MAX_CONNECTING": ("maxConnecting", 2),
+    "MONGO_MAX_IDLE_TIME_MS": ("maxIdleTimeMS", 300000),
+    "MONGO_WAIT_QUEUE_TIMEOUT_MS": ("waitQueueTimeoutMS", 2000),
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": ("serverSelectionTimeoutMS", 5000),
+    "MONGO_CONNECT_TIMEOUT_MS": ("connectTimeoutMS", 5000),
+    "MONGO_TIMEOUT_MS": ("timeoutMS", 10000),
+}
+
+def client_options_from_env() -> Dict[str, int]:
+    """AsyncIOMotorClient keyword arguments for the MONGO_* pool settings; 0 leaves an option at pymongo's default.
+
+    waitQueueTimeoutMS is left out while timeoutMS is set, since the operation timeout is
+    the one that bounds pool waits then, and reporting both would misstate the limit.
+    """
+    options = {}
+    for variable, (option, default) in POOL_SETTINGS.items():
+        value = int(os.environ.get(variable, str(default)))
+        if value or option == "minPoolSize":
+            options[option] = value
+    if "timeoutMS" in options and options.pop("waitQueueTimeoutMS", None) is not None:
+        if "MONGO_WAIT_QUEUE_TIMEOUT_MS" in os.environ:
+            logging.warning("MONGO_WAIT_QUEUE_TIMEOUT_MS is ignored while MONGO_TIMEOUT_MS is set; "
+                            "pool waits are bounded by MONGO_TIMEOUT_MS")
+    return options
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool events, counted across all servers for health reporting"""
+
+    COUNTERS = ("created", "closed", "checked_out", "checked_in", "checkout_failed", "pool_cleared")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.COUNTERS, 0)
+        self._checkouts_started = 0
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self._counts)
+            started = self._checkouts_started
+        counts["open"] = counts["created"] - counts["closed"]
+        counts["in_use"] = counts["checked_out"] - counts["checked_in"]
+        # Checkouts still waiting for a free connection (or for one to be established)
+        counts["waiting"] = started - counts["checked_out"] - counts["checkout_failed"]
+        return counts
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self._checkouts_started += 1
+
+    def connection_checked_out(self, event):
+        self._count("checked_out")
+
+    def connection_check_out_failed(self, event):
+        self._count("checkout_failed")
+
+    def connection_checked_in(self, event):
+        self._count("checked_in")
+
+    def connection_created(self, event):
+        self._count("created")
+
+    def connection_closed(self, event):
+        self._count("closed")
+
+    def pool_cleared(self, event):
+        self._count("pool_cleared")
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+async def ping(database, timeout: float) -> float:
+    """Round-trip a ping command within timeout seconds and return its latency in milliseconds"""
+    start = time.perf_counter()
+    with pymongo.timeout(timeout):
+        await database.command("ping")
+    return (time.perf_counter() - start) * 1000
+
+async def warm_up(database, attempts: int = 5, timeout: float = 2.0, delay: float = 1.0) -> bool:
+    """Ping until the database answers, so the first requests find the pool connected and the minimum pool filling"""
+    for attempt in range(1, attempts + 1):
+        try:
+            latency = await ping(database, timeout)
+            logging.info(f"MongoDB ready in {attempt} attempt(s), ping {latency:.1f} ms")
+            return True
+        except Exception as e:
+            logging.warning(f"MongoDB warm-up ping {attempt}/{attempts} failed: {str(e)}")
+            if attempt < attempts:
+                await asyncio.sleep(delay * attempt)
+    return False
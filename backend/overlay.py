@@ -0,0 +1,151 @@
+"""
+Overlay - copy-on-write views over catalog sequences and indexes, patched without copying the base
+"""
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Iterator
+
+# Delta value marking a key (or template slot) as deleted from the base
+REMOVED = object()
+
+# An overlay is flattened into a plain dict or list once its delta outgrows this share of
+# the base, so lookups stay cheap and the amortized cost of a patch stays proportional to it
+COMPACT_RATIO = 0.5
+MIN_COMPACT_SIZE = 1024
+
+def _should_compact(delta_size: int, base_size: int) -> bool:
+    return delta_size > max(MIN_COMPACT_SIZE, base_size * COMPACT_RATIO)
+
+class MappingOverlay(Mapping):
+    """Read-only mapping of a base mapping with some keys replaced, added or removed.
+
+    The base is never modified; each patch copies only the delta, so earlier overlays keep
+    answering from the state they were created with.
+    """
+
+    def __init__(self, base: Mapping, delta: Dict[Any, Any], size: int):
+        self._base = base
+        self._delta = delta
+        self._size = size
+
+    def __getitem__(self, key):
+        value = self.get(key, REMOVED)
+        if value is REMOVED:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        if key in self._delta:
+            value = self._delta[key]
+            return default if value is REMOVED else value
+        # Base indexes (e.g. catalog.MappedIndex) only promise get, keys and __contains__
+        return self._base.get(key, default)
+
+    def __contains__(self, key) -> bool:
+        if key in self._delta:
+            return self._delta[key] is not REMOVED
+        return key in self._base
+
+    def __iter__(self) -> Iterator:
+        delta = self._delta
+        for key in self._base.keys():
+            if key not in delta:
+                yield key
+        for key, value in delta.items():
+            if value is not REMOVED:
+                yield key
+
+    def __len__(self) -> int:
+        return self._size
+
+def patch_mapping(mapping: Mapping, changes: Dict[Any, Any]) -> Mapping:
+    """Return mapping with changes applied (REMOVED deletes a key), leaving mapping itself untouched"""
+    if not changes:
+        return mapping
+    if isinstance(mapping, MappingOverlay):
+        base, delta = mapping._base, dict(mapping._delta)
+    else:
+        base, delta = mapping, {}
+
+    size = len(mapping)
+    for key, value in changes.items():
+        present = delta[key] is not REMOVED if key in delta else key in base
+        if value is REMOVED:
+            if not present:
+                continue
+            size -= 1
+            if key in base:
+                delta[key] = REMOVED
+            else:
+                del delta[key]
+        else:
+            if not present:
+                size += 1
+            delta[key] = value
+
+    if _should_compact(len(delta), len(base)):
+        flat = {key: base.get(key) for key in base.keys() if key not in delta}
+        flat.update((key, value) for key, value in delta.items() if value is not REMOVED)
+        return flat
+    return MappingOverlay(base, delta, size)
+
+class SequenceOverlay(Sequence):
+    """Read-only sequence of template slots: a base sequence with slots replaced, appended or emptied.
+
+    Slot positions are template IDs and never move. A removed slot reads as None and is
+    skipped when iterating, so loops over the catalog only see live templates; len()
+    counts every slot and live counts the occupied ones.
+    """
+
+    def __init__(self, base: Sequence, delta: Dict[int, Any], size: int, live: int):
+        self._base = base
+        self._base_size = len(base)
+        self._delta = delta
+        self._size = size
+        self.live = live
+
+    def __getitem__(self, index: int):
+        delta = self._delta
+        if index in delta:
+            return delta[index]
+        if 0 <= index < self._base_size:
+            return self._base[index]
+        if -self._size <= index < 0:
+            return self[index + self._size]
+        raise IndexError("template slot out of range")
+
+    def __iter__(self) -> Iterator:
+        for index in range(self._size):
+            item = self[index]
+            if item is not None:
+                yield item
+
+    def __len__(self) -> int:
+        return self._size
+
+def live_count(sequence: Sequence) -> int:
+    """Number of occupied template slots"""
+    return sequence.live if isinstance(sequence, SequenceOverlay) else len(sequence)
+
+def patch_sequence(sequence: Sequence, changes: Dict[int, Any]) -> Sequence:
+    """Return sequence with slots replaced (None empties a slot); IDs past the end are appended in order"""
+    if not changes:
+        return sequence
+    if isinstance(sequence, SequenceOverlay):
+        base, delta = sequence._base, dict(sequence._delta)
+    else:
+        base, delta = sequence, {}
+
+    size, live = len(sequence), live_count(sequence)
+    for index in sorted(changes):
+        item = changes[index]
+        if index > size:
+            raise IndexError(f"template slot {index} would leave a gap after {size - 1}")
+        was_live = index < size and sequence[index] is not None
+        live += (item is not None) - was_live
+        size = max(size, index + 1)
+        delta[index] = item
+
+    if _should_compact(len(delta), len(base)):
+        flat = [delta[index] if index in delta else base[index] for index in range(size)]
+        return SequenceOverlay(flat, {}, size, live)
+    return SequenceOverlay(base, delta, size, live)
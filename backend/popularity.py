@@ -0,0 +1,192 @@
+"""
+Popularity - offline per-template save rates and ingredient co-occurrence, precomputed for ranking
+
+The job reads every saved recipe, plus the generation events in recipe_analytics to learn
+how often each recipe was shown, and gives every catalog template one score from 0 to 255:
+
+    save rate     saves / times shown, smoothed towards the catalog-wide rate so a recipe
+                  shown twice and saved once does not outrank one saved thousands of times
+                  (falls back to log-scaled save counts when no generation events exist)
+    co-occurrence how often the template's primary ingredients appear together among the
+                  available ingredients of saved recipes, so templates nobody has saved yet
+                  still rank by how well their combination matches what people cook with
+
+The generator loads the table once at startup (RECIPE_POPULARITY), aligns it to template
+IDs and uses it as a bounded boost and a tiebreak, so ranking reads nothing per request.
+
+Layout (little-endian):
+
+    header   magic, version, n_templates, saved recipes counted
+    lengths  uint32[n_templates] UTF-8 byte length of each template name
+    scores   uint8[n_templates]
+    names    UTF-8 template names, back to back
+
+Usage:
+    MONGO_URL=mongodb://localhost:27017 DB_NAME=shelfchef python -m popularity build -o data/popularity.bin
+"""
+import argparse
+import math
+import os
+import struct
+import sys
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+MAGIC = b"SHPOPUL\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQ")
+
+# Scores are stored in one byte; a template at MAX_SCORE gets the full ranking boost
+MAX_SCORE = 255
+# Share of the score that comes from save rates; the rest comes from ingredient co-occurrence
+SAVE_WEIGHT = 0.75
+# Impressions worth of catalog-wide save rate every template's own rate starts from
+PRIOR_IMPRESSIONS = 20
+
+class PopularityError(ValueError):
+    """Raised for files that are not popularity tables"""
+
+def boost_points(score: int, max_boost: int) -> int:
+    """Match percentage points a template with this score gains when ranked"""
+    return score * max_boost // MAX_SCORE
+
+class PopularityTable:
+    """Popularity score (0-MAX_SCORE) by template name; templates not in the table score 0"""
+
+    def __init__(self, scores: Dict[str, int], saves: int = 0):
+        self.scores = scores
+        self.saves = saves
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def get(self, name: str) -> int:
+        return self.scores.get(name, 0)
+
+    def aligned(self, names: Iterable[Optional[str]]) -> bytearray:
+        """Scores in template ID order for the given template names (None for an empty slot)"""
+        scores = self.scores
+        return bytearray(scores.get(name, 0) if name is not None else 0 for name in names)
+
+    def write(self, output: Path) -> Path:
+        output = Path(output)
+        names = [name.encode("utf-8") for name in self.scores]
+        lengths = array("I", (len(name) for name in names))
+        if sys.byteorder != "little":
+            lengths.byteswap()
+        body = bytearray(HEADER.pack(MAGIC, VERSION, len(names), self.saves))
+        body += lengths.tobytes()
+        body += bytes(self.scores.values())
+        body += b"".join(names)
+        tmp = output.with_suffix(output.suffix + ".tmp")
+        tmp.write_bytes(bytes(body))
+        tmp.replace(output)
+        return output
+
+    @classmethod
+    def load(cls, path: Path) -> "PopularityTable":
+        data = Path(path).read_bytes()
+        if len(data) < HEADER.size:
+            raise PopularityError(f"{path} is not a popularity table")
+        magic, version, count, saves = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise PopularityError(f"{path} is not a popularity table")
+        if version != VERSION:
+            raise PopularityError(f"{path} has unsupported popularity table version {version}")
+        offset = HEADER.size
+        lengths = array("I", data[offset:offset + count * 4])
+        if sys.byteorder != "little":
+            lengths.byteswap()
+        offset += count * 4
+        values = data[offset:offset + count]
+        offset += count
+        scores = {}
+        for length, score in zip(lengths, values):
+            scores[data[offset:offset + length].decode("utf-8")] = score
+            offset += length
+        return cls(scores, saves)
+
+def _save_rates(saves: Counter, impressions: Mapping[str, int]) -> Dict[str, float]:
+    """Per-name save rate scaled to 0-1 (the best template gets 1)"""
+    if not saves:
+        return {}
+    shown = sum(impressions.values())
+    if not shown:
+        # Without impressions, popularity is the save count itself, log-scaled
+        top = math.log1p(max(saves.values()))
+        return {name: math.log1p(count) / top for name, count in saves.items()}
+    base_rate = min(1.0, sum(saves.values()) / shown)
+    rates = {
+        name: (count + PRIOR_IMPRESSIONS * base_rate) / (max(impressions.get(name, 0), count) + PRIOR_IMPRESSIONS)
+        for name, count in saves.items()
+    }
+    top = max(rates.values())
+    return {name: rate / top for name, rate in rates.items()}
+
+def _pack_pair(first: int, second: int) -> int:
+    """One int key for an unordered pair of ingredient IDs"""
+    return (first << 32 | second) if first < second else (second << 32 | first)
+
+def compute_popularity(saved_recipes: Iterable[Mapping], templates: Sequence, normalize: Callable[[str], str],
+                       impressions: Optional[Mapping[str, int]] = None) -> PopularityTable:
+    """Score catalog templates from saved recipe documents and per-name impression counts"""
+    saves: Counter = Counter()
+    # Ingredient pair co-occurrence; pairs are keyed by packed ints rather than tuples of strings
+    ingredient_ids: Dict[str, int] = {}
+    pairs: Counter = Counter()
+    for document in saved_recipes:
+        saves[document["name"]] += 1
+        ids = sorted({ingredient_ids.setdefault(normalize(ing), len(ingredient_ids))
+                      for ing in document.get("available_ingredients", ())})
+        for i, first in enumerate(ids):
+            for second in ids[i + 1:]:
+                pairs[first << 32 | second] += 1
+    rates = _save_rates(saves, impressions or {})
+    top_pair = max(pairs.values(), default=0)
+
+    scores: Dict[str, int] = {}
+    for template in templates:
+        if template is None:
+            continue
+        support = 0.0
+        primary = {normalize(ing) for ing in template.primary_ingredients}
+        possible = len(primary) * (len(primary) - 1) // 2
+        if top_pair and possible:
+            ids = [ingredient_ids[ing] for ing in primary if ing in ingredient_ids]
+            total = sum(pairs.get(_pack_pair(first, second), 0) for i, first in enumerate(ids) for second in ids[i + 1:])
+            support = total / (possible * top_pair)
+        score = round(MAX_SCORE * (SAVE_WEIGHT * rates.get(template.name, 0.0) + (1 - SAVE_WEIGHT) * support))
+        if score:
+            scores[template.name] = score
+    return PopularityTable(scores, sum(saves.values()))
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Precompute recipe popularity from saved recipes")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build_parser = subcommands.add_parser("build", help="score the catalog from MONGO_URL/DB_NAME and write a table")
+    build_parser.add_argument("-o", "--output", type=Path, required=True)
+    build_parser.add_argument("--catalog", type=Path, help="catalog to score (defaults to the bundled catalog)")
+    args = parser.parse_args(argv)
+
+    from pymongo import MongoClient
+
+    from recipe_generator import SmartRecipeGenerator
+
+    generator = SmartRecipeGenerator(catalog_path=args.catalog, fuzzy_matching=False)
+    database = MongoClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))[os.environ.get("DB_NAME", "shelfchef")]
+    impressions = {
+        row["_id"]: row["count"] for row in database.recipe_analytics.aggregate([
+            {"$match": {"type": "generate"}},
+            {"$unwind": "$recipes"},
+            {"$group": {"_id": "$recipes", "count": {"$sum": 1}}},
+        ])
+    }
+    saved = database.saved_recipes.find({}, {"_id": 0, "name": 1, "available_ingredients": 1})
+    table = compute_popularity(saved, generator.recipe_templates, generator.normalize_ingredient, impressions)
+    table.write(args.output)
+    print(f"Scored {len(table)} of {len(generator.recipe_templates)} templates from {table.saves} saved recipes into {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,85 @@
 """
 Smart Recipe Generator - Fallback solution for generating recipes without external APIs
 """
+import bisect
+import contextlib
+import copy
+import functools
+import heapq
+import os
 import random
-from typing import List, Dict, Tuple
+import time
+import zlib
+from typing import Callable, Iterator, List, Dict, FrozenSet, Mapping, Optional, Sequence, Set, Tuple
 from pydantic import BaseModel
 
+from cookable_index import CookableIndex
+from ingredient_normalizer import IngredientMatcher, make_normalizer, normalize_substitutions
+from instruction_renderer import CompiledInstructions
+from overlay import REMOVED, live_count, patch_mapping, patch_sequence
+from popularity import MAX_SCORE, PopularityTable
+from recipe_cache import RecipeCache
+
+# Most match percentage points a template's popularity can add to its ranking score
+DEFAULT_POPULARITY_BOOST = 5
+
+# Common basic ingredients that are often needed
+BASIC_INGREDIENTS = ["salt", "pepper", "oil", "butter"]
+
+EMPTY_SET: FrozenSet[str] = frozenset()
+
+def _percentage(matches: int, size: int) -> int:
+    """Match percentage as computed by calculate_match_percentage"""
+    if not size:
+        return 100
+    return min(100, int((matches / size) * 100))
+
+def _patch_postings(index: Mapping[str, Sequence[int]], old: Dict[int, Optional["CompiledTemplate"]],
+                    new: Dict[int, Optional["CompiledTemplate"]], keys_of: Callable) -> Mapping[str, Sequence[int]]:
+    """Return index with the postings of changed templates moved from their old keys to their new ones"""
+    additions: Dict[str, Set[int]] = {}
+    removals: Dict[str, Set[int]] = {}
+    for template_id, compiled in new.items():
+        before = old.get(template_id)
+        old_keys = keys_of(before) if before is not None else EMPTY_SET
+        new_keys = keys_of(compiled) if compiled is not None else EMPTY_SET
+        for key in old_keys - new_keys:
+            removals.setdefault(key, set()).add(template_id)
+        for key in new_keys - old_keys:
+            additions.setdefault(key, set()).add(template_id)
+    
+    changes = {}
+    for key in additions.keys() | removals.keys():
+        dropped = removals.get(key, EMPTY_SET)
+        postings = [template_id for template_id in index.get(key, ()) if template_id not in dropped]
+        for template_id in additions.get(key, ()):
+            bisect.insort(postings, template_id)
+        changes[key] = postings if postings else REMOVED
+    return patch_mapping(index, changes)
+
+class CatalogUpdateError(ValueError):
+    """Raised for catalog changes that do not fit the current catalog"""
+
+class UnsupportedCatalogUpdate(CatalogUpdateError):
+    """Raised when the running generator configuration cannot apply catalog changes at all"""
+
+class StageTimer:
+    """Reports the wall time of one generation stage to an observer"""
+    __slots__ = ("observer", "stage", "start")
+    
+    def __init__(self, observer: Callable[[str, float], None], stage: str):
+        self.observer = observer
+        self.stage = stage
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+    
+    def __exit__(self, *exc_info):
+        self.observer(self.stage, time.perf_counter() - self.start)
+
+# Shared no-op timer used while no stage observer is attached
+NO_STAGE_TIMER = contextlib.nullcontext()
+
 class Recipe(BaseModel):
     name: str
     description: str
@@ -17,6 +92,19 @@ class Recipe(BaseModel):
     match_percentage: int
     image_url: str = ""
 
+class CookableRecipe(BaseModel):
+    name: str
+    description: str
+    cook_time: str
+    servings: str
+    difficulty: str
+    category: str
+    available_ingredients: List[str]
+    missing_ingredients: List[str]
+    missing_count: int
+    instructions: List[str]
+    image_url: str = ""
+
 class RecipeTemplate:
     def __init__(self, name: str, description: str, primary_ingredients: List[str], 
                  optional_ingredients: List[str], cook_time: str, servings: str, 
@@ -33,10 +121,359 @@ class RecipeTemplate:
         self.category = category
         self.image_url = image_url
 
+class CompiledTemplate:
+    """Normalized, set-based form of a RecipeTemplate built once at load time"""
+    __slots__ = (
+        "template_id", "template", "primary", "optional", "ingredients",
+        "primary_counts", "ingredient_counts", "primary_size", "total_size",
+        "substitutes", "reverse_substitutes", "reverse_primary_substitutes", "_instructions"
+    )
+    
+    def __init__(self, template_id: int, template: RecipeTemplate, normalize, substitutions: Dict[str, FrozenSet[str]]):
+        self.template_id = template_id
+        self.template = template
+        
+        all_ingredients = template.primary_ingredients + template.optional_ingredients
+        # (raw, normalized) pairs in recipe order, used when rendering results
+        self.ingredients: Tuple[Tuple[str, str], ...] = tuple((ing, normalize(ing)) for ing in all_ingredients)
+        normalized_primary = [normalize(ing) for ing in template.primary_ingredients]
+        
+        self.primary: FrozenSet[str] = frozenset(normalized_primary)
+        self.optional: FrozenSet[str] = frozenset(normalize(ing) for ing in template.optional_ingredients)
+        
+        # Multiplicities keep percentages identical to the list-based path for repeated ingredients
+        self.primary_counts: Dict[str, int] = {}
+        for normalized in normalized_primary:
+            self.primary_counts[normalized] = self.primary_counts.get(normalized, 0) + 1
+        self.ingredient_counts: Dict[str, int] = {}
+        for _, normalized in self.ingredients:
+            self.ingredient_counts[normalized] = self.ingredient_counts.get(normalized, 0) + 1
+        self.primary_size = len(template.primary_ingredients)
+        self.total_size = len(all_ingredients)
+        
+        # Substitutes per recipe ingredient, and the reverse map from substitute to recipe ingredients
+        self.substitutes: Dict[str, FrozenSet[str]] = {}
+        self.reverse_substitutes: Dict[str, FrozenSet[str]] = {}
+        reverse: Dict[str, Set[str]] = {}
+        for normalized in self.ingredient_counts:
+            subs = substitutions.get(normalized)
+            if subs:
+                self.substitutes[normalized] = subs
+                for sub in subs:
+                    reverse.setdefault(sub, set()).add(normalized)
+        for sub, covered in reverse.items():
+            self.reverse_substitutes[sub] = frozenset(covered)
+        self.reverse_primary_substitutes: Dict[str, FrozenSet[str]] = {}
+        for sub, covered in reverse.items():
+            covered_primary = covered & self.primary
+            if covered_primary:
+                self.reverse_primary_substitutes[sub] = frozenset(covered_primary)
+        
+        self._instructions: Optional[CompiledInstructions] = None
+    
+    @property
+    def instructions(self) -> CompiledInstructions:
+        """Parsed instructions, built the first time this template is rendered"""
+        if self._instructions is None:
+            self._instructions = CompiledInstructions(self.template.instructions_template)
+        return self._instructions
+    
+    def index_keys(self) -> FrozenSet[str]:
+        """Primary ingredients and their substitutes: the ingredient index keys this template is listed under"""
+        keys = set(self.primary)
+        for normalized in self.primary:
+            keys.update(self.substitutes.get(normalized, EMPTY_SET))
+        return frozenset(keys)
+    
+    def ingredient_keys(self) -> FrozenSet[str]:
+        """Every distinct normalized recipe ingredient, primary or optional"""
+        return frozenset(self.ingredient_counts)
+    
+    def covered_ingredients(self, user_set: FrozenSet[str]) -> Set[str]:
+        """Return the normalized recipe ingredients the user has directly or through a substitute"""
+        covered = set(self.ingredient_counts.keys() & user_set)
+        reverse = self.reverse_substitutes
+        for user_ing in user_set:
+            recipe_ings = reverse.get(user_ing)
+            if recipe_ings:
+                covered |= recipe_ings
+        return covered
+    
+    def primary_coverage(self, user_set: FrozenSet[str]) -> Tuple[int, int]:
+        """Return (primary_match, upper bound on overall_match) without scoring optional ingredients"""
+        covered = set(self.primary & user_set)
+        reverse = self.reverse_primary_substitutes
+        if reverse:
+            for user_ing in user_set:
+                recipe_ings = reverse.get(user_ing)
+                if recipe_ings:
+                    covered |= recipe_ings
+        
+        primary_counts = self.primary_counts
+        primary_match = _percentage(sum(primary_counts[ing] for ing in covered), self.primary_size)
+        
+        # Uncovered primary ingredients can never count towards the overall match
+        ingredient_counts = self.ingredient_counts
+        missed = sum(ingredient_counts[ing] for ing in primary_counts if ing not in covered)
+        return primary_match, _percentage(self.total_size - missed, self.total_size)
+    
+    def overall_match(self, user_set: FrozenSet[str]) -> int:
+        """Return the overall match percentage for a set of normalized user ingredients"""
+        ingredient_counts = self.ingredient_counts
+        matches = sum(ingredient_counts[ing] for ing in self.covered_ingredients(user_set))
+        return _percentage(matches, self.total_size)
+    
+    def match_percentages(self, user_set: FrozenSet[str]) -> Tuple[int, int]:
+        """Return (overall_match, primary_match) for a set of normalized user ingredients"""
+        return self.overall_match(user_set), self.primary_coverage(user_set)[0]
+    
+    def find_available(self, user_ingredients: List[str], normalized_user: List[str]) -> List[str]:
+        """Find which recipe ingredients the user has, matching find_available_ingredients"""
+        return self.match_available(user_ingredients, normalized_user)[0]
+    
+    def match_available(self, user_ingredients: List[str], normalized_user: List[str]) -> Tuple[List[str], Set[str]]:
+        """Return the available ingredients and their normalized names"""
+        user_set = set(normalized_user)
+        available = []
+        available_normalized = set()
+        
+        for ing, normalized in self.ingredients:
+            if normalized in user_set:
+                available.append(ing)
+                available_normalized.add(normalized)
+            else:
+                subs = self.substitutes.get(normalized)
+                if subs and not subs.isdisjoint(user_set):
+                    # The first user ingredient (in input order) that substitutes wins
+                    for user_ing, normalized_user_ing in zip(user_ingredients, normalized_user):
+                        if normalized_user_ing in subs:
+                            available.append(user_ing)
+                            available_normalized.add(normalized_user_ing)
+                            break
+        
+        return available, available_normalized
+    
+    def find_missing(self, available_normalized: Set[str]) -> List[str]:
+        """Generate the missing ingredient list, matching generate_missing_ingredients"""
+        missing = []
+        for ing, normalized in self.ingredients:
+            if normalized not in available_normalized:
+                if self.substitutes.get(normalized, EMPTY_SET).isdisjoint(available_normalized):
+                    missing.append(ing)
+        
+        for basic in BASIC_INGREDIENTS:
+            if basic not in available_normalized and basic not in missing:
+                missing.append(basic)
+        
+        return missing[:4]  # Limit to 4 missing ingredients
+
+# Compiled templates a memory-mapped catalog keeps per worker (RECIPE_COMPILED_CACHE_SIZE)
+COMPILED_CACHE_SIZE = 4096
+
+class LazyCompiledTemplates:
+    """Sequence of CompiledTemplate built on access, for memory-mapped catalogs.
+
+    Only the max_size most recently used templates stay compiled, so per-worker memory
+    stays bounded however much of the catalog queries touch; full scans (the cookable and
+    ingredient indexes, the numpy scorer) compile templates one at a time and let them go.
+    """
+    
+    def __init__(self, templates: Sequence[RecipeTemplate], compile_template: Callable[[int, RecipeTemplate], CompiledTemplate],
+                 max_size: int = COMPILED_CACHE_SIZE):
+        self._templates = templates
+        self._compile = compile_template
+        # functools' LRU is thread-safe, which thread-mode generation needs
+        self._compiled = functools.lru_cache(maxsize=max_size)(self._compile_id)
+    
+    def _compile_id(self, template_id: int) -> CompiledTemplate:
+        return self._compile(template_id, self._templates[template_id])
+    
+    def __len__(self) -> int:
+        return len(self._templates)
+    
+    def __getitem__(self, template_id: int) -> CompiledTemplate:
+        return self._compiled(template_id)
+    
+    def cached(self) -> int:
+        """Number of templates currently kept compiled"""
+        return self._compiled.cache_info().currsize
+    
+    def __iter__(self):
+        # Full scans compile without caching, so they neither grow nor flush the hot set
+        for template_id in range(len(self._templates)):
+            yield self._compile_id(template_id)
+
+# Rank keys pack (ranking score, primary match, popularity, earlier template first) into one
+# int, so heap entries are plain ints and rejecting a candidate compares two ints. Template
+# IDs are uint32 (as in the binary catalog) and popularity scores one byte
+ID_SPACE = 1 << 32
+POPULARITY_SPACE = MAX_SCORE + 1
+PRIMARY_SCALE = POPULARITY_SPACE * ID_SPACE
+OVERALL_SCALE = 101 * PRIMARY_SCALE
+
+class TopKSelector:
+    """Bounded heap keeping the k best candidates by (overall, primary, catalog order).
+
+    Candidates may be pushed in any order. Ties on both percentages go to the lower
+    template ID, which is what a stable sort over the catalog produced. A candidate whose
+    overall upper bound cannot beat the current k-th entry is skipped before its optional
+    ingredients are scored.
+
+    With popularity scores (bytes by template ID), a template ranks as if its overall match
+    were boost_points(score, boost) points higher, and popularity breaks ties before
+    catalog order does. Returned match percentages are never boosted.
+    """
+    __slots__ = ("user_set", "k", "heap", "admitted", "popularity", "boost")
+    
+    def __init__(self, user_set: FrozenSet[str], k: int, popularity: Optional[Sequence[int]] = None, boost: int = 0):
+        self.user_set = user_set
+        self.k = k
+        self.heap: List[int] = []
+        # (compiled, overall, primary) of every candidate that entered the heap, by template ID
+        self.admitted: Dict[int, Tuple[CompiledTemplate, int, int]] = {}
+        self.popularity = popularity
+        self.boost = boost
+    
+    def push(self, compiled: CompiledTemplate):
+        k = self.k
+        if k <= 0:
+            return
+        heap = self.heap
+        user_set = self.user_set
+        primary_match, overall_bound = compiled.primary_coverage(user_set)
+        
+        # Only include recipes where we have at least one primary ingredient
+        if primary_match == 0:
+            return
+        
+        template_id = compiled.template_id
+        popularity = self.popularity
+        if popularity is None:
+            bonus = 0
+            low = primary_match * PRIMARY_SCALE + (ID_SPACE - 1 - template_id)
+        else:
+            score = popularity[template_id] if template_id < len(popularity) else 0
+            bonus = score * self.boost // MAX_SCORE
+            low = primary_match * PRIMARY_SCALE + score * ID_SPACE + (ID_SPACE - 1 - template_id)
+        if len(heap) == k and (overall_bound + bonus) * OVERALL_SCALE + low <= heap[0]:
+            return
+        
+        overall_match = compiled.overall_match(user_set)
+        key = (overall_match + bonus) * OVERALL_SCALE + low
+        if len(heap) < k:
+            heapq.heappush(heap, key)
+        elif key > heap[0]:
+            heapq.heapreplace(heap, key)
+        else:
+            return
+        self.admitted[template_id] = (compiled, overall_match, primary_match)
+    
+    def results(self) -> List[Tuple[CompiledTemplate, int, int]]:
+        """Return (compiled template, overall_match, primary_match), best first"""
+        admitted = self.admitted
+        return [admitted[ID_SPACE - 1 - key % ID_SPACE] for key in sorted(self.heap, reverse=True)]
+
+def select_top_k(candidates, user_set: FrozenSet[str], k: int, popularity: Optional[Sequence[int]] = None,
+                 boost: int = 0) -> List[Tuple[CompiledTemplate, int, int]]:
+    """Stream candidates through a TopKSelector and return the k best"""
+    selector = TopKSelector(user_set, k, popularity, boost)
+    for compiled in candidates:
+        selector.push(compiled)
+    return selector.results()
+
+# RECIPE_* variables that determine generated recipes; the generation ETag fingerprint covers them
+GENERATION_ENV_VARIABLES = (
+    'RECIPE_CATALOG', 'RECIPE_NORMALIZER', 'RECIPE_LEXICON', 'RECIPE_FUZZY_MATCHING', 'RECIPE_JITTER_SEED',
+    'RECIPE_POPULARITY', 'RECIPE_POPULARITY_BOOST'
+)
+
+def generator_settings_from_env() -> Dict[str, object]:
+    """RECIPE_* settings shared by SmartRecipeGenerator.from_env and ShardedRecipeEngine.from_env"""
+    # Seeded by default so identical requests get identical responses (see http_cache); empty for random
+    jitter_seed = os.environ.get('RECIPE_JITTER_SEED', '0')
+    return {
+        "catalog_path": os.environ.get('RECIPE_CATALOG') or None,
+        "normalizer": os.environ.get('RECIPE_NORMALIZER', 'lexicon'),
+        "lexicon_path": os.environ.get('RECIPE_LEXICON') or None,
+        "fuzzy_matching": os.environ.get('RECIPE_FUZZY_MATCHING', '1') != '0',
+        "scoring_backend": os.environ.get('RECIPE_SCORING_BACKEND', 'python'),
+        "jitter_seed": int(jitter_seed) if jitter_seed else None,
+        "popularity_path": os.environ.get('RECIPE_POPULARITY') or None,
+        "popularity_boost": int(os.environ.get('RECIPE_POPULARITY_BOOST', str(DEFAULT_POPULARITY_BOOST))),
+    }
+
 class SmartRecipeGenerator:
-    def __init__(self):
-        self.recipe_templates = self._create_recipe_templates()
-        self.ingredient_substitutions = self._create_ingredient_substitutions()
+    SCORING_BACKENDS = ("python", "numpy")
+    
+    def __init__(self, templates: Optional[Sequence[RecipeTemplate]] = None, use_index: bool = True,
+                 scoring_backend: str = "python", cache: Optional[RecipeCache] = None,
+                 jitter_seed: Optional[int] = None, substitutions: Optional[Dict[str, List[str]]] = None,
+                 catalog_path: Optional[str] = None, normalizer=None, fuzzy_matching: bool = True,
+                 stage_observer: Optional[Callable[[str, float], None]] = None,
+                 popularity: Optional[PopularityTable] = None, popularity_boost: int = DEFAULT_POPULARITY_BOOST,
+                 compiled_cache_size: int = COMPILED_CACHE_SIZE):
+        if scoring_backend not in self.SCORING_BACKENDS:
+            raise ValueError(f"Unknown scoring backend: {scoring_backend}")
+        
+        # Templates and substitutions come from the recipe catalog unless given explicitly
+        from catalog import MappedCatalog, open_catalog
+        if templates is None:
+            templates, catalog_substitutions = open_catalog(catalog_path)
+            if substitutions is None:
+                substitutions = catalog_substitutions
+        elif substitutions is None:
+            substitutions = open_catalog()[1]
+        
+        # Recipe ingredients, substitutions and user input all go through the same normalizer
+        self.normalizer = normalizer if normalizer is not None else make_normalizer()
+        self.recipe_templates = templates
+        self.ingredient_substitutions = substitutions
+        self.substitution_sets = normalize_substitutions(substitutions, self.normalize_ingredient)
+        mapped = isinstance(templates, MappedCatalog)
+        if mapped:
+            # Compile on use so neither startup cost nor worker memory grows with the catalog
+            self.compiled_templates = LazyCompiledTemplates(templates, self._compile_template, compiled_cache_size)
+        else:
+            self.compiled_templates = [
+                self._compile_template(template_id, template) for template_id, template in enumerate(templates)
+            ]
+        self.use_index = use_index
+        if mapped and substitutions is templates.substitutions and templates.fingerprint == self.normalization_fingerprint:
+            self.ingredient_index = templates.primary_index()
+        else:
+            self.ingredient_index = self._build_ingredient_index()
+        # User input that is not a known ingredient falls back to suffix and typo-tolerant matching
+        self.ingredient_matcher = None
+        if fuzzy_matching:
+            vocabulary = set(self.ingredient_index.keys()) | set(self.normalizer.vocabulary)
+            for ing, subs in self.substitution_sets.items():
+                vocabulary.add(ing)
+                vocabulary.update(subs)
+            self.ingredient_matcher = IngredientMatcher(self.normalize_ingredient, vocabulary, self.normalizer.synonyms,
+                                                        modifiers=self.normalizer.modifiers)
+        self.scoring_backend = scoring_backend
+        self.vector_scorer = None
+        if scoring_backend == "numpy":
+            # Imported here so the default backend does not pay for numpy
+            from vector_scoring import VectorScorer
+            self.vector_scorer = VectorScorer(self.compiled_templates)
+        # Ranked results are cached per canonical pantry; a jitter seed makes match percentages
+        # a pure function of (seed, pantry, template) so cached and fresh responses agree
+        self.cache = cache
+        self.jitter_seed = jitter_seed
+        # Called with (stage, seconds) for parse, normalize, candidates, score, rank, rank_batch, cookable and render
+        self.stage_observer = stage_observer
+        self._cookable_index: Optional[CookableIndex] = None
+        # Bumped by every apply_changes; the name and full ingredient indexes are built on first need
+        self.catalog_version = 0
+        self._template_ids: Optional[Mapping[str, int]] = None
+        self._ingredient_templates: Optional[Mapping[str, Sequence[int]]] = None
+        # Precomputed popularity (see popularity.py) as one byte per template ID, used by ranking
+        self.popularity = popularity
+        self.popularity_boost = popularity_boost
+        self.popularity_scores: Optional[bytearray] = None
+        if popularity is not None:
+            self.popularity_scores = popularity.aligned(self._template_names())
         self.cooking_methods = {
             "sauté": "Heat oil in a pan over medium heat",
             "boil": "Bring water to a boil",
@@ -45,207 +482,65 @@ class SmartRecipeGenerator:
             "steam": "Set up steamer over boiling water"
         }
         
-    def _create_recipe_templates(self) -> List[RecipeTemplate]:
-        """Create a comprehensive database of recipe templates with food images"""
-        return [
-            RecipeTemplate(
-                name="Classic Omelet",
-                description="A fluffy omelet with fresh ingredients",
-                primary_ingredients=["eggs"],
-                optional_ingredients=["cheese", "tomato", "onion", "spinach", "mushrooms", "bell pepper"],
-                cook_time="8-10 mins",
-                servings="2 servings",
-                difficulty="Easy",
-                instructions_template=[
-                    "Beat {eggs_count} eggs in a bowl and season with salt and pepper",
-                    "Heat butter in a non-stick pan over medium heat",
-                    "Pour beaten eggs into the pan and let set for 2-3 minutes",
-                    "Add {fillings} to one half of the omelet",
-                    "Fold omelet in half and slide onto plate",
-                    "Serve immediately while hot"
-                ],
-                category="breakfast",
-                image_url="https://images.unsplash.com/photo-1482049016688-2d3e1b311543?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2NzR8MHwxfHNlYXJjaHwxfHxmb29kfGVufDB8fHx8MTc1Mzc2NzU5MXww&ixlib=rb-4.1.0&q=85"
-            ),
-            RecipeTemplate(
-                name="Fried Rice",
-                description="A satisfying stir-fried rice dish with vegetables and protein",
-                primary_ingredients=["rice"],
-                optional_ingredients=["chicken", "eggs", "onion", "garlic", "soy sauce", "vegetables"],
-                cook_time="15-20 mins",
-                servings="4 servings",
-                difficulty="Medium",
-                instructions_template=[
-                    "Cook rice according to package instructions and let cool",
-                    "Heat oil in a large wok or pan over high heat",
-                    "Add {protein} and cook until done, remove and set aside",
-                    "Add {aromatics} and stir-fry for 1-2 minutes",
-                    "Add cold rice and stir-fry, breaking up any clumps",
-                    "Return {protein} to pan and add {seasonings}",
-                    "Stir-fry for 3-4 minutes until heated through",
-                    "Garnish and serve hot"
-                ],
-                category="main",
-                image_url="https://images.unsplash.com/photo-1546069901-ba9599a7e63c?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2NzR8MHwxfHNlYXJjaHwyfHxmb29kfGVufDB8fHx8MTc1Mzc2NzU5MXww&ixlib=rb-4.1.0&q=85"
-            ),
-            RecipeTemplate(
-                name="Garlic Bread",
-                description="Crispy bread with aromatic garlic butter",
-                primary_ingredients=["bread", "garlic"],
-                optional_ingredients=["butter", "cheese", "parsley", "olive oil"],
-                cook_time="10-12 mins",
-                servings="4 servings",
-                difficulty="Easy",
-                instructions_template=[
-                    "Preheat oven to 375°F",
-                    "Slice bread into thick pieces",
-                    "Mix minced garlic with softened butter",
-                    "Spread garlic butter mixture on bread slices",
-                    "Add {toppings} if desired",
-                    "Bake for 8-10 minutes until golden and crispy",
-                    "Serve warm"
-                ],
-                category="side",
-                image_url="https://images.unsplash.com/photo-1504674900247-0877df9cc836?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2NzR8MHwxfHNlYXJjaHw0fHxmb29kfGVufDB8fHx8MTc1Mzc2NzU5MXww&ixlib=rb-4.1.0&q=85"
-            ),
-            RecipeTemplate(
-                name="Pasta Primavera",
-                description="Fresh pasta with seasonal vegetables",
-                primary_ingredients=["pasta"],
-                optional_ingredients=["tomato", "onion", "garlic", "bell pepper", "mushrooms", "cheese"],
-                cook_time="20-25 mins",
-                servings="4 servings",
-                difficulty="Medium",
-                instructions_template=[
-                    "Cook pasta according to package directions until al dente",
-                    "Heat olive oil in a large pan over medium heat",
-                    "Add {aromatics} and sauté for 2-3 minutes",
-                    "Add {vegetables} and cook until tender",
-                    "Toss cooked pasta with vegetable mixture",
-                    "Add {cheese} and seasonings",
-                    "Serve immediately with extra cheese if desired"
-                ],
-                category="main",
-                image_url="https://images.pexels.com/photos/376464/pexels-photo-376464.jpeg"
-            ),
-            RecipeTemplate(
-                name="Chicken Stir-fry",
-                description="Quick and healthy chicken with vegetables",
-                primary_ingredients=["chicken"],
-                optional_ingredients=["onion", "garlic", "bell pepper", "broccoli", "soy sauce", "ginger"],
-                cook_time="15-18 mins",
-                servings="3 servings",
-                difficulty="Medium",
-                instructions_template=[
-                    "Cut chicken into bite-sized pieces",
-                    "Heat oil in a wok or large pan over high heat",
-                    "Add chicken and cook until golden brown",
-                    "Remove chicken and set aside",
-                    "Add {aromatics} and stir-fry for 1 minute",
-                    "Add {vegetables} and cook until crisp-tender",
-                    "Return chicken to pan and add sauce",
-                    "Stir-fry for 2-3 minutes until heated through"
-                ],
-                category="main",
-                image_url="https://images.unsplash.com/photo-1507048331197-7d4ac70811cf?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHw0fHxjb29raW5nfGVufDB8fHx8MTc1MzcwMzQwNnww&ixlib=rb-4.1.0&q=85"
-            ),
-            RecipeTemplate(
-                name="Cheese Toast",
-                description="Melted cheese on toasted bread",
-                primary_ingredients=["bread", "cheese"],
-                optional_ingredients=["butter", "tomato", "onion", "herbs"],
-                cook_time="5-8 mins",
-                servings="2 servings",
-                difficulty="Easy",
-                instructions_template=[
-                    "Preheat oven to 400°F or use a toaster oven",
-                    "Toast bread slices lightly",
-                    "Spread butter on toast if desired",
-                    "Add {toppings} and top with cheese",
-                    "Bake for 3-5 minutes until cheese melts",
-                    "Serve hot"
-                ],
-                category="snack",
-                image_url="https://images.pexels.com/photos/1640777/pexels-photo-1640777.jpeg"
-            ),
-            RecipeTemplate(
-                name="Vegetable Soup",
-                description="Hearty soup with fresh vegetables",
-                primary_ingredients=["vegetables"],
-                optional_ingredients=["onion", "garlic", "tomato", "carrot", "celery", "potato"],
-                cook_time="30-40 mins",
-                servings="6 servings",
-                difficulty="Easy",
-                instructions_template=[
-                    "Heat oil in a large pot over medium heat",
-                    "Add {aromatics} and sauté until fragrant",
-                    "Add {hard_vegetables} and cook for 5 minutes",
-                    "Add broth and bring to a boil",
-                    "Add {soft_vegetables} and simmer for 20 minutes",
-                    "Season with salt and pepper to taste",
-                    "Serve hot with bread if desired"
-                ],
-                category="soup",
-                image_url="https://images.unsplash.com/photo-1511690656952-34342bb7c2f2?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2NzR8MHwxfHNlYXJjaHwzfHxmb29kfGVufDB8fHx8MTc1Mzc2NzU5MXww&ixlib=rb-4.1.0&q=85"
-            ),
-            RecipeTemplate(
-                name="Grilled Cheese Sandwich",
-                description="Classic comfort food sandwich",
-                primary_ingredients=["bread", "cheese"],
-                optional_ingredients=["butter", "tomato", "onion"],
-                cook_time="6-8 mins",
-                servings="2 servings",
-                difficulty="Easy",
-                instructions_template=[
-                    "Butter one side of each bread slice",
-                    "Place cheese between bread slices, butter-side out",
-                    "Add {fillings} if desired",
-                    "Heat pan over medium heat",
-                    "Cook sandwich for 3-4 minutes per side",
-                    "Cook until golden brown and cheese melts",
-                    "Cut and serve hot"
-                ],
-                category="main",
-                image_url="https://images.unsplash.com/photo-1466637574441-749b8f19452f?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwzfHxjb29raW5nfGVufDB8fHx8MTc1MzcwMzQwNnww&ixlib=rb-4.1.0&q=85"
-            )
-        ]
+    @property
+    def normalization_fingerprint(self) -> str:
+        """Identifies the normalization rules a pre-built catalog index was compiled with"""
+        return self.normalizer.fingerprint
     
-    def _create_ingredient_substitutions(self) -> Dict[str, List[str]]:
-        """Create ingredient substitution mapping"""
-        return {
-            "chicken": ["turkey", "beef", "pork", "tofu"],
-            "rice": ["quinoa", "pasta", "noodles", "couscous"],
-            "onion": ["shallot", "green onion", "leek"],
-            "garlic": ["garlic powder", "shallot"],
-            "tomato": ["tomato paste", "canned tomatoes", "cherry tomatoes"],
-            "cheese": ["mozzarella", "cheddar", "parmesan", "swiss"],
-            "butter": ["olive oil", "vegetable oil", "margarine"],
-            "bread": ["baguette", "sourdough", "whole wheat bread"],
-            "pasta": ["spaghetti", "penne", "fettuccine", "linguine"],
-            "bell pepper": ["jalapeño", "poblano", "sweet pepper"],
-            "mushrooms": ["shiitake", "portobello", "button mushrooms"],
-            "spinach": ["kale", "arugula", "lettuce"],
-            "herbs": ["basil", "oregano", "thyme", "parsley"]
-        }
+    def _compile_template(self, template_id: int, template: RecipeTemplate) -> CompiledTemplate:
+        return CompiledTemplate(template_id, template, self.normalize_ingredient, self.substitution_sets)
+    
+    @classmethod
+    def from_env(cls) -> "SmartRecipeGenerator":
+        """Create a generator configured from RECIPE_* environment variables"""
+        settings = generator_settings_from_env()
+        popularity_path = settings.pop("popularity_path")
+        cache = RecipeCache(
+            max_size=int(os.environ.get('RECIPE_CACHE_SIZE', '1024')),
+            ttl=float(os.environ.get('RECIPE_CACHE_TTL', '300')) or None
+        )
+        return cls(
+            normalizer=make_normalizer(settings.pop("normalizer"), settings.pop("lexicon_path")),
+            cache=cache,
+            popularity=PopularityTable.load(popularity_path) if popularity_path else None,
+            compiled_cache_size=int(os.environ.get('RECIPE_COMPILED_CACHE_SIZE', str(COMPILED_CACHE_SIZE))),
+            **settings
+        )
+    
+    def _build_ingredient_index(self) -> Dict[str, List[int]]:
+        """Build an inverted index from normalized primary ingredient (and its substitutes) to template IDs"""
+        index: Dict[str, List[int]] = {}
+        
+        for compiled in self.compiled_templates:
+            # Template IDs are appended in catalog order, so every posting list stays sorted
+            for key in compiled.index_keys():
+                index.setdefault(key, []).append(compiled.template_id)
+        
+        return index
+    
+    def _candidate_ids(self, user_set: FrozenSet[str]) -> Set[int]:
+        """Return IDs of templates sharing a primary ingredient (or substitute) with the user"""
+        candidate_ids: Set[int] = set()
+        for ing in user_set:
+            postings = self.ingredient_index.get(ing)
+            if postings:
+                candidate_ids.update(postings)
+        return candidate_ids
+    
+    def find_candidate_templates(self, user_ingredients: List[str]) -> List[RecipeTemplate]:
+        """Find templates sharing at least one primary ingredient (or substitute) with the user, in catalog order"""
+        user_set = frozenset(self.match_ingredient(ing) for ing in user_ingredients)
+        return [self.recipe_templates[template_id] for template_id in sorted(self._candidate_ids(user_set))]
     
     def normalize_ingredient(self, ingredient: str) -> str:
         """Normalize ingredient names for better matching"""
-        ingredient = ingredient.lower().strip()
-        
-        # Common normalizations
-        normalizations = {
-            "tomatoes": "tomato",
-            "onions": "onion", 
-            "eggs": "egg",
-            "chickens": "chicken",
-            "cheeses": "cheese",
-            "mushroom": "mushrooms",
-            "bell peppers": "bell pepper",
-            "green onions": "green onion",
-            "scallions": "green onion"
-        }
-        
-        return normalizations.get(ingredient, ingredient)
+        return self.normalizer.normalize(ingredient)
+    
+    def match_ingredient(self, ingredient: str) -> str:
+        """Normalize a user ingredient, resolving unknown names against the known vocabulary"""
+        if self.ingredient_matcher is None:
+            return self.normalize_ingredient(ingredient)
+        return self.ingredient_matcher.match(ingredient)
     
     def calculate_match_percentage(self, user_ingredients: List[str], recipe_ingredients: List[str]) -> int:
         """Calculate how well user ingredients match recipe requirements"""
@@ -262,7 +557,7 @@ class SmartRecipeGenerator:
             else:
                 # Check substitutions
                 for user_ing in normalized_user:
-                    if user_ing in self.ingredient_substitutions.get(recipe_ing, []):
+                    if user_ing in self.substitution_sets.get(recipe_ing, EMPTY_SET):
                         matches += 1
                         break
         
@@ -281,7 +576,7 @@ class SmartRecipeGenerator:
             else:
                 # Check substitutions
                 for user_ing in user_ingredients:
-                    if self.normalize_ingredient(user_ing) in self.ingredient_substitutions.get(normalized_recipe_ing, []):
+                    if self.normalize_ingredient(user_ing) in self.substitution_sets.get(normalized_recipe_ing, EMPTY_SET):
                         available.append(user_ing)
                         break
         
@@ -298,7 +593,7 @@ class SmartRecipeGenerator:
                 # Check if we have a substitution
                 has_substitute = False
                 for avail_ing in available_normalized:
-                    if avail_ing in self.ingredient_substitutions.get(self.normalize_ingredient(ing), []):
+                    if avail_ing in self.substitution_sets.get(self.normalize_ingredient(ing), EMPTY_SET):
                         has_substitute = True
                         break
                 
@@ -306,8 +601,7 @@ class SmartRecipeGenerator:
                     missing.append(ing)
         
         # Add common basic ingredients that are often needed
-        basic_ingredients = ["salt", "pepper", "oil", "butter"]
-        for basic in basic_ingredients:
+        for basic in BASIC_INGREDIENTS:
             if basic not in [self.normalize_ingredient(ing) for ing in available_ingredients]:
                 if basic not in missing:
                     missing.append(basic)
@@ -316,121 +610,440 @@ class SmartRecipeGenerator:
     
     def customize_instructions(self, template: RecipeTemplate, available_ingredients: List[str]) -> List[str]:
         """Customize recipe instructions based on available ingredients"""
-        instructions = []
+        return CompiledInstructions(template.instructions_template).render(available_ingredients)
+    
+    def timed(self, stage: str):
+        """Context manager timing a generation stage when a stage observer is attached"""
+        if self.stage_observer is None:
+            return NO_STAGE_TIMER
+        return StageTimer(self.stage_observer, stage)
+    
+    @staticmethod
+    def canonical_pantry(user_set: FrozenSet[str]) -> str:
+        """Order-independent key for a set of normalized user ingredients"""
+        return ",".join(sorted(user_set))
+    
+    def _cached_ranking(self, user_set: FrozenSet[str], max_recipes: int) -> List[Tuple[CompiledTemplate, int, int]]:
+        """Rank templates through the result cache when one is configured"""
+        if self.cache is None:
+            return self.rank_templates(user_set, max_recipes)
         
-        for instruction in template.instructions_template:
-            customized = instruction
-            
-            # Replace placeholders with actual ingredients
-            if "{eggs_count}" in customized:
-                customized = customized.replace("{eggs_count}", "2-3")
-            
-            if "{fillings}" in customized:
-                fillings = [ing for ing in available_ingredients if ing.lower() in ["cheese", "tomato", "onion", "spinach", "mushrooms"]]
-                if fillings:
-                    customized = customized.replace("{fillings}", ", ".join(fillings))
-                else:
-                    customized = customized.replace("{fillings}", "your choice of fillings")
-            
-            if "{protein}" in customized:
-                proteins = [ing for ing in available_ingredients if ing.lower() in ["chicken", "beef", "eggs", "tofu"]]
-                if proteins:
-                    customized = customized.replace("{protein}", proteins[0])
-                else:
-                    customized = customized.replace("{protein}", "protein of choice")
-            
-            if "{aromatics}" in customized:
-                aromatics = [ing for ing in available_ingredients if ing.lower() in ["onion", "garlic", "ginger"]]
-                if aromatics:
-                    customized = customized.replace("{aromatics}", ", ".join(aromatics))
-                else:
-                    customized = customized.replace("{aromatics}", "onion and garlic")
-            
-            if "{vegetables}" in customized:
-                vegetables = [ing for ing in available_ingredients if ing.lower() in ["tomato", "bell pepper", "mushrooms", "spinach", "carrot"]]
-                if vegetables:
-                    customized = customized.replace("{vegetables}", ", ".join(vegetables))
-                else:
-                    customized = customized.replace("{vegetables}", "your choice of vegetables")
-            
-            if "{toppings}" in customized:
-                toppings = [ing for ing in available_ingredients if ing.lower() in ["cheese", "herbs", "tomato"]]
-                if toppings:
-                    customized = customized.replace("{toppings}", ", ".join(toppings))
-                else:
-                    customized = customized.replace("{toppings}", "desired toppings")
-            
-            if "{seasonings}" in customized:
-                customized = customized.replace("{seasonings}", "salt, pepper, and seasonings to taste")
-            
-            if "{hard_vegetables}" in customized:
-                hard_veg = [ing for ing in available_ingredients if ing.lower() in ["carrot", "potato", "celery", "onion"]]
-                if hard_veg:
-                    customized = customized.replace("{hard_vegetables}", ", ".join(hard_veg))
+        key = (self.canonical_pantry(user_set), max_recipes)
+        recipe_matches = self.cache.get(key)
+        if recipe_matches is None:
+            recipe_matches = self.rank_templates(user_set, max_recipes)
+            self.cache.put(key, recipe_matches)
+        return recipe_matches
+    
+    def match_jitter(self, user_set: FrozenSet[str], template_id: int) -> int:
+        """Variation added to the match percentage, seeded per (pantry, template) when jitter_seed is set"""
+        if self.jitter_seed is None:
+            return random.randint(-5, 10)
+        key = f"{self.jitter_seed}:{self.canonical_pantry(user_set)}:{template_id}"
+        return zlib.crc32(key.encode()) % 16 - 5
+    
+    def rank_templates(self, user_set: FrozenSet[str], max_recipes: int) -> List[Tuple[CompiledTemplate, int, int]]:
+        """Return the top (compiled template, overall_match, primary_match) for normalized user ingredients"""
+        if self.vector_scorer is not None:
+            return self._rank_vectorized(user_set, max_recipes)
+        
+        # Find matching recipes. The index only yields templates with a non-zero primary match
+        if self.use_index:
+            with self.timed("candidates"):
+                candidates = [self.compiled_templates[template_id] for template_id in self._candidate_ids(user_set)]
+        else:
+            candidates = self.compiled_templates
+        
+        # Candidates are scored as they are pushed through the top-k heap
+        with self.timed("rank"):
+            return select_top_k(candidates, user_set, max_recipes, self.popularity_scores, self.popularity_boost)
+    
+    def _rank_vectorized(self, user_set: FrozenSet[str], max_recipes: int) -> List[Tuple[CompiledTemplate, int, int]]:
+        """Rank the whole catalog with the numpy backend, breaking ties by catalog order"""
+        with self.timed("score"):
+            overall, primary = self.vector_scorer.score(user_set)
+        with self.timed("rank"):
+            return self._top_k_vectorized(overall, primary, max_recipes)
+    
+    def _top_k_vectorized(self, overall, primary, max_recipes: int) -> List[Tuple[CompiledTemplate, int, int]]:
+        """Select the top templates from one row of numpy scores"""
+        import numpy as np
+        
+        template_ids = np.nonzero(primary > 0)[0]
+        if max_recipes <= 0 or not len(template_ids):
+            return []
+        
+        # Pack (overall, primary, popularity, earlier template first) into one sortable key, as
+        # TopKSelector does, and partition out the top k before sorting only those
+        num_templates = len(self.compiled_templates)
+        score = overall[template_ids].astype(np.int64)
+        popularity = 0
+        if self.popularity_scores is not None:
+            popularity = np.frombuffer(self.popularity_scores, dtype=np.uint8)[template_ids].astype(np.int64)
+            score += popularity * self.popularity_boost // MAX_SCORE
+        keys = ((score * 101 + primary[template_ids]) * POPULARITY_SPACE + popularity) * num_templates + (num_templates - 1 - template_ids)
+        if len(keys) > max_recipes:
+            top = np.argpartition(keys, -max_recipes)[-max_recipes:]
+        else:
+            top = np.arange(len(keys))
+        top = top[np.argsort(keys[top])[::-1]]
+        
+        return [
+            (self.compiled_templates[template_id], int(overall[template_id]), int(primary[template_id]))
+            for template_id in template_ids[top]
+        ]
+    
+    def rank_templates_batch(self, user_sets: List[FrozenSet[str]], max_recipes: int) -> List[List[Tuple[CompiledTemplate, int, int]]]:
+        """Rank several queries with a single pass over the catalog, one result list per query"""
+        if self.vector_scorer is not None:
+            overall, primary = self.vector_scorer.score_batch(user_sets)
+            return [self._top_k_vectorized(overall[row], primary[row], max_recipes) for row in range(len(user_sets))]
+        
+        selectors = [
+            TopKSelector(user_set, max_recipes, self.popularity_scores, self.popularity_boost) for user_set in user_sets
+        ]
+        if self.use_index:
+            # Invert the candidate sets so each template is visited once for every query it serves
+            queries_by_template: Dict[int, List[TopKSelector]] = {}
+            for selector in selectors:
+                for template_id in self._candidate_ids(selector.user_set):
+                    queries_by_template.setdefault(template_id, []).append(selector)
+            for template_id in sorted(queries_by_template):
+                compiled = self.compiled_templates[template_id]
+                for selector in queries_by_template[template_id]:
+                    selector.push(compiled)
+        else:
+            for compiled in self.compiled_templates:
+                for selector in selectors:
+                    selector.push(compiled)
+        
+        return [selector.results() for selector in selectors]
+    
+    @property
+    def cookable_index(self) -> CookableIndex:
+        """Coverage index for find_cookable, built on the first query"""
+        if self._cookable_index is None:
+            self._cookable_index = CookableIndex(self.compiled_templates, self.substitution_sets)
+        return self._cookable_index
+    
+    def _template_names(self) -> List[str]:
+        """Template names in template ID order, read without materializing memory-mapped templates"""
+        names = getattr(self.recipe_templates, "names", None)
+        return names() if names is not None else [template.name for template in self.recipe_templates]
+    
+    @property
+    def template_ids(self) -> Mapping[str, int]:
+        """Template ID by name, built on the first catalog update"""
+        if self._template_ids is None:
+            self._template_ids = {name: template_id for template_id, name in enumerate(self._template_names())}
+        return self._template_ids
+    
+    @property
+    def ingredient_templates(self) -> Mapping[str, Sequence[int]]:
+        """Template IDs by normalized ingredient, optional ones included; built on the first substitution update"""
+        if self._ingredient_templates is None:
+            index: Dict[str, List[int]] = {}
+            for compiled in self.compiled_templates:
+                for key in compiled.ingredient_counts:
+                    index.setdefault(key, []).append(compiled.template_id)
+            self._ingredient_templates = index
+        return self._ingredient_templates
+    
+    def catalog_info(self) -> Dict[str, int]:
+        """Catalog version and the number of live templates and substitution entries"""
+        return {
+            "version": self.catalog_version,
+            "templates": live_count(self.recipe_templates),
+            "substitutions": len(self.ingredient_substitutions),
+        }
+    
+    def apply_changes(self, changes) -> "SmartRecipeGenerator":
+        """Return a new generator with the catalog_updates.CatalogChanges applied.
+
+        Templates are matched by name: a new name is appended to the catalog, a known one is
+        replaced in place and keeps its template ID (and so its place in ties), and removed
+        templates leave an empty slot. Only the index postings, cookable index entries and
+        cached rankings involving a changed template are rebuilt, along with templates whose
+        ingredients had their substitutes changed. Everything else is shared with this
+        generator, which is not modified, so calls already running on it finish against the
+        catalog version they started with.
+        """
+        if self.vector_scorer is not None:
+            raise UnsupportedCatalogUpdate("Catalog updates need the python scoring backend")
+        
+        upserts = {template.name: template for template in changes.templates}
+        removed_names = set(changes.removed)
+        conflicting = sorted(upserts.keys() & removed_names)
+        if conflicting:
+            raise CatalogUpdateError(f"Recipe template is both updated and removed: {conflicting[0]}")
+        template_ids = self.template_ids
+        unknown = sorted(name for name in removed_names if name not in template_ids)
+        if unknown:
+            raise CatalogUpdateError(f"Unknown recipe template: {unknown[0]}")
+        
+        updated = copy.copy(self)
+        updated.catalog_version = self.catalog_version + 1
+        
+        # Normalized ingredients whose substitutes change; substitution tables are small, so renormalize all of it
+        substitution_sets = self.substitution_sets
+        affected_ingredients: Set[str] = set()
+        if changes.substitutions:
+            substitutions = dict(self.ingredient_substitutions)
+            for ing, subs in changes.substitutions.items():
+                if subs is None:
+                    substitutions.pop(ing, None)
                 else:
-                    customized = customized.replace("{hard_vegetables}", "carrots and celery")
-            
-            if "{soft_vegetables}" in customized:
-                soft_veg = [ing for ing in available_ingredients if ing.lower() in ["tomato", "spinach", "mushrooms"]]
-                if soft_veg:
-                    customized = customized.replace("{soft_vegetables}", ", ".join(soft_veg))
+                    substitutions[ing] = list(subs)
+            substitution_sets = normalize_substitutions(substitutions, self.normalize_ingredient)
+            for ing in self.substitution_sets.keys() | substitution_sets.keys():
+                if self.substitution_sets.get(ing) != substitution_sets.get(ing):
+                    affected_ingredients.add(ing)
+            updated.ingredient_substitutions = substitutions
+            updated.substitution_sets = substitution_sets
+        
+        # Template per changed slot (None empties it), and the name index changes that go with them
+        templates: Dict[int, Optional[RecipeTemplate]] = {}
+        name_changes: Dict[str, object] = {}
+        next_id = len(self.recipe_templates)
+        for name in removed_names:
+            templates[template_ids[name]] = None
+            name_changes[name] = REMOVED
+        for name, template in upserts.items():
+            template_id = template_ids.get(name)
+            if template_id is None:
+                template_id = name_changes[name] = next_id
+                next_id += 1
+            templates[template_id] = template
+        
+        old_compiled = {
+            template_id: self.compiled_templates[template_id]
+            for template_id in templates if template_id < len(self.compiled_templates)
+        }
+        # Templates using an ingredient whose substitutes changed are recompiled unchanged
+        for ing in affected_ingredients:
+            for template_id in self.ingredient_templates.get(ing, ()):
+                if template_id not in old_compiled:
+                    old_compiled[template_id] = self.compiled_templates[template_id]
+        new_compiled: Dict[int, Optional[CompiledTemplate]] = {}
+        for template_id in old_compiled.keys() | templates.keys():
+            template = templates[template_id] if template_id in templates else old_compiled[template_id].template
+            new_compiled[template_id] = (
+                CompiledTemplate(template_id, template, self.normalize_ingredient, substitution_sets)
+                if template is not None else None
+            )
+        
+        updated.recipe_templates = patch_sequence(self.recipe_templates, templates)
+        if self.popularity_scores is not None:
+            # Scores follow template names; appended slots are always the next ID in order
+            scores = bytearray(self.popularity_scores)
+            for template_id in sorted(templates):
+                template = templates[template_id]
+                score = self.popularity.get(template.name) if template is not None else 0
+                if template_id < len(scores):
+                    scores[template_id] = score
                 else:
-                    customized = customized.replace("{soft_vegetables}", "tomatoes and leafy greens")
-            
-            instructions.append(customized)
+                    scores.append(score)
+            updated.popularity_scores = scores
+        updated.compiled_templates = patch_sequence(self.compiled_templates, new_compiled)
+        updated._template_ids = patch_mapping(template_ids, name_changes)
+        updated.ingredient_index = _patch_postings(self.ingredient_index, old_compiled, new_compiled, CompiledTemplate.index_keys)
+        if self._ingredient_templates is not None:
+            updated._ingredient_templates = _patch_postings(
+                self._ingredient_templates, old_compiled, new_compiled, CompiledTemplate.ingredient_keys
+            )
+        
+        live = [compiled for compiled in new_compiled.values() if compiled is not None]
+        if self.ingredient_matcher is not None:
+            words: Set[str] = set()
+            for compiled in live:
+                words.update(compiled.index_keys())
+            for ing in affected_ingredients:
+                words.add(ing)
+                words.update(substitution_sets.get(ing, EMPTY_SET))
+            words -= self.ingredient_matcher.vocabulary
+            if words:
+                updated.ingredient_matcher = self.ingredient_matcher.extended(words)
+        
+        if self._cookable_index is not None:
+            updated._cookable_index = self._cookable_index.patched(
+                [compiled for compiled in old_compiled.values() if compiled is not None], live,
+                substitution_sets if affected_ingredients else None
+            )
+        
+        # A cached ranking can only change if its pantry shares an index key with a changed template
+        if self.cache is not None:
+            tokens: Set[str] = set()
+            for compiled in list(old_compiled.values()) + live:
+                if compiled is not None:
+                    tokens.update(compiled.index_keys())
+            updated.cache = self.cache.without(lambda key: not tokens.isdisjoint(key[0].split(",")))
         
-        return instructions
+        return updated
+    
+    def find_cookable(self, ingredients_input: str, max_missing: int = 0, limit: Optional[int] = None) -> List[CookableRecipe]:
+        """Every recipe the pantry covers with at most max_missing ingredients to buy.
+
+        Substitutes count as covered. Results are ordered by missing count, then catalog order,
+        and list the missing recipe ingredients exactly (no basic staples, no cap).
+        """
+        user_ingredients = self.parse_ingredients(ingredients_input)
+        if not user_ingredients:
+            return []
+        normalized_user = [self.match_ingredient(ing) for ing in user_ingredients]
+        return [recipe for _, _, recipe in self.cookable_matches(user_ingredients, normalized_user, max_missing, limit)]
+    
+    def cookable_matches(self, user_ingredients: List[str], normalized_user: List[str], max_missing: int,
+                         limit: Optional[int] = None) -> List[Tuple[int, int, CookableRecipe]]:
+        """Return (missing count, template ID, recipe) for already normalized input, fewest missing first"""
+        user_set = frozenset(normalized_user)
+        index = self.cookable_index
+        with self.timed("cookable"):
+            matches = index.find(user_set, max_missing)
+        if limit is not None:
+            matches = matches[:limit]
+        
+        covered = index.covered(user_set)
+        results = []
+        for missing_count, template_id in matches:
+            with self.timed("render"):
+                compiled = self.compiled_templates[template_id]
+                template = compiled.template
+                available_ingredients = compiled.find_available(user_ingredients, normalized_user)
+                missing_ingredients = []
+                seen = set()
+                for ing, normalized in compiled.ingredients:
+                    if normalized not in covered and normalized not in seen:
+                        seen.add(normalized)
+                        missing_ingredients.append(ing)
+                recipe = CookableRecipe(
+                    name=template.name,
+                    description=template.description,
+                    cook_time=template.cook_time,
+                    servings=template.servings,
+                    difficulty=template.difficulty,
+                    category=template.category,
+                    available_ingredients=available_ingredients,
+                    missing_ingredients=missing_ingredients,
+                    missing_count=missing_count,
+                    instructions=compiled.instructions.render(available_ingredients),
+                    image_url=template.image_url
+                )
+            results.append((missing_count, template_id, recipe))
+        return results
+    
+    def parse_ingredients(self, ingredients_input: str) -> List[str]:
+        """Split a comma-separated ingredient string into stripped, non-empty ingredients"""
+        return [ing.strip() for ing in ingredients_input.split(',') if ing.strip()]
+    
+    def render_recipes(self, recipe_matches: List[Tuple[CompiledTemplate, int, int]], user_ingredients: List[str],
+                       normalized_user: List[str]) -> List[Recipe]:
+        """Build Recipe results for ranked templates"""
+        return list(self.iter_rendered(recipe_matches, user_ingredients, normalized_user))
+    
+    def iter_rendered(self, recipe_matches: List[Tuple[CompiledTemplate, int, int]], user_ingredients: List[str],
+                      normalized_user: List[str]) -> Iterator[Recipe]:
+        """Build Recipe results for ranked templates one at a time, best first"""
+        user_set = frozenset(normalized_user)
+        for compiled, overall_match, primary_match in recipe_matches:
+            with self.timed("render"):
+                template = compiled.template
+                available_ingredients, available_normalized = compiled.match_available(user_ingredients, normalized_user)
+                missing_ingredients = compiled.find_missing(available_normalized)
+                instructions = compiled.instructions.render(available_ingredients)
+                
+                # Add some variation to the match percentage
+                final_match = max(40, min(95, overall_match + self.match_jitter(user_set, compiled.template_id)))
+                
+                recipe = Recipe(
+                    name=template.name,
+                    description=template.description,
+                    cook_time=template.cook_time,
+                    servings=template.servings,
+                    difficulty=template.difficulty,
+                    available_ingredients=available_ingredients,
+                    missing_ingredients=missing_ingredients,
+                    instructions=instructions,
+                    match_percentage=final_match,
+                    image_url=template.image_url
+                )
+            
+            yield recipe
     
     def generate_recipes(self, ingredients_input: str, max_recipes: int = 3) -> List[Recipe]:
         """Generate recipes based on user ingredients"""
+        return list(self.iter_recipes(ingredients_input, max_recipes))
+    
+    def iter_recipes(self, ingredients_input: str, max_recipes: int = 3) -> Iterator[Recipe]:
+        """Generator form of generate_recipes: ranks up front, then renders each recipe on demand"""
         # Parse ingredients
-        user_ingredients = [ing.strip() for ing in ingredients_input.split(',') if ing.strip()]
+        with self.timed("parse"):
+            user_ingredients = self.parse_ingredients(ingredients_input)
         
         if not user_ingredients:
-            return []
+            return
         
-        # Find matching recipes
-        recipe_matches = []
+        with self.timed("normalize"):
+            normalized_user = [self.match_ingredient(ing) for ing in user_ingredients]
+        user_set = frozenset(normalized_user)
         
-        for template in self.recipe_templates:
-            # Calculate match for primary ingredients
-            primary_match = self.calculate_match_percentage(user_ingredients, template.primary_ingredients)
-            
-            # Calculate match for all ingredients
-            all_ingredients = template.primary_ingredients + template.optional_ingredients
-            overall_match = self.calculate_match_percentage(user_ingredients, all_ingredients)
-            
-            # Only include recipes where we have at least one primary ingredient
-            if primary_match > 0:
-                recipe_matches.append((template, overall_match, primary_match))
-        
-        # Sort by match percentage (overall first, then primary)
-        recipe_matches.sort(key=lambda x: (x[1], x[2]), reverse=True)
+        recipe_matches = self._cached_ranking(user_set, max_recipes)
         
         # Generate top recipes
-        recipes = []
-        for i, (template, overall_match, primary_match) in enumerate(recipe_matches[:max_recipes]):
-            available_ingredients = self.find_available_ingredients(user_ingredients, 
-                                                                   template.primary_ingredients + template.optional_ingredients)
-            missing_ingredients = self.generate_missing_ingredients(template, available_ingredients)
-            instructions = self.customize_instructions(template, available_ingredients)
-            
-            # Add some variation to the match percentage
-            final_match = max(40, min(95, overall_match + random.randint(-5, 10)))
-            
-            recipe = Recipe(
-                name=template.name,
-                description=template.description,
-                cook_time=template.cook_time,
-                servings=template.servings,
-                difficulty=template.difficulty,
-                available_ingredients=available_ingredients,
-                missing_ingredients=missing_ingredients,
-                instructions=instructions,
-                match_percentage=final_match,
-                image_url=template.image_url
-            )
-            
-            recipes.append(recipe)
+        yield from self.iter_rendered(recipe_matches, user_ingredients, normalized_user)
+    
+    def generate_recipes_batch(self, ingredients_inputs: List[str], max_recipes: int = 3,
+                               return_exceptions: bool = False) -> List:
+        """Generate recipes for many pantries at once, returning one result per input in input order.
+
+        Identical normalized pantries are scored once, and all distinct pantries are ranked in
+        a single pass over the catalog. With return_exceptions=True an input that fails to
+        parse or render yields its exception in place instead of failing the whole batch.
+        """
+        parsed: List = []
+        unique_sets: Dict[FrozenSet[str], int] = {}
+        for ingredients_input in ingredients_inputs:
+            try:
+                user_ingredients = self.parse_ingredients(ingredients_input)
+                normalized_user = [self.match_ingredient(ing) for ing in user_ingredients]
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                parsed.append(e)
+                continue
+            user_set = frozenset(normalized_user)
+            if user_ingredients:
+                unique_sets.setdefault(user_set, len(unique_sets))
+            parsed.append((user_ingredients, normalized_user, user_set))
+        
+        rankings: List = [None] * len(unique_sets)
+        misses = []
+        for user_set, position in unique_sets.items():
+            if self.cache is not None:
+                rankings[position] = self.cache.get((self.canonical_pantry(user_set), max_recipes))
+            if rankings[position] is None:
+                misses.append(user_set)
+        
+        with self.timed("rank_batch"):
+            ranked = self.rank_templates_batch(misses, max_recipes)
+        for user_set, recipe_matches in zip(misses, ranked):
+            rankings[unique_sets[user_set]] = recipe_matches
+            if self.cache is not None:
+                self.cache.put((self.canonical_pantry(user_set), max_recipes), recipe_matches)
+        
+        results: List = []
+        for entry in parsed:
+            if isinstance(entry, Exception):
+                results.append(entry)
+                continue
+            user_ingredients, normalized_user, user_set = entry
+            if not user_ingredients:
+                results.append([])
+                continue
+            try:
+                results.append(self.render_recipes(rankings[unique_sets[user_set]], user_ingredients, normalized_user))
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
         
-        return recipes
\ No newline at end of file
+        return results
@@ -0,0 +1,148 @@
+"""
+Saved Recipes - Mongo query helpers and serialization for the saved_recipes collection
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from fast_json import dumps
+
+# Newest first; id breaks ties between recipes saved in the same millisecond
+SAVED_RECIPES_SORT = [("saved_at", -1), ("id", -1)]
+
+FULL_PROJECTION = {"_id": 0}
+SUMMARY_PROJECTION = {"_id": 0, "instructions": 0, "available_ingredients": 0, "missing_ingredients": 0}
+
+# Best match first, then newest
+MATCH_SORT = [("match_percentage", -1), ("saved_at", -1), ("id", -1)]
+
+# Orders accepted by search; relevance needs a text query
+SEARCH_SORTS = ("relevance", "newest", "match")
+TEXT_SCORE = {"$meta": "textScore"}
+
+# Indexes created at startup: (keys, options). The text index matches deploy/mongo-init.js,
+# since a collection can only have one
+SAVED_RECIPES_INDEXES = [
+    ([("id", 1)], {"name": "id_1", "unique": True}),
+    (SAVED_RECIPES_SORT, {"name": "saved_at_-1_id_-1"}),
+    ([("name", "text"), ("description", "text")], {"name": "name_text_description_text"}),
+    (MATCH_SORT, {"name": "match_percentage_-1_saved_at_-1_id_-1"}),
+    ([("difficulty", 1)] + SAVED_RECIPES_SORT, {"name": "difficulty_1_saved_at_-1_id_-1"}),
+    ([("available_ingredients", 1), ("saved_at", -1)], {"name": "available_ingredients_1_saved_at_-1"}),
+    ([("missing_ingredients", 1), ("saved_at", -1)], {"name": "missing_ingredients_1_saved_at_-1"}),
+]
+
+DUPLICATE_KEY_ERROR = 11000
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+def encode_cursor(document: Dict[str, Any]) -> str:
+    """Encode the keyset position after a document as an opaque URL-safe cursor"""
+    position = {"saved_at": document["saved_at"].isoformat(), "id": document["id"]}
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a cursor produced by encode_cursor into (saved_at, id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(position["saved_at"]), str(position["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+def page_filter(cursor: Optional[str]) -> Dict[str, Any]:
+    """Keyset filter selecting recipes that sort after the cursor position"""
+    if not cursor:
+        return {}
+    saved_at, recipe_id = decode_cursor(cursor)
+    return {"$or": [
+        {"saved_at": {"$lt": saved_at}},
+        {"saved_at": saved_at, "id": {"$lt": recipe_id}},
+    ]}
+
+def search_filter(text: Optional[str] = None, available: Sequence[str] = (), missing: Sequence[str] = (),
+                  difficulty: Optional[str] = None, min_match: Optional[int] = None) -> Dict[str, Any]:
+    """Mongo filter for a saved-recipe search; ingredients must all be present, compared exactly"""
+    query: Dict[str, Any] = {}
+    if text:
+        query["$text"] = {"$search": text}
+    if available:
+        query["available_ingredients"] = {"$all": list(available)}
+    if missing:
+        query["missing_ingredients"] = {"$all": list(missing)}
+    if difficulty:
+        query["difficulty"] = difficulty
+    if min_match is not None:
+        query["match_percentage"] = {"$gte": min_match}
+    return query
+
+def search_sort(sort: Optional[str], text: Optional[str]) -> List[Tuple[str, Any]]:
+    """Sort for a search order: relevance by default when there is a text query, newest otherwise"""
+    if sort is None:
+        sort = "relevance" if text else "newest"
+    if sort not in SEARCH_SORTS:
+        raise ValueError(f"Unknown sort: {sort}")
+    if sort == "relevance":
+        if not text:
+            raise ValueError("Sorting by relevance needs a text query")
+        # Mongo 4.4+ sorts on the text score without it being projected
+        return [("score", TEXT_SCORE)] + SAVED_RECIPES_SORT
+    return MATCH_SORT if sort == "match" else SAVED_RECIPES_SORT
+
+def _plan_stages(stage: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield stage
+    children = stage.get("inputStages") or ([stage["inputStage"]] if "inputStage" in stage else [])
+    for child in children:
+        yield from _plan_stages(child)
+
+def plan_summary(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """Stages and indexes of the winning plan in an explain() result, and whether it scans or sorts the collection"""
+    plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    # The slot-based engine nests the classic plan tree under queryPlan
+    plan = plan.get("queryPlan", plan)
+    stages = list(_plan_stages(plan))
+    names = [stage.get("stage", "") for stage in stages]
+    return {
+        "stages": names,
+        "indexes": sorted({stage["indexName"] for stage in stages if "indexName" in stage}),
+        "collection_scan": "COLLSCAN" in names,
+        "blocking_sort": "SORT" in names,
+    }
+
+def to_json_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a stored document like a serialized SavedRecipe without re-validating it"""
+    document.pop("_id", None)
+    document.setdefault("image_url", "")
+    if isinstance(document.get("saved_at"), datetime):
+        document["saved_at"] = document["saved_at"].isoformat()
+    return document
+
+async def stream_json_array(documents: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Encode documents as a JSON array one element at a time"""
+    yield b"["
+    first = True
+    async for document in documents:
+        if not first:
+            yield b","
+        first = False
+        yield dumps(to_json_document(document))
+    yield b"]"
+
+def chunked(items: Sequence, size: int) -> Iterator[Sequence]:
+    """Split items into consecutive chunks of at most size elements"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def write_errors_by_index(details: Dict[str, Any]) -> Dict[int, Dict[str, Any]]:
+    """Map the per-operation errors of an unordered bulk write to their index in the chunk"""
+    return {error["index"]: error for error in details.get("writeErrors", [])}
+
+def is_duplicate_key(error: Dict[str, Any]) -> bool:
+    return error.get("code") == DUPLICATE_KEY_ERROR
+
+def dedupe(ids: List[str]) -> List[str]:
+    """Drop repeated IDs, keeping first occurrences in order"""
+    return list(dict.fromkeys(ids))
@@ -1,4 +1,5 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -6,24 +7,245 @@ import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import contextlib
+import json
+import secrets
+import time
 import uuid
-from datetime import datetime
-from recipe_generator import SmartRecipeGenerator, Recipe
+from datetime import datetime, timedelta
+from recipe_generator import (
+    GENERATION_ENV_VARIABLES, CatalogUpdateError, CookableRecipe, RecipeTemplate, SmartRecipeGenerator, Recipe,
+    UnsupportedCatalogUpdate
+)
+from catalog_updates import CatalogChanges, CatalogWatcher
+from generation_executor import ExecutorSaturated, GenerationExecutor
+from sharded_engine import ShardedRecipeEngine
+from fast_json import FastJSONResponse, dumps, fields
+from recipe_cache import RecipeCache
+from http_cache import CacheControlMiddleware, ChangeCounter, etag_matches, file_fingerprint, make_etag
+from catalog import DEFAULT_CATALOG_PATH
+from mongo_pool import PoolStats, client_options_from_env, ping, warm_up
+from analytics import ANALYTICS_INDEXES, ROLLUP_COLLECTION, AnalyticsBuffer, popular_ingredients_pipeline
+from pymongo.errors import BulkWriteError
+from saved_recipes import (
+    FULL_PROJECTION, SAVED_RECIPES_INDEXES, SAVED_RECIPES_SORT, SUMMARY_PROJECTION,
+    InvalidCursor, chunked, dedupe, encode_cursor, is_duplicate_key, page_filter, plan_summary,
+    search_filter, search_sort, stream_json_array, to_json_document, write_errors_by_index
+)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# Prometheus metrics, served at /metrics (METRICS_ENABLED=0 turns collection off entirely)
+metrics = None
+if os.environ.get('METRICS_ENABLED', '1') != '0':
+    from metrics import Metrics, MetricsMiddleware, MongoCommandTimer
+    metrics = Metrics()
+
+# MongoDB connection; the client opens its connections on the first operation (the warm-up
+# ping in lifespan), not at import. Pool size, idle time and the timeouts come from MONGO_*
+# settings; MONGO_TIMEOUT_MS bounds each operation, so a slow database fails requests with
+# 500s instead of pinning their handlers
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+mongo_options = client_options_from_env()
+mongo_pool_stats = PoolStats()
+client = AsyncIOMotorClient(
+    mongo_url,
+    connect=False,
+    event_listeners=[mongo_pool_stats] + ([MongoCommandTimer(metrics)] if metrics else []),
+    **mongo_options
+)
+if metrics:
+    metrics.register_pool_stats(mongo_pool_stats)
+# Budget for the ping of GET /api/health?deep=true, in seconds
+HEALTH_PING_TIMEOUT = float(os.environ.get('MONGO_HEALTH_TIMEOUT_MS', '1000')) / 1000
 db = client[os.environ['DB_NAME']]
 
-# Initialize the smart recipe generator
-recipe_generator = SmartRecipeGenerator()
+# Generation and save events are queued in memory and written to recipe_analytics in
+# batches by a background task started in lifespan (ANALYTICS_ENABLED=0 turns recording off)
+analytics = None
+if os.environ.get('ANALYTICS_ENABLED', '1') != '0':
+    analytics = AnalyticsBuffer(
+        lambda: db,
+        max_size=int(os.environ.get('ANALYTICS_BUFFER_SIZE', '10000')),
+        batch_size=int(os.environ.get('ANALYTICS_BATCH_SIZE', '500')),
+        flush_interval=float(os.environ.get('ANALYTICS_FLUSH_INTERVAL', '1'))
+    )
+    if metrics:
+        metrics.register_analytics_stats(analytics)
+
+# Generation runs inline, in a thread pool or in pre-loaded worker processes. The catalog is
+# loaded by the warm-up in lifespan, or by the first generation request if warm-up is off.
+# With RECIPE_SHARDS > 1 the catalog is split across that many shard processes instead
+generation_mode = os.environ.get('GENERATION_MODE', 'thread')
+generation_workers = os.environ.get('GENERATION_WORKERS')
+recipe_shards = int(os.environ.get('RECIPE_SHARDS', '1'))
+if recipe_shards > 1 and generation_mode == 'process':
+    raise ValueError("RECIPE_SHARDS already runs generation in processes; use GENERATION_MODE=thread")
+# Catalog source to watch for edits, applied without a restart (in-process generators only)
+catalog_watch = os.environ.get('RECIPE_CATALOG_WATCH')
+if catalog_watch and (recipe_shards > 1 or generation_mode == 'process'):
+    raise ValueError("RECIPE_CATALOG_WATCH needs GENERATION_MODE=thread or inline and no RECIPE_SHARDS")
+generation_executor = GenerationExecutor(
+    None,
+    generator_factory=ShardedRecipeEngine.from_env if recipe_shards > 1 else SmartRecipeGenerator.from_env,
+    mode=generation_mode,
+    max_workers=int(generation_workers) if generation_workers else None,
+    max_pending=int(os.environ.get('GENERATION_MAX_PENDING', '64')),
+    stage_observer=metrics.observe_stage if metrics else None
+)
+if metrics:
+    metrics.register_generation_stats(generation_executor)
+
+# Generation responses carry an ETag of everything that determines them: the generator
+# configuration and data files, the catalog version and the request, so clients can
+# revalidate without regenerating. Unseeded jitter (RECIPE_JITTER_SEED set empty) makes
+# responses random, so they are then neither tagged nor cacheable. Responses are private:
+# every generation request must reach the backend, because its analytics event is an
+# impression the popularity table (python -m popularity build) divides saves by
+generation_deterministic = os.environ.get('RECIPE_JITTER_SEED', '0') != ''
+generation_fingerprint = make_etag(
+    *(os.environ.get(name, '') for name in GENERATION_ENV_VARIABLES),
+    file_fingerprint([os.environ.get('RECIPE_CATALOG') or str(DEFAULT_CATALOG_PATH),
+                      os.environ.get('RECIPE_LEXICON'), os.environ.get('RECIPE_POPULARITY')])
+)
+GENERATION_CACHE_CONTROL = f"private, max-age={int(os.environ.get('GENERATION_CACHE_MAX_AGE', '60'))}"
+# Recipe names per generation ETag issued here, so a 304 still records its impression
+generation_impressions = RecipeCache(max_size=4096)
+
+# Saved-recipe listings are tagged with a change counter bumped after every write; other
+# server processes' writes are seen within SAVED_RECIPES_VERSION_TTL seconds
+saved_recipes_version = ChangeCounter(
+    lambda: db.collection_versions, "saved_recipes", ttl=float(os.environ.get('SAVED_RECIPES_VERSION_TTL', '1'))
+)
+SAVED_RECIPES_CACHE_CONTROL = "private, no-cache"
+
+def service_unavailable(e: ExecutorSaturated) -> HTTPException:
+    logging.warning(f"Recipe generation saturated: {str(e)}")
+    return HTTPException(status_code=503, detail="Recipe generator is busy, please retry", headers={"Retry-After": "1"})
+
+def generation_etag(ingredients_input: str, max_recipes: int) -> Optional[str]:
+    """ETag of a generation request. Keep it taken before generating.
+
+    Then a catalog update landing mid-request can at worst tag new content with the old
+    version, which only makes the next revalidation miss. Tagging after generating could
+    label old content with the new version and answer later requests with stale 304s.
+    """
+    if not generation_deterministic:
+        return None
+    generator = generation_executor.loaded_generator
+    version = generator.catalog_version if generator is not None else 0
+    pantry = [ing.strip() for ing in ingredients_input.split(',') if ing.strip()]
+    return make_etag("generate-recipes", generation_fingerprint, version, max_recipes, *pantry)
+
+async def saved_recipes_etag(request: Request) -> Optional[str]:
+    """ETag of a saved-recipes read: the collection version and the query string"""
+    try:
+        version = await saved_recipes_version.current()
+    except Exception as e:
+        logging.error(f"Error reading saved recipes version: {str(e)}")
+        return None
+    return make_etag(request.url.path, version, request.url.query)
+
+async def saved_recipes_changed():
+    try:
+        await saved_recipes_version.bump()
+    except Exception as e:
+        logging.error(f"Error bumping saved recipes version: {str(e)}")
+
+def cache_headers(etag: Optional[str], cache_control: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": cache_control} if etag else {}
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
+
+async def warm_up_generation():
+    start = time.perf_counter()
+    try:
+        await generation_executor.warm_up()
+        logging.info(f"Recipe generator ready in {(time.perf_counter() - start) * 1000:.0f} ms")
+    except Exception as e:
+        logging.error(f"Error warming up recipe generator: {str(e)}")
+
+async def flush_analytics(timeout: float = 5.0):
+    """Write the events still queued at shutdown, giving up after timeout seconds"""
+    try:
+        await asyncio.wait_for(analytics.flush(), timeout)
+    except Exception as e:
+        logging.error(f"Error flushing analytics events: {str(e)}")
+    stats = analytics.stats()
+    if stats["queued"] or stats["dropped"] or stats["failed"] or stats["rollup_failed"]:
+        logging.warning(f"Analytics events lost: {stats}")
+
+async def watch_catalog(watcher: CatalogWatcher, interval: float):
+    """Apply edits to the watched catalog source as they are saved"""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            changes = await loop.run_in_executor(None, watcher.poll)
+            if changes:
+                generator = await generation_executor.update("apply_changes", changes)
+                logging.info(f"Applied catalog changes {changes.summary()} from {watcher.path}, "
+                             f"now at version {generator.catalog_version}")
+        except Exception as e:
+            logging.error(f"Error reloading catalog from {watcher.path}: {str(e)}")
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Both run in the background, so /api/health answers while the catalog loads and an
+    # unreachable database does not block startup
+    if os.environ.get('GENERATION_WARMUP', '1') != '0':
+        asyncio.create_task(warm_up_generation())
+    if os.environ.get('MONGO_WARMUP', '1') != '0':
+        asyncio.create_task(warm_up(db))
+    asyncio.create_task(ensure_indexes())
+    watch_task = None
+    if catalog_watch:
+        watcher = CatalogWatcher(Path(catalog_watch))
+        interval = float(os.environ.get('RECIPE_CATALOG_WATCH_INTERVAL', '2'))
+        watch_task = asyncio.create_task(watch_catalog(watcher, interval))
+    analytics_task = asyncio.create_task(analytics.run()) if analytics else None
+    yield
+    if watch_task is not None:
+        watch_task.cancel()
+    if analytics_task is not None:
+        analytics_task.cancel()
+        # A batch whose insert was cancelled goes back on the queue for the final flush
+        with contextlib.suppress(asyncio.CancelledError):
+            await analytics_task
+        await flush_analytics()
+    client.close()
+    generation_executor.shutdown()
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+# Largest number of pantries accepted by one batch request
+MAX_BATCH_SIZE = 1000
+
+# Most recipes a streaming generation request may ask for
+MAX_STREAM_RECIPES = 100
+
+# Cookable queries allow up to MAX_COOKABLE_MISSING missing ingredients and return at most MAX_COOKABLE_RECIPES
+MAX_COOKABLE_MISSING = 10
+MAX_COOKABLE_RECIPES = 500
+
+# Saved recipe pages are capped at MAX_PAGE_SIZE; unpaged listings stream in batches
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 200
+
+# Saved-recipe searches return one page of at most MAX_PAGE_SIZE results, DEFAULT_SEARCH_LIMIT by default
+DEFAULT_SEARCH_LIMIT = 20
+
+# Bulk saved-recipe requests are capped, and written to Mongo in chunks
+MAX_BULK_ITEMS = 5000
+BULK_CHUNK_SIZE = 500
+
+# Popular-ingredient queries cover at most MAX_POPULAR_DAYS days of the analytics rollup
+MAX_POPULAR_DAYS = 366
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -35,6 +257,28 @@ class RecipeGenerationRequest(BaseModel):
 class RecipeGenerationResponse(BaseModel):
     recipes: List[Recipe]
 
+class RecipeStreamRequest(BaseModel):
+    ingredients: str
+    max_recipes: int = Field(default=3, ge=1, le=MAX_STREAM_RECIPES)
+
+class CookableRequest(BaseModel):
+    ingredients: str
+    max_missing: int = Field(default=0, ge=0, le=MAX_COOKABLE_MISSING)
+    limit: int = Field(default=50, ge=1, le=MAX_COOKABLE_RECIPES)
+
+class CookableResponse(BaseModel):
+    recipes: List[CookableRecipe]
+
+class RecipeBatchRequest(BaseModel):
+    ingredients: List[str]
+
+class RecipeBatchItem(BaseModel):
+    recipes: List[Recipe] = []
+    error: Optional[str] = None
+
+class RecipeBatchResponse(BaseModel):
+    results: List[RecipeBatchItem]
+
 class SavedRecipe(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
@@ -61,35 +305,247 @@ class SavedRecipeCreate(BaseModel):
     match_percentage: int
     image_url: str = ""
 
+class SavedRecipeBulkItem(SavedRecipeCreate):
+    # Clients may supply their own id so that retried imports stay idempotent
+    id: Optional[str] = None
+
+class BulkSaveRequest(BaseModel):
+    recipes: List[SavedRecipeBulkItem]
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[str]
+
+class BulkItemResult(BaseModel):
+    id: str
+    status: str
+    error: Optional[str] = None
+
+class BulkResponse(BaseModel):
+    results: List[BulkItemResult]
+    counts: Dict[str, int]
+
+class CatalogTemplate(BaseModel):
+    name: str
+    description: str
+    primary_ingredients: List[str] = Field(min_length=1)
+    optional_ingredients: List[str] = []
+    cook_time: str
+    servings: str
+    difficulty: str
+    instructions_template: List[str]
+    category: str = "main"
+    image_url: str = ""
+
+class CatalogChangesRequest(BaseModel):
+    # Templates are matched by name: unknown names are added, known ones replaced
+    templates: List[CatalogTemplate] = []
+    remove_templates: List[str] = []
+    # Ingredient -> substitutes; null deletes the entry
+    substitutions: Dict[str, Optional[List[str]]] = {}
+
+class CatalogInfo(BaseModel):
+    version: int
+    templates: int
+    substitutions: int
+
+class PopularIngredient(BaseModel):
+    ingredient: str
+    queries: int
+    saves: int
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin routes are off unless ADMIN_TOKEN is set, and then need it in X-Admin-Token"""
+    token = os.environ.get('ADMIN_TOKEN')
+    if not token:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token.encode(), token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def bulk_response(results: List[BulkItemResult]) -> BulkResponse:
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    return BulkResponse(results=results, counts=counts)
+
 # API Routes
 @api_router.get("/")
 async def root():
     return {"message": "ShelfChef API - Ready to cook!"}
 
 @api_router.get("/health")
-async def health_check():
-    return {"status": "healthy", "service": "ShelfChef API", "generator": "Smart Recipe Generator"}
+async def health_check(deep: bool = Query(False, description="Also ping MongoDB and report connection pool stats")):
+    status = {"status": "healthy", "service": "ShelfChef API", "generator": "Smart Recipe Generator"}
+    if not deep:
+        return status
+    
+    # Liveness probes use the plain check; this one fails with 503 while MongoDB is unreachable
+    try:
+        mongo = {"status": "ok", "ping_ms": round(await ping(db, HEALTH_PING_TIMEOUT), 2)}
+    except Exception as e:
+        logging.warning(f"MongoDB health ping failed: {str(e)}")
+        mongo = {"status": "unavailable", "error": str(e)}
+    mongo["pool"] = mongo_pool_stats.stats()
+    mongo["settings"] = mongo_options
+    status["mongo"] = mongo
+    if mongo["status"] != "ok":
+        status["status"] = "degraded"
+        return FastJSONResponse(status, status_code=503)
+    return status
+
+@api_router.get("/cache/stats")
+async def cache_stats():
+    """Report recipe cache hit/miss/eviction counters and generation queue depth"""
+    generator = generation_executor.loaded_generator
+    stats = generator.cache.stats() if generator is not None and generator.cache is not None else {}
+    stats["executor"] = generation_executor.stats()
+    return stats
 
 @api_router.post("/generate-recipes", response_model=RecipeGenerationResponse)
-async def generate_recipes(request: RecipeGenerationRequest):
+async def generate_recipes(request: RecipeGenerationRequest, if_none_match: Optional[str] = Header(None)):
     """Generate recipes based on user ingredients using smart algorithm"""
     
     if not request.ingredients.strip():
         raise HTTPException(status_code=400, detail="Please provide ingredients")
     
+    etag = generation_etag(request.ingredients, 3)
+    headers = cache_headers(etag, GENERATION_CACHE_CONTROL)
+    if etag and etag_matches(if_none_match, etag, "POST"):
+        # Without the recipe names (a tag issued by another process, or evicted) the request
+        # is answered in full, so its impression is still recorded
+        recipe_names = generation_impressions.get(etag) if analytics else None
+        if not analytics or recipe_names is not None:
+            if analytics:
+                analytics.record_generation(request.ingredients, recipe_names)
+            return not_modified(headers)
+    
     try:
         # Generate recipes using smart algorithm
-        recipes = recipe_generator.generate_recipes(request.ingredients, max_recipes=3)
+        recipes = await generation_executor.run("generate_recipes", request.ingredients, 3)
+        if analytics:
+            recipe_names = [recipe.name for recipe in recipes]
+            analytics.record_generation(request.ingredients, recipe_names)
+            if etag:
+                generation_impressions.put(etag, recipe_names)
         
         if not recipes:
             raise HTTPException(status_code=404, detail="No recipes found for the given ingredients")
         
-        return RecipeGenerationResponse(recipes=recipes)
+        # Engine results are already valid Recipe models; encode them directly instead of
+        # validating them again against response_model (which still documents the schema)
+        return FastJSONResponse({"recipes": [fields(recipe) for recipe in recipes]}, headers=headers)
         
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise service_unavailable(e)
     except Exception as e:
         logging.error(f"Error in generate_recipes: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to generate recipes")
 
+async def recipe_lines(ingredients: str, first: Recipe, rest: AsyncIterator[Recipe]) -> AsyncIterator[bytes]:
+    """Encode recipes as NDJSON; a failure after the first line is reported as a final error line.
+
+    The generation event is recorded once the stream ends, with the recipes actually sent
+    (fewer than ranked if the client disconnected or generation failed part way).
+    """
+    sent = [first.name]
+    try:
+        yield dumps(fields(first)) + b"\n"
+        try:
+            async for recipe in rest:
+                yield dumps(fields(recipe)) + b"\n"
+                sent.append(recipe.name)
+        except Exception as e:
+            logging.error(f"Error in generate_recipes_stream: {str(e)}")
+            yield dumps({"error": "Failed to generate recipes"}) + b"\n"
+    finally:
+        if analytics:
+            analytics.record_generation(ingredients, sent)
+
+@api_router.post("/generate-recipes/stream")
+async def generate_recipes_stream(request: RecipeStreamRequest):
+    """Stream recipes as NDJSON, one line per recipe as soon as it is ranked and rendered"""
+    
+    if not request.ingredients.strip():
+        raise HTTPException(status_code=400, detail="Please provide ingredients")
+    
+    try:
+        generation_executor.check_capacity()
+        recipes = generation_executor.stream("iter_recipes", request.ingredients, request.max_recipes)
+        # Ranking happens before the first recipe, so errors and empty results still get a status code
+        try:
+            first = await recipes.__anext__()
+        except StopAsyncIteration:
+            if analytics:
+                analytics.record_generation(request.ingredients, [])
+            raise HTTPException(status_code=404, detail="No recipes found for the given ingredients")
+        
+        # Tell proxies such as nginx to pass lines through instead of buffering the response
+        return StreamingResponse(recipe_lines(request.ingredients, first, recipes), media_type="application/x-ndjson",
+                                 headers={"X-Accel-Buffering": "no"})
+        
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise service_unavailable(e)
+    except Exception as e:
+        logging.error(f"Error in generate_recipes_stream: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to generate recipes")
+
+@api_router.post("/generate-recipes/batch", response_model=RecipeBatchResponse)
+async def generate_recipes_batch(request: RecipeBatchRequest):
+    """Generate recipes for many pantries in one request, reporting errors per item"""
+    
+    if not request.ingredients:
+        raise HTTPException(status_code=400, detail="Please provide ingredients")
+    
+    if len(request.ingredients) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {MAX_BATCH_SIZE} pantries")
+    
+    try:
+        batch = await generation_executor.run("generate_recipes_batch", request.ingredients, 3, True)
+    except ExecutorSaturated as e:
+        raise service_unavailable(e)
+    except Exception as e:
+        logging.error(f"Error in generate_recipes_batch: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to generate recipes")
+    
+    # Items are shaped like RecipeBatchItem and encoded directly, as in generate_recipes
+    results = []
+    for ingredients, recipes in zip(request.ingredients, batch):
+        if not ingredients.strip():
+            results.append({"recipes": [], "error": "Please provide ingredients"})
+        elif isinstance(recipes, Exception):
+            logging.error(f"Error in generate_recipes_batch item: {str(recipes)}")
+            results.append({"recipes": [], "error": "Failed to generate recipes"})
+        else:
+            # One generation event per pantry, as if each had been its own request
+            if analytics:
+                analytics.record_generation(ingredients, [recipe.name for recipe in recipes])
+            if not recipes:
+                results.append({"recipes": [], "error": "No recipes found for the given ingredients"})
+            else:
+                results.append({"recipes": [fields(recipe) for recipe in recipes], "error": None})
+    
+    return FastJSONResponse({"results": results})
+
+@api_router.post("/cookable-recipes", response_model=CookableResponse)
+async def cookable_recipes(request: CookableRequest):
+    """List every recipe the pantry can make with at most max_missing ingredients to buy, fewest missing first"""
+    
+    if not request.ingredients.strip():
+        raise HTTPException(status_code=400, detail="Please provide ingredients")
+    
+    try:
+        recipes = await generation_executor.run("find_cookable", request.ingredients, request.max_missing, request.limit)
+        return FastJSONResponse({"recipes": [fields(recipe) for recipe in recipes]})
+        
+    except ExecutorSaturated as e:
+        raise service_unavailable(e)
+    except Exception as e:
+        logging.error(f"Error in cookable_recipes: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to find cookable recipes")
+
 @api_router.post("/save-recipe", response_model=SavedRecipe)
 async def save_recipe(recipe_data: SavedRecipeCreate):
     """Save a recipe to the database"""
@@ -99,23 +555,187 @@ async def save_recipe(recipe_data: SavedRecipeCreate):
     try:
         # Insert into MongoDB
         await db.saved_recipes.insert_one(saved_recipe.model_dump())
+        await saved_recipes_changed()
+        if analytics:
+            analytics.record_save(saved_recipe.id, saved_recipe.name, saved_recipe.available_ingredients)
         return saved_recipe
         
     except Exception as e:
         logging.error(f"Error saving recipe: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to save recipe")
 
+async def _iterate_documents(first_batch: List[Dict[str, Any]], cursor=None) -> AsyncIterator[Dict[str, Any]]:
+    for document in first_batch:
+        yield document
+    if cursor is not None:
+        async for document in cursor:
+            yield document
+
 @api_router.get("/saved-recipes", response_model=List[SavedRecipe])
-async def get_saved_recipes():
-    """Get all saved recipes"""
+async def get_saved_recipes(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: str = Query("full", pattern="^(full|summary)$"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get saved recipes, newest first.
+
+    Without limit the whole collection is streamed. With limit one page is returned and
+    the X-Next-Cursor header carries the cursor for the next page. view=summary omits
+    instructions and ingredient lists.
+    """
     
     try:
-        saved_recipes = await db.saved_recipes.find().to_list(1000)
-        return [SavedRecipe(**recipe) for recipe in saved_recipes]
+        query = page_filter(cursor)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    projection = SUMMARY_PROJECTION if view == "summary" else FULL_PROJECTION
+    etag = await saved_recipes_etag(request)
+    headers = cache_headers(etag, SAVED_RECIPES_CACHE_CONTROL)
+    if etag and etag_matches(if_none_match, etag):
+        return not_modified(headers)
+    
+    try:
+        find = db.saved_recipes.find(query, projection).sort(SAVED_RECIPES_SORT)
+        if limit is None:
+            # Fetch the first batch up front so database errors still surface as a 500
+            find = find.batch_size(STREAM_BATCH_SIZE)
+            first_batch = await find.to_list(STREAM_BATCH_SIZE)
+            documents = _iterate_documents(first_batch, find if len(first_batch) == STREAM_BATCH_SIZE else None)
+        else:
+            page = await find.limit(limit + 1).to_list(limit + 1)
+            if len(page) > limit:
+                page = page[:limit]
+                headers["X-Next-Cursor"] = encode_cursor(page[-1])
+            documents = _iterate_documents(page)
         
     except Exception as e:
         logging.error(f"Error retrieving saved recipes: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve saved recipes")
+    
+    return StreamingResponse(stream_json_array(documents), media_type="application/json", headers=headers)
+
+class SavedRecipeSearch:
+    """Query parameters of a saved-recipe search, as the Mongo cursor that answers it"""
+    
+    def __init__(
+        self,
+        q: Optional[str] = Query(None, min_length=1, max_length=200, description="Full-text query on name and description"),
+        available: List[str] = Query([], description="Ingredients the recipe must list as available"),
+        missing: List[str] = Query([], description="Ingredients the recipe must list as missing"),
+        difficulty: Optional[str] = None,
+        min_match: Optional[int] = Query(None, ge=0, le=100),
+        sort: Optional[str] = Query(None, pattern="^(relevance|newest|match)$"),
+        limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_PAGE_SIZE),
+        view: str = Query("full", pattern="^(full|summary)$")
+    ):
+        try:
+            self.sort = search_sort(sort, q)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        self.filter = search_filter(q, available, missing, difficulty, min_match)
+        self.projection = SUMMARY_PROJECTION if view == "summary" else FULL_PROJECTION
+        self.limit = limit
+    
+    def cursor(self):
+        return db.saved_recipes.find(self.filter, self.projection).sort(self.sort).limit(self.limit)
+
+@api_router.get("/saved-recipes/search", response_model=List[SavedRecipe])
+async def search_saved_recipes(request: Request, search: SavedRecipeSearch = Depends(),
+                               if_none_match: Optional[str] = Header(None)):
+    """Search saved recipes by text, ingredients, difficulty and match percentage.
+
+    Filtering, sorting and projection all run in Mongo on indexes (see
+    /api/admin/saved-recipes/search/explain); one page of at most limit results is returned.
+    """
+    
+    etag = await saved_recipes_etag(request)
+    headers = cache_headers(etag, SAVED_RECIPES_CACHE_CONTROL)
+    if etag and etag_matches(if_none_match, etag):
+        return not_modified(headers)
+    
+    try:
+        page = await search.cursor().to_list(search.limit)
+        return FastJSONResponse([to_json_document(document) for document in page], headers=headers)
+        
+    except Exception as e:
+        logging.error(f"Error searching saved recipes: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to search saved recipes")
+
+@api_router.get("/admin/saved-recipes/search/explain", dependencies=[Depends(require_admin)])
+async def explain_saved_recipe_search(search: SavedRecipeSearch = Depends()):
+    """Summarize the winning Mongo plan for a search: stages, indexes used, collection scans and in-memory sorts"""
+    
+    try:
+        return plan_summary(await search.cursor().explain())
+        
+    except Exception as e:
+        logging.error(f"Error explaining saved recipe search: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to explain search")
+
+@api_router.post("/saved-recipes/bulk", response_model=BulkResponse)
+async def bulk_save_recipes(request: BulkSaveRequest):
+    """Save many recipes with unordered insert_many calls, reporting a status per recipe"""
+    
+    if len(request.recipes) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A bulk request can contain at most {MAX_BULK_ITEMS} recipes")
+    
+    documents = []
+    for item in request.recipes:
+        data = item.model_dump()
+        if data["id"] is None:
+            del data["id"]
+        documents.append(SavedRecipe(**data).model_dump())
+    
+    results = []
+    for chunk in chunked(documents, BULK_CHUNK_SIZE):
+        errors: Dict[int, Dict[str, Any]] = {}
+        try:
+            await db.saved_recipes.insert_many(chunk, ordered=False)
+        except BulkWriteError as e:
+            errors = write_errors_by_index(e.details)
+        except Exception as e:
+            logging.error(f"Error bulk saving recipes: {str(e)}")
+            errors = {index: {"errmsg": "Failed to save recipe"} for index in range(len(chunk))}
+        
+        for index, document in enumerate(chunk):
+            error = errors.get(index)
+            if error is None:
+                results.append(BulkItemResult(id=document["id"], status="saved"))
+            elif is_duplicate_key(error):
+                results.append(BulkItemResult(id=document["id"], status="duplicate"))
+            else:
+                results.append(BulkItemResult(id=document["id"], status="error", error=error.get("errmsg")))
+    
+    if any(result.status == "saved" for result in results):
+        await saved_recipes_changed()
+    return bulk_response(results)
+
+@api_router.delete("/saved-recipes/bulk", response_model=BulkResponse)
+async def bulk_delete_saved_recipes(request: BulkDeleteRequest):
+    """Delete many saved recipes with concurrent delete_one calls, reporting a status per ID"""
+    
+    if len(request.ids) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A bulk request can contain at most {MAX_BULK_ITEMS} ids")
+    
+    results = []
+    for chunk in chunked(dedupe(request.ids), BULK_CHUNK_SIZE):
+        # bulk_write only reports a total deleted_count, so each ID's status has to come from its own delete_one
+        outcomes = await asyncio.gather(
+            *(db.saved_recipes.delete_one({"id": recipe_id}) for recipe_id in chunk), return_exceptions=True
+        )
+        for recipe_id, outcome in zip(chunk, outcomes):
+            if isinstance(outcome, Exception):
+                logging.error(f"Error bulk deleting recipe {recipe_id}: {str(outcome)}")
+                results.append(BulkItemResult(id=recipe_id, status="error", error="Failed to delete recipe"))
+            else:
+                results.append(BulkItemResult(id=recipe_id, status="deleted" if outcome.deleted_count else "not_found"))
+    
+    if any(result.status == "deleted" for result in results):
+        await saved_recipes_changed()
+    return bulk_response(results)
 
 @api_router.delete("/saved-recipes/{recipe_id}")
 async def delete_saved_recipe(recipe_id: str):
@@ -126,7 +746,8 @@ async def delete_saved_recipe(recipe_id: str):
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Recipe not found")
-            
+        
+        await saved_recipes_changed()
         return {"message": "Recipe deleted successfully"}
         
     except HTTPException:
@@ -135,17 +756,83 @@ async def delete_saved_recipe(recipe_id: str):
         logging.error(f"Error deleting recipe: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to delete recipe")
 
+@api_router.get("/analytics/popular-ingredients", response_model=List[PopularIngredient])
+async def popular_ingredients(
+    days: int = Query(7, ge=1, le=MAX_POPULAR_DAYS),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    by: str = Query("queries", pattern="^(queries|saves)$")
+):
+    """Ingredients most often searched with (or saved) over the last `days` days, from the daily rollup"""
+    
+    since = (datetime.utcnow() - timedelta(days=days - 1)).date().isoformat()
+    try:
+        pipeline = popular_ingredients_pipeline(since, limit, by)
+        return FastJSONResponse(await db[ROLLUP_COLLECTION].aggregate(pipeline).to_list(None))
+    except Exception as e:
+        logging.error(f"Error in popular_ingredients: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to read ingredient popularity")
+
+@api_router.get("/admin/catalog", response_model=CatalogInfo, dependencies=[Depends(require_admin)])
+async def catalog_info():
+    """Report the catalog version and template and substitution counts"""
+    
+    try:
+        return await generation_executor.run("catalog_info")
+    except ExecutorSaturated as e:
+        raise service_unavailable(e)
+    except Exception as e:
+        logging.error(f"Error in catalog_info: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to read catalog")
+
+@api_router.post("/admin/catalog/changes", response_model=CatalogInfo, dependencies=[Depends(require_admin)])
+async def update_catalog(request: CatalogChangesRequest):
+    """Add, replace or remove templates and substitution entries without a restart"""
+    
+    changes = CatalogChanges(
+        templates=[RecipeTemplate(**template.model_dump()) for template in request.templates],
+        removed=request.remove_templates,
+        substitutions=request.substitutions
+    )
+    if not changes:
+        raise HTTPException(status_code=400, detail="No catalog changes given")
+    
+    try:
+        generator = await generation_executor.update("apply_changes", changes)
+        logging.info(f"Applied catalog changes {changes.summary()}, now at version {generator.catalog_version}")
+        return generator.catalog_info()
+        
+    except UnsupportedCatalogUpdate as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except CatalogUpdateError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logging.error(f"Error in update_catalog: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to update catalog")
+
 # Include the router in the main app
 app.include_router(api_router)
 
+# Responses whose route sets no Cache-Control policy are marked no-store
+app.add_middleware(CacheControlMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+if metrics:
+    # Added last so it is outermost and times the whole request, CORS included
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        body, content_type = metrics.render()
+        return Response(content=body, media_type=content_type)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -153,6 +840,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+async def ensure_indexes():
+    """Create the indexes the saved-recipes and analytics queries rely on"""
+    try:
+        for keys, options in SAVED_RECIPES_INDEXES:
+            await db.saved_recipes.create_index(keys, **options)
+    except Exception as e:
+        logging.error(f"Error creating saved_recipes indexes: {str(e)}")
+    if analytics:
+        try:
+            for collection, keys, options in ANALYTICS_INDEXES:
+                await db[collection].create_index(keys, **options)
+        except Exception as e:
+            logging.error(f"Error creating analytics indexes: {str(e)}")
@@ -0,0 +1,259 @@
+"""
+Sharded Engine - scatters recipe queries over worker processes that each own a slice of the catalog
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from catalog import open_catalog
+from ingredient_normalizer import IngredientMatcher, make_normalizer, normalize_substitutions
+from popularity import PopularityTable, boost_points
+from recipe_generator import (
+    DEFAULT_POPULARITY_BOOST, NO_STAGE_TIMER, CookableRecipe, Recipe, SmartRecipeGenerator, StageTimer, UnsupportedCatalogUpdate,
+    generator_settings_from_env
+)
+
+# Shard generator of the current worker process
+_shard = None
+
+class ShardGenerator(SmartRecipeGenerator):
+    """Generator over catalog templates [offset, offset + len(templates)).
+
+    Template IDs stay local to the shard, except in match_jitter, which is keyed on the
+    global ID so seeded percentages match an unsharded generator.
+    """
+
+    def __init__(self, offset: int, **kwargs):
+        self.template_offset = offset
+        super().__init__(**kwargs)
+
+    def match_jitter(self, user_set, template_id: int) -> int:
+        return super().match_jitter(user_set, template_id + self.template_offset)
+
+    def vocabulary(self) -> List[str]:
+        """Ingredients this shard's index knows, for the coordinator's matcher"""
+        return list(self.ingredient_index.keys())
+
+    def _popularity(self, template_id: int) -> int:
+        return self.popularity_scores[template_id] if self.popularity_scores is not None else 0
+
+    def ranked(self, user_ingredients: List[str], normalized_user: List[str],
+               max_recipes: int) -> List[Tuple[int, int, int, int, Recipe]]:
+        """Local top k as (overall_match, primary_match, popularity, local template ID, rendered recipe)"""
+        matches = self.rank_templates(frozenset(normalized_user), max_recipes)
+        recipes = self.render_recipes(matches, user_ingredients, normalized_user)
+        return [(overall, primary, self._popularity(compiled.template_id), compiled.template_id, recipe)
+                for (compiled, overall, primary), recipe in zip(matches, recipes)]
+
+    def ranked_batch(self, parsed: List[Tuple[List[str], List[str]]], max_recipes: int) -> List:
+        """ranked() for several pantries in one catalog pass; a pantry that fails to render yields its exception"""
+        user_sets = list(dict.fromkeys(frozenset(normalized_user) for _, normalized_user in parsed))
+        rankings = dict(zip(user_sets, self.rank_templates_batch(user_sets, max_recipes)))
+        results: List = []
+        for user_ingredients, normalized_user in parsed:
+            matches = rankings[frozenset(normalized_user)]
+            try:
+                recipes = self.render_recipes(matches, user_ingredients, normalized_user)
+            except Exception as e:
+                results.append(e)
+                continue
+            results.append([(overall, primary, self._popularity(compiled.template_id), compiled.template_id, recipe)
+                            for (compiled, overall, primary), recipe in zip(matches, recipes)])
+        return results
+
+def _init_shard(catalog_path: Optional[str], start: int, end: int, options: Dict[str, Any]):
+    """Map the shared catalog and compile and index this worker's slice of it"""
+    global _shard
+    templates, substitutions = open_catalog(catalog_path)
+    popularity = PopularityTable.load(options["popularity"]) if options["popularity"] else None
+    _shard = ShardGenerator(
+        start,
+        templates=templates[start:end],
+        substitutions=substitutions,
+        normalizer=make_normalizer(options["normalizer"], options["lexicon"]),
+        fuzzy_matching=False,
+        scoring_backend=options["scoring_backend"],
+        jitter_seed=options["jitter_seed"],
+        popularity=popularity,
+        popularity_boost=options["popularity_boost"]
+    )
+
+def _shard_call(method: str, args: tuple) -> Any:
+    return getattr(_shard, method)(*args)
+
+class ShardedRecipeEngine:
+    """Serves SmartRecipeGenerator's query methods from one worker process per catalog shard.
+
+    Templates are split into contiguous ranges, so each shard's catalog order is the global
+    order and ties resolve as they would in one process. User input is matched once here,
+    against the vocabulary of the whole catalog; each shard returns its local top k already
+    rendered and the coordinator keeps the global top k. With a jitter seed, results are
+    identical to a single SmartRecipeGenerator over the same catalog. Ranked results are
+    not cached.
+    """
+
+    def __init__(self, shards: int, catalog_path: Optional[str] = None, normalizer: str = "lexicon",
+                 lexicon_path: Optional[str] = None, fuzzy_matching: bool = True, scoring_backend: str = "python",
+                 jitter_seed: Optional[int] = None, stage_observer: Optional[Callable[[str, float], None]] = None,
+                 popularity_path: Optional[str] = None, popularity_boost: int = DEFAULT_POPULARITY_BOOST):
+        if shards < 1:
+            raise ValueError("Need at least one shard")
+        templates, substitutions = open_catalog(catalog_path)
+        total = len(templates)
+        if hasattr(templates, "close"):
+            templates.close()
+
+        self.normalizer = make_normalizer(normalizer, lexicon_path)
+        self.ingredient_substitutions = substitutions
+        self.substitution_sets = normalize_substitutions(substitutions, self.normalizer.normalize)
+        self.shard_ranges: List[Tuple[int, int]] = [
+            (total * i // shards, total * (i + 1) // shards) for i in range(shards)
+        ]
+        options = {"normalizer": normalizer, "lexicon": lexicon_path, "scoring_backend": scoring_backend,
+                   "jitter_seed": jitter_seed, "popularity": popularity_path, "popularity_boost": popularity_boost}
+        context = multiprocessing.get_context("spawn")
+        # One single-worker pool per shard, so every call for a shard reaches the process holding it
+        self._pools = [
+            ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_shard,
+                                initargs=(catalog_path, start, end, options))
+            for start, end in self.shard_ranges
+        ]
+        self.cache = None
+        # Shards serve the catalog exactly as loaded (apply_changes is unsupported), which is
+        # version 0 of it, like an unchanged SmartRecipeGenerator; generation ETags and the
+        # admin API read it from here
+        self.catalog_version = 0
+        self.jitter_seed = jitter_seed
+        self.stage_observer = stage_observer
+        self.popularity_boost = popularity_boost
+
+        # Waiting for every shard's vocabulary also warm-starts all of them before the first query
+        self.ingredient_matcher = None
+        if fuzzy_matching:
+            vocabulary = set(self.normalizer.vocabulary)
+            for keys in self._scatter("vocabulary"):
+                vocabulary.update(keys)
+            for ing, subs in self.substitution_sets.items():
+                vocabulary.add(ing)
+                vocabulary.update(subs)
+            self.ingredient_matcher = IngredientMatcher(self.normalizer.normalize, vocabulary, self.normalizer.synonyms,
+                                                        modifiers=self.normalizer.modifiers)
+        else:
+            self._scatter("vocabulary")
+
+    @classmethod
+    def from_env(cls) -> "ShardedRecipeEngine":
+        """Create an engine configured from RECIPE_SHARDS and the RECIPE_* generator variables"""
+        return cls(shards=int(os.environ.get('RECIPE_SHARDS', '2')), **generator_settings_from_env())
+
+    def _scatter(self, method: str, *args) -> List[Any]:
+        """Call method on every shard in parallel and return the results in shard order"""
+        futures = [pool.submit(_shard_call, method, args) for pool in self._pools]
+        return [future.result() for future in futures]
+
+    def timed(self, stage: str):
+        if self.stage_observer is None:
+            return NO_STAGE_TIMER
+        return StageTimer(self.stage_observer, stage)
+
+    def parse_ingredients(self, ingredients_input: str) -> List[str]:
+        return [ing.strip() for ing in ingredients_input.split(',') if ing.strip()]
+
+    def match_ingredient(self, ingredient: str) -> str:
+        if self.ingredient_matcher is None:
+            return self.normalizer.normalize(ingredient)
+        return self.ingredient_matcher.match(ingredient)
+
+    def _parse(self, ingredients_input: str) -> Tuple[List[str], List[str]]:
+        with self.timed("parse"):
+            user_ingredients = self.parse_ingredients(ingredients_input)
+        with self.timed("normalize"):
+            normalized_user = [self.match_ingredient(ing) for ing in user_ingredients]
+        return user_ingredients, normalized_user
+
+    def _merge(self, shard_results: Sequence[List[Tuple[int, int, int, int, Recipe]]], max_recipes: int) -> List[Recipe]:
+        """Global top k by (boosted overall, primary, popularity, lower template ID) from per-shard top k lists"""
+        merged = []
+        boost = self.popularity_boost
+        for (start, _), results in zip(self.shard_ranges, shard_results):
+            for overall, primary, popularity, template_id, recipe in results:
+                merged.append((-(overall + boost_points(popularity, boost)), -primary, -popularity, start + template_id, recipe))
+        merged.sort(key=lambda entry: entry[:4])
+        return [entry[4] for entry in merged[:max_recipes]]
+
+    def generate_recipes(self, ingredients_input: str, max_recipes: int = 3) -> List[Recipe]:
+        user_ingredients, normalized_user = self._parse(ingredients_input)
+        if not user_ingredients:
+            return []
+        with self.timed("shards"):
+            shard_results = self._scatter("ranked", user_ingredients, normalized_user, max_recipes)
+        with self.timed("merge"):
+            return self._merge(shard_results, max_recipes)
+
+    def iter_recipes(self, ingredients_input: str, max_recipes: int = 3) -> Iterator[Recipe]:
+        # Shards answer in one round trip, so there is nothing to gain from rendering lazily
+        yield from self.generate_recipes(ingredients_input, max_recipes)
+
+    def generate_recipes_batch(self, ingredients_inputs: List[str], max_recipes: int = 3,
+                               return_exceptions: bool = False) -> List:
+        parsed: List = []
+        for ingredients_input in ingredients_inputs:
+            try:
+                parsed.append(self._parse(ingredients_input))
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                parsed.append(e)
+        pending = [entry for entry in parsed if not isinstance(entry, Exception) and entry[0]]
+        with self.timed("shards"):
+            shard_results = self._scatter("ranked_batch", pending, max_recipes) if pending else []
+
+        results: List = []
+        position = 0
+        for entry in parsed:
+            if isinstance(entry, Exception):
+                results.append(entry)
+                continue
+            if not entry[0]:
+                results.append([])
+                continue
+            per_shard = [shard[position] for shard in shard_results]
+            position += 1
+            error = next((result for result in per_shard if isinstance(result, Exception)), None)
+            if error is not None:
+                if not return_exceptions:
+                    raise error
+                results.append(error)
+                continue
+            results.append(self._merge(per_shard, max_recipes))
+        return results
+
+    def find_cookable(self, ingredients_input: str, max_missing: int = 0, limit: Optional[int] = None) -> List[CookableRecipe]:
+        user_ingredients, normalized_user = self._parse(ingredients_input)
+        if not user_ingredients:
+            return []
+        with self.timed("shards"):
+            shard_results = self._scatter("cookable_matches", user_ingredients, normalized_user, max_missing, limit)
+        merged = []
+        for (start, _), results in zip(self.shard_ranges, shard_results):
+            for missing_count, template_id, recipe in results:
+                merged.append((missing_count, start + template_id, recipe))
+        merged.sort(key=lambda entry: entry[:2])
+        if limit is not None:
+            merged = merged[:limit]
+        return [recipe for _, _, recipe in merged]
+
+    def catalog_info(self) -> Dict[str, int]:
+        return {
+            "version": self.catalog_version,
+            "templates": self.shard_ranges[-1][1],
+            "substitutions": len(self.ingredient_substitutions),
+        }
+
+    def apply_changes(self, changes) -> "ShardedRecipeEngine":
+        raise UnsupportedCatalogUpdate("Catalog updates are not supported with RECIPE_SHARDS")
+
+    def shutdown(self):
+        for pool in self._pools:
+            pool.shutdown(wait=False, cancel_futures=True)
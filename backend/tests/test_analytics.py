@@ -0,0 +1,215 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from pymongo.errors import BulkWriteError
+
+import server
+from analytics import EVENTS_COLLECTION, ROLLUP_COLLECTION, AnalyticsBuffer, pantry_ingredients
+from recipe_cache import RecipeCache
+
+mongo_standin = pytest.importorskip("benchmarks.mongo_standin")
+
+class FailingDatabase:
+    def __getitem__(self, name):
+        return self
+
+    async def insert_many(self, documents, ordered=True):
+        raise ConnectionError("mongo is down")
+
+class PartialDatabase:
+    """Rejects the event at reject_index (and any duplicate keys) and can fail the rollup"""
+
+    def __init__(self, reject_index=None, fail_rollup=False):
+        self.reject_index = reject_index
+        self.fail_rollup = fail_rollup
+        self.inserted = {}
+        self.rolled_up = []
+
+    def __getitem__(self, name):
+        return self
+
+    async def insert_many(self, documents, ordered=True):
+        errors = []
+        for i, document in enumerate(documents):
+            if document["_id"] in self.inserted:
+                errors.append({"index": i, "code": 11000, "errmsg": "duplicate key"})
+            elif i == self.reject_index:
+                errors.append({"index": i, "code": 121, "errmsg": "document failed validation"})
+            else:
+                self.inserted[document["_id"]] = document
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(documents) - len(errors)})
+
+    async def bulk_write(self, requests, ordered=True):
+        if self.fail_rollup:
+            raise ConnectionError("mongo went away")
+        self.rolled_up.extend(request._filter["_id"].split(":")[1] for request in requests)
+
+@pytest.fixture
+def db():
+    return mongo_standin.AsyncDatabase(latency=0)
+
+def test_flush_writes_events_and_rollup(db):
+    """Test that queued events are written in batches and counted per day and ingredient"""
+    buffer = AnalyticsBuffer(lambda: db, batch_size=2)
+    buffer.record_generation("Eggs, milk, eggs", ["Omelet"])
+    buffer.record_generation("eggs", [])
+    buffer.record_save("recipe-1", "Omelet", ["Eggs", "cheese"])
+
+    assert asyncio.run(buffer.flush()) == 3
+    assert buffer.stats() == {"queued": 0, "recorded": 3, "dropped": 0, "written": 3, "failed": 0, "rollup_failed": 0,
+                              "flushes": 2}
+    events = list(db._database[EVENTS_COLLECTION].find({}, {"_id": 0}))
+    assert [event["type"] for event in events] == ["generate", "generate", "save"]
+    assert events[0]["pantry"] == ["eggs", "milk"] and events[2]["recipe_id"] == "recipe-1"
+
+    day = events[0]["timestamp"].date().isoformat()
+    rollup = {doc["ingredient"]: doc for doc in db._database[ROLLUP_COLLECTION].find()}
+    assert rollup["eggs"]["_id"] == f"{day}:eggs" and rollup["eggs"]["day"] == day
+    assert (rollup["eggs"]["queries"], rollup["eggs"]["saves"]) == (2, 1)
+    assert "saves" not in rollup["milk"] and rollup["cheese"]["saves"] == 1
+
+def test_full_buffer_drops_and_failed_writes_are_counted():
+    """Test that a full buffer rejects events and a failed batch is dropped, not retried"""
+    buffer = AnalyticsBuffer(FailingDatabase, max_size=2, batch_size=10)
+    assert buffer.record_generation("eggs", []) and buffer.record_generation("milk", [])
+    assert not buffer.record_generation("rice", [])
+
+    assert asyncio.run(buffer.flush()) == 0
+    assert buffer.stats() == {"queued": 0, "recorded": 2, "dropped": 1, "written": 0, "failed": 2, "rollup_failed": 0,
+                              "flushes": 1}
+    assert pantry_ingredients(" Eggs ,, milk,EGGS ") == ["eggs", "milk"]
+
+def test_partial_inserts_and_failed_rollups_are_counted_apart():
+    """Test that only inserted events are counted written and rolled up, and a failed rollup keeps them written"""
+    database = PartialDatabase(reject_index=1)
+    buffer = AnalyticsBuffer(lambda: database)
+    for pantry in ("eggs", "milk", "rice"):
+        buffer.record_generation(pantry, [])
+    assert asyncio.run(buffer.flush()) == 2
+    assert (buffer.written, buffer.failed, buffer.rollup_failed) == (2, 1, 0)
+    assert sorted(database.rolled_up) == ["eggs", "rice"]
+
+    database = PartialDatabase(fail_rollup=True)
+    buffer = AnalyticsBuffer(lambda: database)
+    buffer.record_generation("eggs", [])
+    assert asyncio.run(buffer.flush()) == 1
+    assert (buffer.written, buffer.failed, buffer.rollup_failed) == (1, 0, 1)
+
+def test_cancelled_flush_requeues_its_batch():
+    """Test that a batch whose insert is cancelled is written once by the next flush"""
+    database = PartialDatabase()
+    buffer = AnalyticsBuffer(lambda: database)
+
+    async def scenario():
+        started = asyncio.Event()
+        insert_many = database.insert_many
+
+        async def slow_insert(documents, ordered=True):
+            # The insert lands, but the caller is cancelled before it hears back
+            await insert_many(documents, ordered)
+            started.set()
+            await asyncio.sleep(60)
+
+        database.insert_many = slow_insert
+        buffer.record_generation("eggs", [])
+        buffer.record_generation("milk", [])
+        task = asyncio.create_task(buffer.flush())
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert buffer.stats()["queued"] == 2
+
+        database.insert_many = insert_many
+        return await buffer.flush()
+
+    assert asyncio.run(scenario()) == 2
+    assert len(database.inserted) == 2
+    assert sorted(database.rolled_up) == ["eggs", "milk"]
+    assert (buffer.written, buffer.failed) == (2, 0)
+
+def test_background_flush_on_full_batch(db):
+    """Test that the flusher wakes as soon as a batch fills up, before the interval passes"""
+    buffer = AnalyticsBuffer(lambda: db, batch_size=2, flush_interval=60)
+
+    async def scenario():
+        task = asyncio.create_task(buffer.run())
+        await asyncio.sleep(0)
+        buffer.record_generation("eggs", [])
+        buffer.record_generation("milk", [])
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if buffer.written:
+                break
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert buffer.written == 2
+
+def test_routes_record_events_and_popular_ingredients(db, monkeypatch):
+    """Test that generation and saves are recorded and the rollup answers popularity queries"""
+    buffer = AnalyticsBuffer(lambda: db)
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "analytics", buffer)
+    client = TestClient(server.app)
+
+    assert client.post("/api/generate-recipes", json={"ingredients": "eggs, milk, cheese"}).status_code == 200
+    saved = client.post("/api/save-recipe", json={
+        "name": "Omelet", "description": "Eggs", "cook_time": "5 mins", "servings": "1", "difficulty": "Easy",
+        "available_ingredients": ["cheese"], "missing_ingredients": [], "instructions": ["Cook"],
+        "match_percentage": 90,
+    }).json()
+    assert [event["type"] for event in buffer._queue] == ["generate", "save"]
+    assert buffer._queue[0]["recipes"] and buffer._queue[1]["recipe_id"] == saved["id"]
+    asyncio.run(buffer.flush())
+
+    # An old day outside the window is ignored
+    old_day = (datetime.utcnow() - timedelta(days=30)).date().isoformat()
+    db._database[ROLLUP_COLLECTION].insert_one({"_id": f"{old_day}:rice", "day": old_day, "ingredient": "rice", "queries": 50})
+
+    response = client.get("/api/analytics/popular-ingredients", params={"days": 7, "by": "saves", "limit": 2})
+    assert response.json() == [
+        {"ingredient": "cheese", "queries": 1, "saves": 1},
+        {"ingredient": "eggs", "queries": 1, "saves": 0},
+    ]
+    assert client.get("/api/analytics/popular-ingredients", params={"days": 60}).json()[0]["ingredient"] == "rice"
+    assert client.get("/api/analytics/popular-ingredients", params={"by": "views"}).status_code == 422
+
+def test_conditional_generation_records_impressions(db, monkeypatch):
+    """Test that a 304 still records its generation event, and a tag this process never issued is answered in full"""
+    buffer = AnalyticsBuffer(lambda: db)
+    monkeypatch.setattr(server, "analytics", buffer)
+    monkeypatch.setattr(server, "generation_impressions", RecipeCache())
+    client = TestClient(server.app)
+    payload = {"ingredients": "eggs, milk, cheese"}
+
+    etag = client.post("/api/generate-recipes", json=payload).headers["ETag"]
+    assert client.post("/api/generate-recipes", json=payload, headers={"If-None-Match": etag}).status_code == 304
+    server.generation_impressions.clear()
+    assert client.post("/api/generate-recipes", json=payload, headers={"If-None-Match": etag}).status_code == 200
+    events = list(buffer._queue)
+    assert len(events) == 3 and events[0]["recipes"]
+    assert all(event["recipes"] == events[0]["recipes"] for event in events)
+
+def test_stream_and_batch_routes_record_generations(db, monkeypatch):
+    """Test that streamed and batched generations record one event per pantry with the recipes sent"""
+    buffer = AnalyticsBuffer(lambda: db)
+    monkeypatch.setattr(server, "analytics", buffer)
+    client = TestClient(server.app)
+
+    response = client.post("/api/generate-recipes/stream", json={"ingredients": "chicken, rice", "max_recipes": 2})
+    streamed = [json.loads(line)["name"] for line in response.text.splitlines()]
+    assert [event["recipes"] for event in buffer._queue] == [streamed]
+    assert buffer._queue[0]["pantry"] == ["chicken", "rice"]
+
+    buffer._queue.clear()
+    response = client.post("/api/generate-recipes/batch", json={"ingredients": ["eggs, cheese", " ", "dragonfruit"]})
+    results = response.json()["results"]
+    assert [(event["pantry"], event["recipes"]) for event in buffer._queue] == [
+        (["eggs", "cheese"], [recipe["name"] for recipe in results[0]["recipes"]]),
+        (["dragonfruit"], []),
+    ]
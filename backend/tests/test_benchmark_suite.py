@@ -0,0 +1,36 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("mongomock")
+
+from benchmarks.suite import find_regressions, load_thresholds, main, threshold_for  # noqa: E402
+
+def results(**medians):
+    return {"benchmarks": {name: {"median_us": median} for name, median in medians.items()}}
+
+def test_find_regressions_uses_per_benchmark_thresholds():
+    """Test that slowdowns beyond the threshold for a benchmark's base name are flagged"""
+    thresholds = {"default": 0.25, "generate_recipes": 0.5}
+    baseline = results(customize_instructions=10.0, **{"generate_recipes[templates=10]": 100.0})
+    current = results(customize_instructions=13.0, new_benchmark=1.0, **{"generate_recipes[templates=10]": 140.0})
+
+    rows = {row["name"]: row for row in find_regressions(baseline, current, thresholds)}
+    assert set(rows) == {"customize_instructions", "generate_recipes[templates=10]"}
+    assert rows["customize_instructions"]["regressed"]
+    assert not rows["generate_recipes[templates=10]"]["regressed"]
+    assert threshold_for("http_generate_recipes[templates=1000]", load_thresholds()) > 0
+
+def test_suite_run_writes_comparable_results(tmp_path):
+    """Test a minimal suite run end to end, including the HTTP load driver and a self-comparison"""
+    output = tmp_path / "results.json"
+    args = ["run", "--sizes", "10", "--pantries", "5", "--rounds", "1",
+            "--http-templates", "10", "--http-requests", "10", "--concurrency", "2"]
+    environ = dict(os.environ)
+    assert main(args + ["--output", str(output)]) == 0
+    assert dict(os.environ) == environ
+    benchmarks = json.loads(output.read_text())["benchmarks"]
+    assert benchmarks["http_generate_recipes[templates=10]"]["statuses"] == {"200": 10}
+    assert benchmarks["generate_recipes[templates=10]"]["median_us"] > 0
+    assert main(["compare", str(output), str(output)]) == 0
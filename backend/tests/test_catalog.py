@@ -0,0 +1,79 @@
+import csv
+
+from benchmarks.bench_catalog_startup import compile_synthetic
+from benchmarks.synthetic import make_catalog, make_pantries
+from catalog import (
+    DEFAULT_CATALOG_PATH, DEFAULT_CATALOG_SOURCE, MappedCatalog, MappedIndex, compile_catalog, load_source
+)
+from recipe_generator import SmartRecipeGenerator
+
+TEMPLATE_FIELDS = (
+    "name", "description", "primary_ingredients", "optional_ingredients", "cook_time", "servings",
+    "difficulty", "instructions_template", "category", "image_url"
+)
+
+def _fields(template):
+    return {field: getattr(template, field) for field in TEMPLATE_FIELDS}
+
+def _compile(templates, substitutions, path):
+    generator = SmartRecipeGenerator(templates=[], substitutions=substitutions)
+    return compile_catalog(templates, substitutions, path, generator.normalize_ingredient,
+                           generator.normalization_fingerprint)
+
+def test_shipped_catalog_is_compiled_from_source(tmp_path):
+    """Test that the shipped binary catalog is up to date with its JSON source"""
+    templates, substitutions = load_source(DEFAULT_CATALOG_SOURCE)
+    compiled = _compile(templates, substitutions, tmp_path / "default.shelfcat")
+    assert compiled.read_bytes() == DEFAULT_CATALOG_PATH.read_bytes()
+
+def test_mapped_catalog_round_trip():
+    """Test that templates and substitutions read back exactly as written"""
+    templates, substitutions = load_source(DEFAULT_CATALOG_SOURCE)
+    catalog = MappedCatalog(DEFAULT_CATALOG_PATH)
+
+    assert len(catalog) == len(templates) == 8
+    assert [_fields(t) for t in catalog] == [_fields(t) for t in templates]
+    assert _fields(catalog[-1]) == _fields(templates[-1])
+    assert catalog.substitutions == substitutions
+
+def test_mapped_generator_matches_in_memory_generator():
+    """Test that the memory-mapped catalog and its pre-built index rank like in-memory templates"""
+    templates, substitutions = load_source(DEFAULT_CATALOG_SOURCE)
+    mapped = SmartRecipeGenerator(jitter_seed=1)
+    in_memory = SmartRecipeGenerator(templates=templates, substitutions=substitutions, jitter_seed=1)
+    assert isinstance(mapped.ingredient_index, MappedIndex)
+
+    for pantry in ("eggs, cheese", "chicken, rice, onion", "sourdough, cheddar", "spaghetti", "milk"):
+        assert ([r.model_dump() for r in mapped.generate_recipes(pantry, 8)] ==
+                [r.model_dump() for r in in_memory.generate_recipes(pantry, 8)])
+
+def test_csv_source_compiles(tmp_path):
+    """Test compiling a CSV source with '|'-separated list columns"""
+    source = tmp_path / "recipes.csv"
+    with open(source, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(TEMPLATE_FIELDS)
+        writer.writerow(["Tomato Toast", "Toast, with tomato", "bread|tomato", "basil", "5 mins", "1 serving",
+                         "Easy", "Toast the bread|Add {toppings}", "", ""])
+    templates, _ = load_source(source)
+    path = _compile(templates, {"tomato": ["cherry tomatoes"]}, tmp_path / "recipes.shelfcat")
+
+    generator = SmartRecipeGenerator(catalog_path=path)
+    assert _fields(generator.recipe_templates[0])["category"] == "main"
+    recipes = generator.generate_recipes("cherry tomatoes")
+    assert [r.name for r in recipes] == ["Tomato Toast"]
+    assert recipes[0].instructions == ["Toast the bread", "Add desired toppings"]
+
+def test_mapped_generator_bounds_compiled_templates(tmp_path):
+    """Test that a mapped catalog keeps only the most recently used templates compiled"""
+    path = tmp_path / "synthetic.shelfcat"
+    compile_synthetic(300, path)
+    mapped = SmartRecipeGenerator(catalog_path=path, jitter_seed=1, compiled_cache_size=16)
+    in_memory = SmartRecipeGenerator(templates=make_catalog(300, seed=7), jitter_seed=1)
+
+    for pantry in make_pantries(40, seed=3):
+        assert ([r.model_dump() for r in mapped.generate_recipes(pantry, 5)] ==
+                [r.model_dump() for r in in_memory.generate_recipes(pantry, 5)])
+        assert ([r.model_dump() for r in mapped.find_cookable(pantry, 3)] ==
+                [r.model_dump() for r in in_memory.find_cookable(pantry, 3)])
+    assert 0 < mapped.compiled_templates.cached() <= 16
@@ -0,0 +1,146 @@
+import json
+
+import pytest
+
+from benchmarks.synthetic import make_catalog, make_pantries
+from catalog_updates import CatalogChanges, CatalogWatcher, diff_sources
+from overlay import REMOVED, patch_mapping, patch_sequence
+from recipe_cache import RecipeCache
+from recipe_generator import CatalogUpdateError, RecipeTemplate, SmartRecipeGenerator, UnsupportedCatalogUpdate
+
+def replaced(template, **fields):
+    data = dict(vars(template))
+    data.update(fields)
+    return RecipeTemplate(**data)
+
+def placeholder(name):
+    """A template no test pantry can match or cook with five missing ingredients, standing in for a removed one"""
+    unused = [f"unused {word}" for word in ("alpha", "beta", "gamma", "delta", "epsilon", "zeta")]
+    return RecipeTemplate(name, "", unused, [], "1 min", "1", "Easy", ["Wait"])
+
+def assert_same_results(generator, expected, pantries):
+    for pantry in pantries:
+        assert generator.generate_recipes(pantry, 5) == expected.generate_recipes(pantry, 5)
+        for max_missing in (0, 2, 5):
+            assert generator.find_cookable(pantry, max_missing) == expected.find_cookable(pantry, max_missing)
+    assert generator.generate_recipes_batch(pantries[:10], 3) == expected.generate_recipes_batch(pantries[:10], 3)
+
+def test_overlays_leave_their_base_untouched():
+    """Test that patched mappings and sequences answer for their own version only"""
+    base = {"a": 1, "b": 2}
+    first = patch_mapping(base, {"b": REMOVED, "c": 3})
+    second = patch_mapping(first, {"c": REMOVED, "a": 10})
+    assert base == {"a": 1, "b": 2}
+    assert dict(first) == {"a": 1, "c": 3} and len(first) == 2 and "b" not in first
+    assert dict(second) == {"a": 10} and len(second) == 1 and second.get("c") is None
+
+    slots = patch_sequence(["x", "y"], {1: None, 2: "z"})
+    assert len(slots) == 3 and slots.live == 2 and slots[1] is None
+    assert list(slots) == ["x", "z"]
+    with pytest.raises(IndexError):
+        patch_sequence(slots, {4: "gap"})
+
+    # Large deltas are flattened into a plain dict
+    assert type(patch_mapping(base, {i: i for i in range(2000)})) is dict
+
+def test_added_and_replaced_templates_match_a_fresh_generator():
+    """Test that an updated generator ranks and cooks exactly like one built from the updated catalog"""
+    catalog = make_catalog(300, seed=1)
+    pantries = make_pantries(40, seed=1)
+    generator = SmartRecipeGenerator(templates=catalog[:250], jitter_seed=7, cache=RecipeCache())
+    before = [generator.generate_recipes(pantry, 5) for pantry in pantries]
+    generator.find_cookable(pantries[0], 2)  # build the cookable index so it gets patched
+
+    updates = [replaced(catalog[i], primary_ingredients=catalog[i + 100].primary_ingredients) for i in (3, 40, 77)]
+    updated = generator.apply_changes(CatalogChanges(templates=updates + catalog[250:]))
+
+    expected_catalog = list(catalog)
+    for i, template in zip((3, 40, 77), updates):
+        expected_catalog[i] = template
+    assert_same_results(updated, SmartRecipeGenerator(templates=expected_catalog, jitter_seed=7), pantries)
+    assert updated.catalog_info() == {"version": 1, "templates": 300, "substitutions": len(generator.ingredient_substitutions)}
+
+    # The original generator still serves the catalog it was built with
+    assert [generator.generate_recipes(pantry, 5) for pantry in pantries] == before
+    assert generator.catalog_version == 0
+
+def test_removed_templates_are_never_returned():
+    """Test that removed templates leave their slot empty and everything else unchanged"""
+    catalog = make_catalog(200, seed=2)
+    pantries = make_pantries(40, seed=2)
+    generator = SmartRecipeGenerator(templates=catalog, jitter_seed=3)
+    generator.find_cookable(pantries[0], 2)
+    removed = [catalog[i].name for i in (0, 50, 51, 199)]
+
+    updated = generator.apply_changes(CatalogChanges(removed=removed))
+    expected_catalog = [placeholder(t.name) if t.name in removed else t for t in catalog]
+    assert_same_results(updated, SmartRecipeGenerator(templates=expected_catalog, jitter_seed=3), pantries)
+    assert updated.catalog_info()["templates"] == 196
+
+    # A removed name can be added back; it goes to the end of the catalog
+    restored = updated.apply_changes(CatalogChanges(templates=[catalog[50]]))
+    assert restored.template_ids[catalog[50].name] == 200
+    assert len(restored.compiled_templates) == 201
+
+def test_substitution_changes_match_a_fresh_generator():
+    """Test that substitution edits recompile the templates using the affected ingredients"""
+    catalog = make_catalog(200, seed=4)
+    pantries = make_pantries(40, seed=4) + ["chicken, seitan, rice", "tofu, quinoa"]
+    generator = SmartRecipeGenerator(templates=catalog, jitter_seed=5)
+    generator.find_cookable(pantries[0], 2)
+    substitutions = dict(generator.ingredient_substitutions)
+
+    updated = generator.apply_changes(CatalogChanges(substitutions={"chicken": ["seitan", "tofu"], "rice": None}))
+    substitutions["chicken"] = ["seitan", "tofu"]
+    del substitutions["rice"]
+    expected = SmartRecipeGenerator(templates=catalog, substitutions=substitutions, jitter_seed=5)
+    assert_same_results(updated, expected, pantries)
+    assert updated.match_ingredient("seitan") == "seitan"
+
+def test_cached_rankings_survive_unrelated_changes():
+    """Test that only cached rankings sharing an ingredient with a changed template are dropped"""
+    generator = SmartRecipeGenerator(cache=RecipeCache())
+    generator.generate_recipes("eggs, milk")
+    generator.generate_recipes("dragonfruit")
+    new = RecipeTemplate("Dragonfruit Bowl", "Fresh", ["dragonfruit"], [], "5 mins", "1", "Easy", ["Slice {ingredients}"])
+
+    updated = generator.apply_changes(CatalogChanges(templates=[new]))
+    assert len(generator.cache) == 2
+    assert len(updated.cache) == 1
+    assert [r.name for r in updated.generate_recipes("dragonfruit")] == ["Dragonfruit Bowl"]
+    assert generator.generate_recipes("dragonfruit") == []
+
+def test_invalid_changes_are_rejected():
+    """Test that removing unknown templates or updating and removing one at once fails"""
+    generator = SmartRecipeGenerator()
+    with pytest.raises(CatalogUpdateError):
+        generator.apply_changes(CatalogChanges(removed=["No Such Recipe"]))
+    omelet = generator.recipe_templates[0]
+    with pytest.raises(CatalogUpdateError):
+        generator.apply_changes(CatalogChanges(templates=[omelet], removed=[omelet.name]))
+
+def test_numpy_backend_rejects_updates():
+    """Test that configurations without catalog update support raise their own error"""
+    pytest.importorskip("numpy")
+    generator = SmartRecipeGenerator(scoring_backend="numpy")
+    with pytest.raises(UnsupportedCatalogUpdate):
+        generator.apply_changes(CatalogChanges(removed=[generator.recipe_templates[0].name]))
+
+def test_watcher_reports_source_edits(tmp_path):
+    """Test that the watcher diffs each saved version of the source against the previous one"""
+    templates = [vars(template) for template in make_catalog(3)]
+    source = tmp_path / "catalog.json"
+    source.write_text(json.dumps({"templates": templates, "substitutions": {"rice": ["quinoa"]}}))
+    watcher = CatalogWatcher(source)
+    assert watcher.poll() is None
+
+    edited = dict(templates[1], cook_time="99 mins")
+    source.write_text(json.dumps({"templates": [templates[0], edited], "substitutions": {"pasta": ["penne"]}}))
+    changes = watcher.poll()
+    assert [t.cook_time for t in changes.templates] == ["99 mins"]
+    assert changes.removed == [templates[2]["name"]]
+    assert changes.substitutions == {"pasta": ["penne"], "rice": None}
+    assert watcher.poll() is None
+
+    old = ([RecipeTemplate(**t) for t in templates], {})
+    assert not diff_sources(old, old)
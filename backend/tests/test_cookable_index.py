@@ -0,0 +1,33 @@
+from benchmarks.synthetic import make_generator, make_pantries
+from cookable_index import MAX_INDEXED_MISSING
+from recipe_generator import SmartRecipeGenerator
+
+def brute_force(generator, user_set, max_missing):
+    results = []
+    for compiled in generator.compiled_templates:
+        missing = len(compiled.ingredient_counts) - len(compiled.covered_ingredients(user_set))
+        if missing <= max_missing:
+            results.append((missing, compiled.template_id))
+    return sorted(results)
+
+def test_index_matches_full_scan():
+    """Test that prefix-indexed and full-scan lookups return exactly the templates a full scan finds"""
+    generator = make_generator(2000, seed=3)
+    index = generator.cookable_index
+    for pantry in make_pantries(30, seed=3):
+        user_set = frozenset(generator.match_ingredient(ing.strip()) for ing in pantry.split(","))
+        for max_missing in range(MAX_INDEXED_MISSING + 3):
+            assert index.find(user_set, max_missing) == brute_force(generator, user_set, max_missing)
+
+def test_find_cookable_lists_exact_missing_ingredients():
+    """Test that cookable recipes count substitutes as covered and list only real missing ingredients"""
+    generator = SmartRecipeGenerator()
+    pantry = "eggs, cheese, milk, butter, onion, tomato, rice, chicken, garlic"
+    recipes = generator.find_cookable(pantry, max_missing=2)
+    assert recipes
+    assert [r.missing_count for r in recipes] == sorted(r.missing_count for r in recipes)
+    for recipe in recipes:
+        assert len(recipe.missing_ingredients) == recipe.missing_count <= 2
+        assert "salt" not in recipe.missing_ingredients
+    assert generator.find_cookable(pantry, max_missing=2, limit=1) == recipes[:1]
+    assert generator.find_cookable(" ", max_missing=2) == []
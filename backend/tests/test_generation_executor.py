@@ -0,0 +1,97 @@
+import asyncio
+import threading
+
+import pytest
+
+from generation_executor import ExecutorSaturated, GenerationExecutor
+from recipe_generator import SmartRecipeGenerator
+
+class BlockingGenerator:
+    def __init__(self):
+        self.release = threading.Event()
+
+    def generate_recipes(self, ingredients, max_recipes):
+        self.release.wait(timeout=5)
+        return [ingredients]
+
+def seeded_generator():
+    return SmartRecipeGenerator(jitter_seed=7)
+
+def test_thread_mode_rejects_when_saturated():
+    """Test that calls beyond max_pending fail fast instead of queueing"""
+    generator = BlockingGenerator()
+    executor = GenerationExecutor(generator, mode="thread", max_workers=1, max_pending=2)
+
+    async def scenario():
+        running = [asyncio.ensure_future(executor.run("generate_recipes", "eggs", 3)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExecutorSaturated):
+            await executor.run("generate_recipes", "rice", 3)
+        generator.release.set()
+        return await asyncio.gather(*running)
+
+    try:
+        assert asyncio.run(scenario()) == [["eggs"], ["eggs"]]
+        assert executor.stats()["rejected"] == 1
+        assert executor.pending == 0
+    finally:
+        executor.shutdown()
+
+def test_process_mode_matches_inline():
+    """Test that pre-loaded worker processes return the same recipes as inline generation"""
+    inline = GenerationExecutor(SmartRecipeGenerator(jitter_seed=7), mode="inline")
+    process = GenerationExecutor(None, generator_factory=seeded_generator, mode="process", max_workers=1)
+
+    async def scenario():
+        return (
+            await inline.run("generate_recipes", "chicken, rice, onion", 3),
+            await process.run("generate_recipes", "chicken, rice, onion", 3),
+        )
+
+    try:
+        expected, actual = asyncio.run(scenario())
+        assert [r.model_dump() for r in actual] == [r.model_dump() for r in expected]
+    finally:
+        process.shutdown()
+
+def test_stream_yields_recipes_in_every_mode():
+    """Test that streamed recipes match generate_recipes and release their pending slot"""
+    expected = [r.model_dump() for r in seeded_generator().generate_recipes("chicken, rice, onion", 5)]
+    executors = [
+        GenerationExecutor(seeded_generator(), mode="inline"),
+        GenerationExecutor(seeded_generator(), mode="thread", max_workers=1),
+        GenerationExecutor(None, generator_factory=seeded_generator, mode="process", max_workers=1),
+    ]
+
+    async def collect(executor):
+        return [r.model_dump() async for r in executor.stream("iter_recipes", "chicken, rice, onion", 5)]
+
+    try:
+        for executor in executors:
+            assert asyncio.run(collect(executor)) == expected
+            assert executor.pending == 0
+    finally:
+        for executor in executors:
+            executor.shutdown()
+
+def test_generator_is_built_on_first_use():
+    """Test that the executor defers building its generator until warm-up or the first call"""
+    built = []
+
+    def factory():
+        built.append(True)
+        return seeded_generator()
+
+    executor = GenerationExecutor(None, generator_factory=factory, mode="thread", stage_observer=lambda stage, seconds: None)
+
+    async def scenario():
+        assert executor.loaded_generator is None
+        await executor.warm_up()
+        return await executor.run("generate_recipes", "chicken, rice, onion", 3)
+
+    try:
+        assert asyncio.run(scenario())
+        assert len(built) == 1
+        assert executor.loaded_generator.stage_observer is executor.stage_observer
+    finally:
+        executor.shutdown()
@@ -0,0 +1,126 @@
+import random
+
+import pytest
+
+from catalog import MappedIndex
+from ingredient_normalizer import (
+    INGREDIENT_NORMALIZATIONS, BKTree, IngredientMatcher, LegacyNormalizer, LexiconNormalizer, levenshtein
+)
+from recipe_generator import SmartRecipeGenerator
+
+@pytest.fixture(scope="module")
+def normalizer():
+    return LexiconNormalizer.from_file()
+
+@pytest.mark.parametrize("raw, expected", [
+    ("2 large tomatoes", "tomato"),
+    ("Chopped Onions", "onion"),
+    ("3 cloves garlic", "garlic"),
+    ("1/2 cup all-purpose flour", "flour"),
+    ("½ lb ground beef", "beef"),
+    ("extra virgin olive oil", "olive oil"),
+    ("salt to taste", "salt"),
+    ("(optional) parsley", "parsley"),
+    ("cheddar cheese", "cheddar"),
+    ("chicken breasts", "chicken"),
+    ("scallions", "green onion"),
+    ("cherry tomatoes", "cherry tomato"),
+    ("potatoes", "potato"),
+    ("berries", "berry"),
+    ("radishes", "radish"),
+    ("couscous", "couscous"),
+    ("swiss", "swiss"),
+    ("cloves", "clove"),
+])
+def test_lexicon_pipeline(normalizer, raw, expected):
+    """Test quantity/unit/descriptor stripping, singularization and synonyms"""
+    assert normalizer.normalize(raw) == expected
+
+def test_lexicon_agrees_with_legacy_table(normalizer):
+    """Test that every pair the legacy table merged is still merged"""
+    for raw, canonical in INGREDIENT_NORMALIZATIONS.items():
+        assert normalizer.normalize(raw) == normalizer.normalize(canonical)
+        assert LegacyNormalizer().normalize(raw.upper()) == canonical
+
+def test_lexicon_normalization_is_memoized():
+    """Test that repeat inputs are served from the bounded memo"""
+    normalizer = LexiconNormalizer.from_file()
+    normalizer.memo_size = 2
+    normalizer._memo.clear()
+    for raw in ("Eggs", "Eggs", "onions"):
+        normalizer.normalize(raw)
+    assert normalizer._memo == {"Eggs": "egg", "onions": "onion"}
+    normalizer.normalize("leeks")
+    assert normalizer._memo == {"leeks": "leek"}
+
+def test_bk_tree_matches_brute_force():
+    """Test that bounded BK-tree lookups find exactly the terms a linear scan finds"""
+    rng = random.Random(5)
+    words = ["".join(rng.choice("abcde") for _ in range(rng.randint(1, 7))) for _ in range(400)]
+    tree = BKTree(words)
+    for query in words[:50] + ["abc", "eeeeeee", ""]:
+        for max_distance in (0, 1, 2):
+            expected = sorted((levenshtein(query, word, 99), word) for word in set(words))
+            expected = [(distance, word) for distance, word in expected if distance <= max_distance]
+            assert tree.search(query, max_distance) == expected
+
+def test_matcher_resolves_unknown_input(normalizer):
+    """Test suffix and typo-tolerant fallbacks, and that ambiguous or short input is left alone"""
+    matcher = IngredientMatcher(normalizer.normalize,
+                                {"rice", "garlic", "broccoli", "pea", "pear", "beef", "bean", "milk", "noodle", "egg"},
+                                {"chicken breast": "chicken"}, modifiers=normalizer.modifiers)
+    assert matcher.match("1 cup basmati rice") == "rice"
+    assert matcher.match("long grain white rice") == "rice"
+    # A leading word that is another ingredient makes a different ingredient, not a variety
+    assert matcher.match("coconut milk") == "coconut milk"
+    assert matcher.match("egg noodles") == "egg noodle"
+    assert matcher.match("rice noodles") == "rice noodle"
+    assert matcher.match("red wine vinegar") == "red wine vinegar"
+    assert matcher.match("garlik") == "garlic"
+    assert matcher.match("brocolli") == "broccoli"
+    assert matcher.match("chiken breasts") == "chicken"
+    # Four letters allow one edit, but "pea", "pear" and "bean" are all one edit from "pean"
+    assert matcher.match("pean") == "pean"
+    # Words under four letters are never corrected
+    assert matcher.match("pes") == "pes"
+
+def test_extended_matcher_leaves_the_original_unchanged(normalizer):
+    """Test that extending a matcher copies its BK-tree instead of growing the shared one"""
+    vocabulary = {"rice", "garlic", "broccoli", "pea", "beef"}
+    matcher = IngredientMatcher(normalizer.normalize, vocabulary)
+    queries = ["garlik", "brocolli", "peas", "beeh", "garlin"]
+    before = [matcher.match(query) for query in queries]
+
+    # "garlin" is one edit from "garlik" too, so the extended matcher finds the typo ambiguous
+    extended = matcher.extended({"garlin", "beet"})
+    assert extended.match("garlik") == "garlik"
+    assert extended.match("garlin") == "garlin"
+    matcher._memo.clear()
+    assert [matcher.match(query) for query in queries] == before
+    assert matcher.match("garlik") == "garlic"
+
+    fresh = BKTree(vocabulary | {"garlin", "beet"})
+    for query in queries + ["beer", "garli"]:
+        assert extended._tree.search(query, 2) == fresh.search(query, 2)
+
+def test_generator_matches_messy_input():
+    """Test that quantities, descriptors and typos reach the right recipes"""
+    generator = SmartRecipeGenerator(jitter_seed=1)
+    recipes = generator.generate_recipes("2 large tomatoes, cheddar cheese, sourdough, garlik")
+    assert recipes[0].name == "Grilled Cheese Sandwich"
+    assert recipes[0].available_ingredients == ["sourdough", "cheddar cheese", "tomato"]
+
+    assert generator.generate_recipes("3 eggs")[0].name == "Classic Omelet"
+    assert [r.name for r in generator.generate_recipes("spagetti")] == ["Pasta Primavera"]
+    typo, exact = generator.generate_recipes("spagetti")[0], generator.generate_recipes("spaghetti")[0]
+    assert typo.match_percentage == exact.match_percentage
+    assert typo.available_ingredients == ["spagetti"]
+
+def test_legacy_normalizer_rebuilds_catalog_index():
+    """Test that a catalog compiled for another normalizer is re-indexed instead of trusted"""
+    legacy = SmartRecipeGenerator(normalizer=LegacyNormalizer(), fuzzy_matching=False)
+    assert not isinstance(legacy.ingredient_index, MappedIndex)
+    assert isinstance(SmartRecipeGenerator().ingredient_index, MappedIndex)
+
+    assert [r.name for r in legacy.generate_recipes("mushroom, eggs")] == ["Classic Omelet"]
+    assert legacy.generate_recipes("2 large tomatoes") == []
@@ -158,4 +158,154 @@ def test_api_error_handling():
     
     # Test missing ingredients field
     response = client.post("/api/generate-recipes", json={})
-    assert response.status_code == 422
\ No newline at end of file
+    assert response.status_code == 422
+
+
+def test_generate_recipes_batch():
+    """Test batch recipe generation keeps input order and reports errors per item"""
+    payload = {"ingredients": ["chicken, rice", "", "milk, flour", "Rice, Chicken"]}
+
+    response = client.post("/api/generate-recipes/batch", json=payload)
+    assert response.status_code == 200
+
+    results = response.json()["results"]
+    assert len(results) == 4
+    assert results[0]["error"] is None and len(results[0]["recipes"]) > 0
+    assert "Please provide ingredients" in results[1]["error"]
+    assert "No recipes found" in results[2]["error"]
+    assert [r["name"] for r in results[3]["recipes"]] == [r["name"] for r in results[0]["recipes"]]
+
+
+def test_generate_recipes_stream():
+    """Test that streamed recipes arrive as NDJSON lines, best first"""
+    payload = {"ingredients": "chicken, tomato, rice, onion, garlic, cheese"}
+    expected = client.post("/api/generate-recipes", json=payload).json()["recipes"]
+
+    response = client.post("/api/generate-recipes/stream", json=payload)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    recipes = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["name"] for r in recipes] == [r["name"] for r in expected]
+
+    response = client.post("/api/generate-recipes/stream", json={**payload, "max_recipes": 8})
+    assert len(response.text.splitlines()) > len(expected)
+
+
+def test_generate_recipes_stream_errors():
+    """Test that streaming validates input and reports empty results before streaming starts"""
+    assert client.post("/api/generate-recipes/stream", json={"ingredients": " "}).status_code == 400
+    assert client.post("/api/generate-recipes/stream", json={"ingredients": "milk", "max_recipes": 0}).status_code == 422
+    assert client.post("/api/generate-recipes/stream", json={"ingredients": "milk, flour"}).status_code == 404
+
+
+def test_cookable_recipes():
+    """Test listing recipes cookable with a bounded number of missing ingredients"""
+    payload = {"ingredients": "eggs, cheese, milk, butter, onion, tomato, rice, chicken, garlic", "max_missing": 2}
+    response = client.post("/api/cookable-recipes", json=payload)
+    assert response.status_code == 200
+    recipes = response.json()["recipes"]
+    assert recipes and all(r["missing_count"] <= 2 for r in recipes)
+
+    assert client.post("/api/cookable-recipes", json={**payload, "max_missing": 0}).json() == {"recipes": []}
+    assert client.post("/api/cookable-recipes", json={**payload, "max_missing": -1}).status_code == 422
+    assert client.post("/api/cookable-recipes", json={"ingredients": " "}).status_code == 400
+
+
+def test_metrics_endpoint():
+    """Test that /metrics reports requests by route template and generation stage timings"""
+    client.post("/api/generate-recipes", json={"ingredients": "eggs, cheese, milk"})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_requests_total{method="POST",route="/api/generate-recipes",status="200"}' in body
+    assert 'recipe_generation_stage_seconds_count{stage="rank"}' in body
+    assert "recipe_cache_hits" in body
+
+
+def test_generate_recipes_batch_empty():
+    """Test batch recipe generation with no pantries"""
+    response = client.post("/api/generate-recipes/batch", json={"ingredients": []})
+    assert response.status_code == 400
+
+
+def test_generate_recipes_response_encoding():
+    """Test that directly encoded responses match the documented response models byte for byte"""
+    from server import RecipeGenerationResponse, RecipeBatchResponse
+    payload = {"ingredients": "chicken, tomato, rice, onion, garlic, cheese, café au lait"}
+
+    response = client.post("/api/generate-recipes", json=payload)
+    assert response.headers["content-type"] == "application/json"
+    model = RecipeGenerationResponse.model_validate_json(response.content)
+    assert response.content == json.dumps(model.model_dump(), ensure_ascii=False, separators=(",", ":")).encode()
+
+    response = client.post("/api/generate-recipes/batch", json={"ingredients": [payload["ingredients"], ""]})
+    model = RecipeBatchResponse.model_validate_json(response.content)
+    assert response.content == json.dumps(model.model_dump(), ensure_ascii=False, separators=(",", ":")).encode()
+
+    schema = client.get("/openapi.json").json()
+    ok = schema["paths"]["/api/generate-recipes"]["post"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert ok == {"$ref": "#/components/schemas/RecipeGenerationResponse"}
+
+
+def test_generate_recipes_conditional_requests(monkeypatch):
+    """Test that generation responses carry ETags and revalidate with 304 without generating"""
+    payload = {"ingredients": "chicken, rice, garlic"}
+    first = client.post("/api/generate-recipes", json=payload)
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"].startswith("private, max-age=")
+
+    # Generation is deterministic, and the ETag ignores whitespace around ingredients
+    again = client.post("/api/generate-recipes", json={"ingredients": " chicken,rice , garlic"})
+    assert again.headers["ETag"] == etag and again.content == first.content
+    assert client.post("/api/generate-recipes", json={"ingredients": "rice, chicken, garlic"}).headers["ETag"] != etag
+
+    import server
+    async def fail(*args):
+        raise AssertionError("generator called for a conditional request")
+    monkeypatch.setattr(server.generation_executor, "run", fail)
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}'):
+        response = client.post("/api/generate-recipes", json=payload, headers={"If-None-Match": if_none_match})
+        assert response.status_code == 304 and response.content == b""
+        assert response.headers["ETag"] == etag
+    monkeypatch.undo()
+    # A wildcard never turns a POST into a 304
+    assert client.post("/api/generate-recipes", json=payload, headers={"If-None-Match": "*"}).status_code == 200
+
+    # Other routes are not cacheable
+    assert client.get("/api/health").headers["Cache-Control"] == "no-store"
+
+
+def test_admin_catalog_changes(monkeypatch):
+    """Test adding and removing a template through the admin API without a restart"""
+    template = {
+        "name": "Dragonfruit Bowl",
+        "description": "A bright fruit bowl",
+        "primary_ingredients": ["dragonfruit"],
+        "cook_time": "5 mins",
+        "servings": "1",
+        "difficulty": "Easy",
+        "instructions_template": ["Slice the {ingredients}", "Serve chilled"]
+    }
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.get("/api/admin/catalog").status_code == 403
+
+    monkeypatch.setenv("ADMIN_TOKEN", "test-token")
+    assert client.get("/api/admin/catalog", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    headers = {"X-Admin-Token": "test-token"}
+    before = client.get("/api/admin/catalog", headers=headers).json()
+
+    response = client.post("/api/admin/catalog/changes", json={"templates": [template]}, headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {**before, "version": before["version"] + 1, "templates": before["templates"] + 1}
+    response = client.post("/api/generate-recipes", json={"ingredients": "dragonfruit"})
+    assert [r["name"] for r in response.json()["recipes"]] == ["Dragonfruit Bowl"]
+    etag = response.headers["ETag"]
+
+    response = client.post("/api/admin/catalog/changes", json={"remove_templates": ["Dragonfruit Bowl"]}, headers=headers)
+    assert response.json()["templates"] == before["templates"]
+    # The ETag covers the catalog version, so a response from before the change is not revalidated
+    assert client.post("/api/generate-recipes", json={"ingredients": "dragonfruit"}, headers={"If-None-Match": etag}).status_code == 404
+
+    assert client.post("/api/admin/catalog/changes", json={"remove_templates": ["Nope"]}, headers=headers).status_code == 400
+    assert client.post("/api/admin/catalog/changes", json={}, headers=headers).status_code == 400
@@ -0,0 +1,81 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from pymongo import monitoring
+from pymongo.errors import ServerSelectionTimeoutError
+
+import server
+from mongo_pool import PoolStats, client_options_from_env, warm_up
+
+class FakeDatabase:
+    """Answers ping commands, failing the first `failures` of them"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.pings = 0
+
+    async def command(self, name):
+        assert name == "ping"
+        self.pings += 1
+        if self.pings <= self.failures:
+            raise ServerSelectionTimeoutError("no servers available")
+        return {"ok": 1.0}
+
+def test_options_from_env(monkeypatch):
+    """Test that MONGO_* settings become client options and 0 leaves an option unset"""
+    for variable in ("MONGO_TIMEOUT_MS", "MONGO_WAIT_QUEUE_TIMEOUT_MS"):
+        monkeypatch.delenv(variable, raising=False)
+    options = client_options_from_env()
+    # The operation timeout bounds pool waits, so the wait-queue timeout would be ignored
+    assert options["timeoutMS"] == 10000
+    assert "waitQueueTimeoutMS" not in options
+
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "8")
+    monkeypatch.setenv("MONGO_MIN_POOL_SIZE", "0")
+    monkeypatch.setenv("MONGO_TIMEOUT_MS", "0")
+    options = client_options_from_env()
+    assert options["maxPoolSize"] == 8
+    assert options["minPoolSize"] == 0
+    assert "timeoutMS" not in options
+    assert options["waitQueueTimeoutMS"] == 2000
+
+def test_pool_stats_count_events():
+    """Test that pool events add up to open, in-use and waiting connections"""
+    stats = PoolStats()
+    address = ("localhost", 27017)
+    for _ in range(3):
+        stats.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(address))
+    for connection_id in (1, 2):
+        stats.connection_created(monitoring.ConnectionCreatedEvent(address, connection_id))
+        stats.connection_checked_out(monitoring.ConnectionCheckedOutEvent(address, connection_id))
+    stats.connection_checked_in(monitoring.ConnectionCheckedInEvent(address, 1))
+    stats.connection_closed(monitoring.ConnectionClosedEvent(address, 1, "idle"))
+
+    counts = stats.stats()
+    assert counts["created"] == 2 and counts["closed"] == 1
+    assert (counts["open"], counts["in_use"], counts["waiting"]) == (1, 1, 1)
+
+def test_warm_up_retries_until_ping_succeeds():
+    """Test that warm-up keeps pinging through failures and gives up after its attempts"""
+    database = FakeDatabase(failures=2)
+    assert asyncio.run(warm_up(database, attempts=3, delay=0))
+    assert database.pings == 3
+    assert not asyncio.run(warm_up(FakeDatabase(failures=5), attempts=2, delay=0))
+
+def test_deep_health_reports_mongo(monkeypatch):
+    """Test that deep health checks report the ping, pool and settings, and 503 when Mongo is down"""
+    client = TestClient(server.app)
+    monkeypatch.setattr(server, "db", FakeDatabase())
+    assert "mongo" not in client.get("/api/health").json()
+
+    response = client.get("/api/health", params={"deep": "true"})
+    assert response.status_code == 200
+    mongo = response.json()["mongo"]
+    assert mongo["status"] == "ok" and mongo["ping_ms"] >= 0
+    assert "in_use" in mongo["pool"] and mongo["settings"] == server.mongo_options
+
+    monkeypatch.setattr(server, "db", FakeDatabase(failures=1))
+    response = client.get("/api/health", params={"deep": "true"})
+    assert response.status_code == 503
+    assert response.json()["status"] == "degraded"
+    assert response.json()["mongo"]["status"] == "unavailable"
@@ -0,0 +1,102 @@
+import random
+
+import pytest
+
+from benchmarks.synthetic import make_catalog, make_pantries
+from catalog_updates import CatalogChanges
+from popularity import PopularityError, PopularityTable, boost_points, compute_popularity
+from recipe_generator import RecipeTemplate, SmartRecipeGenerator, select_top_k
+
+def random_table(catalog, seed=0):
+    rng = random.Random(seed)
+    # Few distinct scores, so popularity ties are exercised too
+    return PopularityTable({template.name: rng.choice([0, 0, 40, 128, 255]) for template in catalog})
+
+def test_table_round_trip(tmp_path):
+    """Test that a written table loads back and aligns to template IDs by name"""
+    table = PopularityTable({"Omelet": 255, "Crème Brûlée": 3}, saves=12)
+    path = table.write(tmp_path / "popularity.bin")
+    loaded = PopularityTable.load(path)
+    assert loaded.scores == table.scores and loaded.saves == 12
+    assert list(loaded.aligned(["Crème Brûlée", "Unknown", None, "Omelet"])) == [3, 0, 0, 255]
+
+    (tmp_path / "other.bin").write_bytes(b"not a table at all")
+    with pytest.raises(PopularityError):
+        PopularityTable.load(tmp_path / "other.bin")
+
+def test_scores_follow_save_rates_and_co_occurrence():
+    """Test that save rates are smoothed by impressions and unsaved templates score by ingredient pairs"""
+    templates = [
+        RecipeTemplate("Shown Often", "", ["eggs", "milk"], [], "", "", "Easy", []),
+        RecipeTemplate("Shown Rarely", "", ["rice", "beans"], [], "", "", "Easy", []),
+        RecipeTemplate("Lucky", "", ["rice"], [], "", "", "Easy", []),
+        RecipeTemplate("Never Saved", "", ["eggs", "cheese"], [], "", "", "Easy", []),
+        RecipeTemplate("Unrelated", "", ["tuna", "lime"], [], "", "", "Easy", []),
+    ]
+    saved = (
+        [{"name": "Shown Often", "available_ingredients": ["Eggs", "milk", "cheese"]}] * 30
+        + [{"name": "Shown Rarely", "available_ingredients": ["rice"]}, {"name": "Lucky", "available_ingredients": []}]
+    )
+    impressions = {"Shown Often": 40, "Shown Rarely": 10, "Lucky": 1}
+    table = compute_popularity(saved, templates, str.lower, impressions)
+    scores = table.scores
+    assert table.saves == 32
+    assert scores["Shown Often"] == 255
+    # One save from one showing is a perfect raw rate, pulled towards the catalog-wide rate
+    assert scores["Shown Rarely"] < scores["Lucky"] < scores["Shown Often"]
+    # Never saved, but eggs and cheese are saved together often
+    assert 0 < scores["Never Saved"] < scores["Shown Rarely"]
+    assert "Unrelated" not in scores
+
+    # Without generation events, popularity is the log-scaled save count
+    assert compute_popularity(saved, templates, str.lower).scores["Shown Rarely"] < 255
+
+def test_top_k_matches_boosted_full_sort():
+    """Test that popularity boosts the ranking score and breaks ties before catalog order"""
+    catalog = make_catalog(400, seed=6)
+    for boost in (0, 5, 30):
+        generator = SmartRecipeGenerator(templates=catalog, popularity=random_table(catalog), popularity_boost=boost)
+        scores = generator.popularity_scores
+        for pantry in make_pantries(20, seed=6):
+            user_set = frozenset(generator.match_ingredient(ing.strip()) for ing in pantry.split(","))
+            scored = []
+            for compiled in generator.compiled_templates:
+                overall, primary = compiled.match_percentages(user_set)
+                if primary > 0:
+                    popularity = scores[compiled.template_id]
+                    scored.append(((overall + boost_points(popularity, boost), primary, popularity, -compiled.template_id),
+                                   compiled.template_id, overall, primary))
+            scored.sort(reverse=True)
+            expected = [(template_id, overall, primary) for _, template_id, overall, primary in scored]
+
+            for k in (1, 3, 10):
+                ranked = select_top_k(reversed(generator.compiled_templates), user_set, k, scores, boost)
+                assert [(c.template_id, overall, primary) for c, overall, primary in ranked] == expected[:k]
+
+def test_backends_agree_with_popularity():
+    """Test that the index, full scan, batch and numpy paths rank popular templates alike"""
+    catalog = make_catalog(300, seed=7)
+    table = random_table(catalog, seed=7)
+    pantries = make_pantries(30, seed=7)
+    generators = [
+        SmartRecipeGenerator(templates=catalog, popularity=table, jitter_seed=1, **kwargs)
+        for kwargs in ({}, {"use_index": False}, {"scoring_backend": "numpy"})
+    ]
+    expected = [generators[0].generate_recipes(pantry, 5) for pantry in pantries]
+    for generator in generators:
+        assert [generator.generate_recipes(pantry, 5) for pantry in pantries] == expected
+        assert generator.generate_recipes_batch(pantries, 5) == expected
+    plain = SmartRecipeGenerator(templates=catalog, jitter_seed=1)
+    assert [plain.generate_recipes(pantry, 5) for pantry in pantries] != expected
+
+def test_catalog_changes_keep_scores_by_name():
+    """Test that replaced and added templates take their score from the table"""
+    catalog = make_catalog(50, seed=8)
+    extra = make_catalog(60, seed=9)[55]
+    table = PopularityTable({catalog[3].name: 200, extra.name: 99})
+    generator = SmartRecipeGenerator(templates=catalog, popularity=table)
+
+    updated = generator.apply_changes(CatalogChanges(templates=[extra], removed=[catalog[3].name]))
+    assert generator.popularity_scores[3] == 200
+    assert updated.popularity_scores[3] == 0
+    assert updated.popularity_scores[50] == 99 and len(updated.popularity_scores) == 51
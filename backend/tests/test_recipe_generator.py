@@ -0,0 +1,206 @@
+import json
+import random
+import time
+from pathlib import Path
+
+import pytest
+
+from benchmarks.synthetic import make_catalog
+from instruction_renderer import CompiledInstructions
+from recipe_cache import RecipeCache
+from recipe_generator import CompiledTemplate, RecipeTemplate, SmartRecipeGenerator, select_top_k
+
+# Expected output recorded from the original customize_instructions implementation
+GOLDEN_INSTRUCTIONS = Path(__file__).parent / "data" / "instructions_golden.json"
+
+PANTRIES = [
+    "chicken, tomato, rice, onion, garlic, cheese",
+    "eggs, milk, flour",
+    "pasta, tomato, basil",
+    "chicken, vegetables, rice",
+    "Cheese, Eggs",
+    "sourdough, cheddar",
+    "tofu, quinoa, scallions",
+    "spaghetti, cherry tomatoes, garlic powder",
+    "bread, garlic, butter, parsley",
+    "milk, flour, sugar",
+    "turkey",
+]
+
+def _generate(generator, ingredients, max_recipes=3):
+    random.seed(1234)
+    return [recipe.model_dump() for recipe in generator.generate_recipes(ingredients, max_recipes=max_recipes)]
+
+def test_index_matches_full_scan():
+    """Test that index-backed candidate selection ranks exactly like a full catalog scan"""
+    indexed = SmartRecipeGenerator()
+    scanned = SmartRecipeGenerator(use_index=False)
+
+    for pantry in PANTRIES:
+        for max_recipes in (1, 3, 8):
+            assert _generate(indexed, pantry, max_recipes) == _generate(scanned, pantry, max_recipes)
+
+def test_index_covers_substitutes():
+    """Test that substitutes of primary ingredients are indexed"""
+    generator = SmartRecipeGenerator()
+
+    candidates = generator.find_candidate_templates(["spaghetti"])
+    assert [template.name for template in candidates] == ["Pasta Primavera"]
+
+    assert generator.find_candidate_templates(["milk", "flour"]) == []
+
+def test_compiled_templates_match_list_based_scoring():
+    """Test that compiled templates score and render like the list-based helpers"""
+    generator = SmartRecipeGenerator()
+    templates = list(generator.recipe_templates)
+    templates.append(RecipeTemplate(
+        name="Double Garlic Toast",
+        description="Repeated ingredients count twice",
+        primary_ingredients=["garlic", "garlic", "bread"],
+        optional_ingredients=["Garlic", "butter"],
+        cook_time="5 mins",
+        servings="1 serving",
+        difficulty="Easy",
+        instructions_template=["Toast {toppings}"],
+    ))
+    compiled_templates = [
+        CompiledTemplate(template_id, template, generator.normalize_ingredient, generator.substitution_sets)
+        for template_id, template in enumerate(templates)
+    ]
+
+    for pantry in PANTRIES + ["garlic, baguette", "Garlic Powder, Cheddar, eggs"]:
+        user_ingredients = [ing.strip() for ing in pantry.split(",")]
+        normalized_user = [generator.normalize_ingredient(ing) for ing in user_ingredients]
+
+        for compiled in compiled_templates:
+            template = compiled.template
+            all_ingredients = template.primary_ingredients + template.optional_ingredients
+            expected = (
+                generator.calculate_match_percentage(user_ingredients, all_ingredients),
+                generator.calculate_match_percentage(user_ingredients, template.primary_ingredients),
+            )
+            assert compiled.match_percentages(frozenset(normalized_user)) == expected
+
+            available = generator.find_available_ingredients(user_ingredients, all_ingredients)
+            assert compiled.find_available(user_ingredients, normalized_user) == available
+
+            available_normalized = {generator.normalize_ingredient(ing) for ing in available}
+            assert compiled.find_missing(available_normalized) == generator.generate_missing_ingredients(template, available)
+
+def test_numpy_backend_matches_python_scorer():
+    """Test that the vectorized backend ranks exactly like the pure-Python scorer"""
+    catalog = make_catalog(300, seed=7)
+    python_generator = SmartRecipeGenerator(templates=catalog)
+    numpy_generator = SmartRecipeGenerator(templates=catalog, scoring_backend="numpy")
+
+    pantries = PANTRIES + ["rice, quinoa, eggs, cheddar", "leek, kale, penne, swiss", "garlic"]
+    for pantry in pantries:
+        for max_recipes in (1, 3, 50):
+            assert _generate(numpy_generator, pantry, max_recipes) == _generate(python_generator, pantry, max_recipes)
+
+    user_sets = [frozenset(python_generator.normalize_ingredient(ing.strip()) for ing in p.split(",")) for p in pantries]
+    overall, primary = numpy_generator.vector_scorer.score_batch(user_sets, chunk_size=4)
+    for row, user_set in enumerate(user_sets):
+        for compiled in python_generator.compiled_templates:
+            expected = compiled.match_percentages(user_set)
+            assert (overall[row, compiled.template_id], primary[row, compiled.template_id]) == expected
+
+def test_top_k_matches_full_sort():
+    """Test that heap-based top-k selection equals a full stable sort, ties included"""
+    generator = SmartRecipeGenerator(templates=make_catalog(500, seed=3), use_index=False)
+
+    for pantry in PANTRIES + ["garlic", "bread, cheese", "rice, pasta"]:
+        user_set = frozenset(generator.normalize_ingredient(ing.strip()) for ing in pantry.split(","))
+        scored = []
+        for compiled in generator.compiled_templates:
+            overall_match, primary_match = compiled.match_percentages(user_set)
+            if primary_match > 0:
+                scored.append((compiled.template_id, overall_match, primary_match))
+        scored.sort(key=lambda x: (x[1], x[2]), reverse=True)
+
+        for k in (0, 1, 3, 10, 1000):
+            ranked = select_top_k(reversed(generator.compiled_templates), user_set, k)
+            assert [(c.template_id, overall, primary) for c, overall, primary in ranked] == scored[:k]
+
+def test_batch_matches_single_generation():
+    """Test that batch generation returns the same results as one call per pantry"""
+    catalog = make_catalog(200, seed=7)
+    pantries = PANTRIES + ["", "eggs, cheese", "Cheese, Eggs", "eggs, cheese"]
+
+    for kwargs in ({}, {"use_index": False}, {"scoring_backend": "numpy"}):
+        generator = SmartRecipeGenerator(templates=catalog, **kwargs)
+        random.seed(99)
+        batch = [[recipe.model_dump() for recipe in recipes] for recipes in generator.generate_recipes_batch(pantries)]
+        random.seed(99)
+        single = [[recipe.model_dump() for recipe in generator.generate_recipes(pantry)] for pantry in pantries]
+        assert batch == single
+
+def test_batch_returns_parse_errors_per_input(monkeypatch):
+    """Test that return_exceptions also isolates inputs that fail while parsing"""
+    generator = SmartRecipeGenerator(jitter_seed=3)
+    match_ingredient = generator.match_ingredient
+
+    def flaky_match(ingredient):
+        if ingredient == "durian":
+            raise ValueError("bad ingredient")
+        return match_ingredient(ingredient)
+
+    monkeypatch.setattr(generator, "match_ingredient", flaky_match)
+    pantries = ["eggs, cheese", "durian, eggs", ""]
+    batch = generator.generate_recipes_batch(pantries, return_exceptions=True)
+    assert isinstance(batch[1], ValueError)
+    assert [recipe.model_dump() for recipe in batch[0]] == [recipe.model_dump() for recipe in generator.generate_recipes("eggs, cheese")]
+    assert batch[2] == []
+    with pytest.raises(ValueError):
+        generator.generate_recipes_batch(pantries)
+
+def test_cache_with_seeded_jitter_matches_fresh_results():
+    """Test that cached responses equal fresh ones when jitter is seeded"""
+    cache = RecipeCache(max_size=2)
+    cached = SmartRecipeGenerator(cache=cache, jitter_seed=42)
+    fresh = SmartRecipeGenerator(jitter_seed=42)
+
+    first = [recipe.model_dump() for recipe in cached.generate_recipes("eggs, cheese")]
+    second = [recipe.model_dump() for recipe in cached.generate_recipes("Cheese, Eggs ")]
+    assert first == second == [recipe.model_dump() for recipe in fresh.generate_recipes("cheese, eggs")]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cached.generate_recipes("rice")
+    cached.generate_recipes("bread")
+    assert cache.stats()["evictions"] == 1
+    assert len(cache) == 2
+
+def test_cache_ttl_expires_entries():
+    """Test that entries older than the TTL count as misses"""
+    cache = RecipeCache(max_size=10, ttl=0.01)
+    cache.put("key", "value")
+    assert cache.get("key") == "value"
+    time.sleep(0.02)
+    assert cache.get("key") is None
+    assert cache.stats()["expirations"] == 1
+
+def test_instructions_match_golden_output():
+    """Test that compiled instructions render exactly like the original chained str.replace implementation"""
+    with open(GOLDEN_INSTRUCTIONS) as f:
+        golden = json.load(f)
+    generator = SmartRecipeGenerator()
+    templates = {template.name: template for template in generator.recipe_templates}
+    templates["Placeholder Edge Cases"] = RecipeTemplate(
+        name="Placeholder Edge Cases", description="", primary_ingredients=["egg"], optional_ingredients=[],
+        cook_time="", servings="", difficulty="", instructions_template=golden["edge_case_template"]
+    )
+    compiled = {name: CompiledInstructions(template.instructions_template) for name, template in templates.items()}
+
+    assert len(golden["cases"]) > 50
+    for case in golden["cases"]:
+        template = templates[case["template"]]
+        assert compiled[case["template"]].render(case["available_ingredients"]) == case["instructions"]
+        assert generator.customize_instructions(template, case["available_ingredients"]) == case["instructions"]
+
+def test_stage_observer_times_each_stage():
+    """Test that every generation stage is reported to the stage observer"""
+    stages = []
+    generator = SmartRecipeGenerator(stage_observer=lambda stage, seconds: stages.append(stage))
+    recipes = generator.generate_recipes("chicken, rice, onion", 3)
+    assert {"parse", "normalize", "candidates", "rank"} <= set(stages)
+    assert stages.count("render") == len(recipes)
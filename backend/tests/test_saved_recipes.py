@@ -0,0 +1,220 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from http_cache import ChangeCounter, etag_matches
+from saved_recipes import (
+    MATCH_SORT, SAVED_RECIPES_SORT, InvalidCursor, decode_cursor, encode_cursor, plan_summary, search_filter, search_sort
+)
+
+mongo_standin = pytest.importorskip("benchmarks.mongo_standin")
+
+def make_recipe(i, saved_at):
+    return {
+        "id": f"recipe-{i:03d}",
+        "name": f"Recipe {i}",
+        "description": "Saved for pagination tests",
+        "cook_time": "10 mins",
+        "servings": "2 servings",
+        "difficulty": "Easy",
+        "available_ingredients": ["eggs"],
+        "missing_ingredients": ["salt"],
+        "instructions": ["Cook it"],
+        "match_percentage": 70,
+        "saved_at": saved_at,
+    }
+
+@pytest.fixture
+def client(monkeypatch):
+    db = mongo_standin.AsyncDatabase(latency=0)
+    monkeypatch.setattr(server, "db", db)
+    start = datetime(2024, 1, 1, 12, 0, 0)
+    # Recipes 3 and 4 share a timestamp, so the id tiebreak is exercised
+    recipes = [make_recipe(i, start + timedelta(minutes=min(i, 3))) for i in range(7)]
+    db._database.saved_recipes.insert_many(recipes)
+    return TestClient(server.app)
+
+def test_cursor_round_trip():
+    """Test that cursors encode the keyset position and reject garbage"""
+    cursor = encode_cursor({"saved_at": datetime(2024, 1, 1, 12, 0, 0, 123000), "id": "abc"})
+    assert decode_cursor(cursor) == (datetime(2024, 1, 1, 12, 0, 0, 123000), "abc")
+
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor")
+
+def test_saved_recipes_pagination_matches_full_listing(client):
+    """Test that walking pages with limit/cursor yields the full listing in order"""
+    full = client.get("/api/saved-recipes").json()
+    assert [r["id"] for r in full] == [f"recipe-{i:03d}" for i in (6, 5, 4, 3, 2, 1, 0)]
+    assert full[0]["image_url"] == ""
+    assert "_id" not in full[0]
+
+    paged, cursor = [], None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/saved-recipes", params=params)
+        assert response.status_code == 200
+        paged.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert paged == full
+
+def test_saved_recipes_summary_view(client):
+    """Test that the summary view omits instructions and ingredient lists"""
+    recipe = client.get("/api/saved-recipes", params={"view": "summary", "limit": 1}).json()[0]
+    assert recipe["name"] == "Recipe 6"
+    assert not {"instructions", "available_ingredients", "missing_ingredients"} & recipe.keys()
+
+def test_saved_recipes_invalid_cursor(client):
+    """Test that a malformed cursor is a client error"""
+    response = client.get("/api/saved-recipes", params={"cursor": "bogus"})
+    assert response.status_code == 400
+
+def test_bulk_save_reports_duplicates(client):
+    """Test that bulk save is idempotent for client-supplied ids"""
+    server.db._database.saved_recipes.create_index("id", unique=True)
+    recipe = {key: value for key, value in make_recipe(100, None).items() if key != "saved_at"}
+    fresh = dict(recipe, id=None, name="No id")
+
+    response = client.post("/api/saved-recipes/bulk", json={"recipes": [recipe, fresh, recipe]})
+    assert response.status_code == 200
+    data = response.json()
+    assert [r["status"] for r in data["results"]] == ["saved", "saved", "duplicate"]
+    assert data["counts"] == {"saved": 2, "duplicate": 1}
+
+    retry = client.post("/api/saved-recipes/bulk", json={"recipes": [recipe]}).json()
+    assert retry["results"] == [{"id": "recipe-100", "status": "duplicate", "error": None}]
+
+def test_bulk_delete_reports_not_found(client):
+    """Test that bulk delete reports deleted and missing ids once each"""
+    response = client.request("DELETE", "/api/saved-recipes/bulk",
+                              json={"ids": ["recipe-001", "missing", "recipe-002", "recipe-001"]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [(r["id"], r["status"]) for r in results] == [
+        ("recipe-001", "deleted"), ("missing", "not_found"), ("recipe-002", "deleted")
+    ]
+    assert len(client.get("/api/saved-recipes").json()) == 5
+
+def test_bulk_delete_reports_errors_per_id(client, monkeypatch):
+    """Test that a failed delete only marks its own id as an error"""
+    collection = server.db._database.saved_recipes
+    delete_one = collection.delete_one
+
+    def flaky_delete_one(query, *args, **kwargs):
+        if query == {"id": "recipe-002"}:
+            raise RuntimeError("connection reset")
+        return delete_one(query, *args, **kwargs)
+
+    monkeypatch.setattr(collection, "delete_one", flaky_delete_one)
+    response = client.request("DELETE", "/api/saved-recipes/bulk", json={"ids": ["recipe-001", "recipe-002", "missing"]})
+    assert [(r["id"], r["status"]) for r in response.json()["results"]] == [
+        ("recipe-001", "deleted"), ("recipe-002", "error"), ("missing", "not_found")
+    ]
+    assert len(client.get("/api/saved-recipes").json()) == 6
+
+def test_search_query_building():
+    """Test that search filters and sorts map onto Mongo operators"""
+    assert search_filter() == {}
+    assert search_filter("soup", ["eggs", "milk"], ["salt"], "Easy", 60) == {
+        "$text": {"$search": "soup"},
+        "available_ingredients": {"$all": ["eggs", "milk"]},
+        "missing_ingredients": {"$all": ["salt"]},
+        "difficulty": "Easy",
+        "match_percentage": {"$gte": 60},
+    }
+    assert search_sort(None, "soup")[0] == ("score", {"$meta": "textScore"})
+    assert search_sort(None, None) == SAVED_RECIPES_SORT
+    assert search_sort("match", "soup") == MATCH_SORT
+    with pytest.raises(ValueError):
+        search_sort("relevance", None)
+
+def test_plan_summary_flags_scans_and_sorts():
+    """Test that explain output is reduced to stages, indexes and scan/sort flags"""
+    explain = {"queryPlanner": {"winningPlan": {
+        "stage": "SORT",
+        "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "match_percentage_-1_saved_at_-1_id_-1"}},
+    }}}
+    assert plan_summary(explain) == {
+        "stages": ["SORT", "FETCH", "IXSCAN"],
+        "indexes": ["match_percentage_-1_saved_at_-1_id_-1"],
+        "collection_scan": False,
+        "blocking_sort": True,
+    }
+    sbe = {"queryPlanner": {"winningPlan": {"queryPlan": {"stage": "COLLSCAN"}}}}
+    assert plan_summary(sbe)["collection_scan"]
+
+def test_search_saved_recipes_filters_in_the_database(client, monkeypatch):
+    """Test ingredient, difficulty and match filters and the match sort"""
+    extra = [
+        dict(make_recipe(10, datetime(2024, 2, 1)), available_ingredients=["eggs", "milk"], match_percentage=90),
+        dict(make_recipe(11, datetime(2024, 2, 2)), difficulty="Hard", match_percentage=85),
+    ]
+    server.db._database.saved_recipes.insert_many(extra)
+
+    response = client.get("/api/saved-recipes/search", params={"available": ["eggs", "milk"]})
+    assert response.status_code == 200
+    assert [r["id"] for r in response.json()] == ["recipe-010"]
+
+    ids = [r["id"] for r in client.get("/api/saved-recipes/search", params={"min_match": 80, "sort": "match"}).json()]
+    assert ids == ["recipe-010", "recipe-011"]
+    assert [r["id"] for r in client.get("/api/saved-recipes/search", params={"difficulty": "Hard"}).json()] == ["recipe-011"]
+
+    newest = client.get("/api/saved-recipes/search", params={"limit": 3, "view": "summary"}).json()
+    assert [r["id"] for r in newest] == ["recipe-011", "recipe-010", "recipe-006"]
+    assert "instructions" not in newest[0]
+
+    assert client.get("/api/saved-recipes/search", params={"sort": "relevance"}).status_code == 400
+    assert client.get("/api/saved-recipes/search", params={"min_match": 101}).status_code == 422
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.get("/api/admin/saved-recipes/search/explain").status_code == 403
+
+def test_saved_recipes_conditional_requests(client, monkeypatch):
+    """Test that listings and searches revalidate with 304 until a write bumps the change counter"""
+    monkeypatch.setattr(server, "saved_recipes_version", ChangeCounter(lambda: server.db.collection_versions, "saved_recipes", ttl=60))
+    first = client.get("/api/saved-recipes", params={"limit": 3})
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    search = client.get("/api/saved-recipes/search", params={"available": "eggs"})
+    assert search.headers["ETag"] not in (etag, client.get("/api/saved-recipes", params={"limit": 4}).headers["ETag"])
+
+    # Within the counter's TTL a revalidation reads nothing from Mongo
+    db = server.db
+    monkeypatch.setattr(server, "db", None)
+    for path, params, tag in (("/api/saved-recipes", {"limit": 3}, etag), ("/api/saved-recipes/search", {"available": "eggs"}, search.headers["ETag"])):
+        response = client.get(path, params=params, headers={"If-None-Match": tag})
+        assert response.status_code == 304 and response.content == b""
+    monkeypatch.setattr(server, "db", db)
+
+    recipe = {key: value for key, value in make_recipe(99, None).items() if key not in ("id", "saved_at")}
+    assert client.post("/api/save-recipe", json=recipe).status_code == 200
+    response = client.get("/api/saved-recipes", params={"limit": 3}, headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["ETag"] != etag
+
+    etag = response.headers["ETag"]
+    assert client.delete("/api/saved-recipes/recipe-000").status_code == 200
+    assert client.get("/api/saved-recipes", params={"limit": 3}, headers={"If-None-Match": etag}).status_code == 200
+
+def test_change_counter_is_shared_through_mongo():
+    """Test that a counter sees another process's bump once its cached value expires"""
+    db = mongo_standin.AsyncDatabase(latency=0)
+    ours = ChangeCounter(lambda: db.collection_versions, "saved_recipes", ttl=0)
+    theirs = ChangeCounter(lambda: db.collection_versions, "saved_recipes", ttl=60)
+
+    async def scenario():
+        assert await ours.current() == 0 and await theirs.current() == 0
+        assert await ours.bump() == 1
+        assert await ours.current() == 1
+        assert await theirs.current() == 0
+        theirs.ttl = 0
+        assert await theirs.current() == 1
+
+    asyncio.run(scenario())
+    assert etag_matches('W/"a", "b"', '"a"') and not etag_matches('"a"', '"b"') and not etag_matches(None, '"a"')
+    assert etag_matches("*", '"a"') and etag_matches("*", '"a"', "HEAD") and not etag_matches("*", '"a"', "POST")
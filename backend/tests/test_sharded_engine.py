@@ -0,0 +1,71 @@
+import pytest
+
+from benchmarks.bench_catalog_startup import compile_synthetic
+from benchmarks.synthetic import make_pantries
+from popularity import PopularityTable
+from catalog_updates import CatalogChanges
+from recipe_generator import SmartRecipeGenerator, UnsupportedCatalogUpdate
+from sharded_engine import ShardedRecipeEngine
+
+PANTRIES = make_pantries(25, seed=5) + ["chiken, tomatoe, basmati rice", "scallions, eggs", " "]
+
+def dump(recipes):
+    return [recipe.model_dump() for recipe in recipes]
+
+@pytest.fixture(scope="module")
+def synthetic_catalog(tmp_path_factory):
+    path = tmp_path_factory.mktemp("catalog") / "synthetic.shelfcat"
+    compile_synthetic(3001, path)
+    return str(path)
+
+@pytest.mark.parametrize("shards", [1, 4])
+def test_sharded_results_match_single_process(synthetic_catalog, shards):
+    """Test that merged shard results are identical to one generator over the whole catalog"""
+    expected = SmartRecipeGenerator(catalog_path=synthetic_catalog, jitter_seed=11)
+    engine = ShardedRecipeEngine(shards, catalog_path=synthetic_catalog, jitter_seed=11)
+    try:
+        for pantry in PANTRIES:
+            for k in (3, 10):
+                assert dump(engine.generate_recipes(pantry, k)) == dump(expected.generate_recipes(pantry, k))
+            assert dump(engine.find_cookable(pantry, 2, 20)) == dump(expected.find_cookable(pantry, 2, 20))
+        batch = engine.generate_recipes_batch(PANTRIES, 3)
+        assert [dump(recipes) for recipes in batch] == [dump(recipes) for recipes in expected.generate_recipes_batch(PANTRIES, 3)]
+        assert engine.catalog_info() == expected.catalog_info()
+        with pytest.raises(UnsupportedCatalogUpdate):
+            engine.apply_changes(CatalogChanges(removed=["Anything"]))
+    finally:
+        engine.shutdown()
+
+def test_sharded_popularity_matches_single_process(synthetic_catalog, tmp_path):
+    """Test that shards rank with the popularity table exactly like one generator"""
+    expected = SmartRecipeGenerator(catalog_path=synthetic_catalog, jitter_seed=11)
+    names = expected.recipe_templates.names()
+    table = PopularityTable({name: (i * 37) % 256 for i, name in enumerate(names) if i % 3})
+    path = str(table.write(tmp_path / "popularity.bin"))
+    expected = SmartRecipeGenerator(catalog_path=synthetic_catalog, jitter_seed=11, popularity=table, popularity_boost=8)
+    engine = ShardedRecipeEngine(3, catalog_path=synthetic_catalog, jitter_seed=11, popularity_path=path, popularity_boost=8)
+    try:
+        for pantry in PANTRIES:
+            assert dump(engine.generate_recipes(pantry, 10)) == dump(expected.generate_recipes(pantry, 10))
+        batch = engine.generate_recipes_batch(PANTRIES, 3)
+        assert [dump(recipes) for recipes in batch] == [dump(recipes) for recipes in expected.generate_recipes_batch(PANTRIES, 3)]
+    finally:
+        engine.shutdown()
+
+def test_from_env_matches_generator_from_env(synthetic_catalog, tmp_path, monkeypatch):
+    """Test that the engine and the generator read the same RECIPE_* settings"""
+    names = SmartRecipeGenerator(catalog_path=synthetic_catalog).recipe_templates.names()
+    table = PopularityTable({name: i % 256 for i, name in enumerate(names) if i % 2})
+    monkeypatch.setenv("RECIPE_CATALOG", synthetic_catalog)
+    monkeypatch.setenv("RECIPE_JITTER_SEED", "7")
+    monkeypatch.setenv("RECIPE_POPULARITY", str(table.write(tmp_path / "popularity.bin")))
+    monkeypatch.setenv("RECIPE_POPULARITY_BOOST", "6")
+    monkeypatch.setenv("RECIPE_SHARDS", "2")
+    expected = SmartRecipeGenerator.from_env()
+    engine = ShardedRecipeEngine.from_env()
+    try:
+        assert engine.catalog_info() == expected.catalog_info()
+        for pantry in PANTRIES:
+            assert dump(engine.generate_recipes(pantry, 5)) == dump(expected.generate_recipes(pantry, 5))
+    finally:
+        engine.shutdown()
@@ -0,0 +1,114 @@
+"""
+Vectorized scoring backend - scores the whole template catalog with sparse NumPy products
+"""
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+class VectorScorer:
+    """Sparse ingredient-by-template encoding of a compiled catalog.
+
+    Every normalized recipe ingredient is a slot. Each query token (an ingredient or
+    one of its substitutes) is a column covering one or more slots, so a query
+    vector expands to a boolean slot vector with one product. Template match
+    counts are then a weighted sparse product of the template-by-slot matrix with
+    that vector, done for all templates (or all queries of a batch) at once.
+    """
+
+    def __init__(self, compiled_templates: Sequence):
+        slot_ids: Dict[str, int] = {}
+        for compiled in compiled_templates:
+            for normalized in compiled.ingredient_counts:
+                slot_ids.setdefault(normalized, len(slot_ids))
+        self.num_slots = len(slot_ids)
+        self.num_templates = len(compiled_templates)
+
+        # Column (query token) -> covered slots, substitutes folded in as extra columns
+        covers: Dict[str, List[int]] = {}
+        for compiled in compiled_templates:
+            for normalized in compiled.ingredient_counts:
+                covers.setdefault(normalized, [])
+                for sub in compiled.substitutes.get(normalized, ()):
+                    covers.setdefault(sub, [])
+        for normalized, slot in slot_ids.items():
+            covers[normalized].append(slot)
+        for compiled in compiled_templates:
+            for normalized, subs in compiled.substitutes.items():
+                for sub in subs:
+                    covers[sub].append(slot_ids[normalized])
+
+        self.column_ids: Dict[str, int] = {}
+        column_slots = []
+        for column, (token, slots) in enumerate(covers.items()):
+            self.column_ids[token] = column
+            column_slots.append(np.unique(np.asarray(slots, dtype=np.int64)))
+        self.column_indptr = np.zeros(len(column_slots) + 1, dtype=np.int64)
+        self.column_indptr[1:] = np.cumsum([len(slots) for slots in column_slots])
+        self.column_slots = np.concatenate(column_slots) if column_slots else np.zeros(0, dtype=np.int64)
+
+        # Template-by-slot matrices in CSR form, weighted by ingredient multiplicity
+        self.all_matrix = self._build_matrix(compiled_templates, slot_ids, "ingredient_counts")
+        self.primary_matrix = self._build_matrix(compiled_templates, slot_ids, "primary_counts")
+        self.total_sizes = np.asarray([c.total_size for c in compiled_templates], dtype=np.float64)
+        self.primary_sizes = np.asarray([c.primary_size for c in compiled_templates], dtype=np.float64)
+
+    def _build_matrix(self, compiled_templates: Sequence, slot_ids: Dict[str, int], counts_attr: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (indptr, slot indices, weights) for one template-by-slot matrix"""
+        indptr = [0]
+        indices: List[int] = []
+        weights: List[int] = []
+        for compiled in compiled_templates:
+            for normalized, count in getattr(compiled, counts_attr).items():
+                indices.append(slot_ids[normalized])
+                weights.append(count)
+            indptr.append(len(indices))
+        return (
+            np.asarray(indptr, dtype=np.int64),
+            np.asarray(indices, dtype=np.int64),
+            np.asarray(weights, dtype=np.float64)
+        )
+
+    def slot_hits(self, user_sets: Sequence[frozenset]) -> np.ndarray:
+        """Expand query tokens into a (queries x slots) boolean matrix of covered slots"""
+        hits = np.zeros((len(user_sets), self.num_slots), dtype=bool)
+        for row, user_set in enumerate(user_sets):
+            for token in user_set:
+                column = self.column_ids.get(token)
+                if column is not None:
+                    start, end = self.column_indptr[column], self.column_indptr[column + 1]
+                    hits[row, self.column_slots[start:end]] = True
+        return hits
+
+    @staticmethod
+    def _multiply(matrix: Tuple[np.ndarray, np.ndarray, np.ndarray], hits: np.ndarray) -> np.ndarray:
+        """Sparse (templates x slots) @ (slots x queries), returned as (queries x templates) counts"""
+        indptr, indices, weights = matrix
+        # Prefix sums over the non-zeros let empty rows fall out as zero-width segments
+        products = np.zeros((hits.shape[0], len(indices) + 1), dtype=np.float64)
+        np.cumsum(hits[:, indices] * weights, axis=1, out=products[:, 1:])
+        return products[:, indptr[1:]] - products[:, indptr[:-1]]
+
+    @staticmethod
+    def _percentages(matches: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+        """Mirror min(100, int((matches / size) * 100)), with 100 for empty ingredient lists"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percentages = np.floor((matches / sizes) * 100)
+        percentages = np.where(sizes > 0, np.minimum(percentages, 100), 100)
+        return percentages.astype(np.int64)
+
+    def score_batch(self, user_sets: Sequence[frozenset], chunk_size: int = 32) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (overall_match, primary_match) arrays of shape (queries x templates)"""
+        overall = np.empty((len(user_sets), self.num_templates), dtype=np.int64)
+        primary = np.empty((len(user_sets), self.num_templates), dtype=np.int64)
+        # Chunking bounds the (queries x non-zeros) intermediate for large batches
+        for start in range(0, len(user_sets), chunk_size):
+            end = start + chunk_size
+            hits = self.slot_hits(user_sets[start:end])
+            overall[start:end] = self._percentages(self._multiply(self.all_matrix, hits), self.total_sizes)
+            primary[start:end] = self._percentages(self._multiply(self.primary_matrix, hits), self.primary_sizes)
+        return overall, primary
+
+    def score(self, user_set: frozenset) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (overall_match, primary_match) arrays over all templates for one query"""
+        overall, primary = self.score_batch([user_set])
+        return overall[0], primary[0]
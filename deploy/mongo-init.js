@@ -8,14 +8,25 @@ db.createCollection('recipe_analytics');
 // Create indexes for better performance
 db.saved_recipes.createIndex({ "id": 1 }, { unique: true });
 db.saved_recipes.createIndex({ "saved_at": -1 });
+db.saved_recipes.createIndex({ "saved_at": -1, "id": -1 });
 db.saved_recipes.createIndex({ "name": "text", "description": "text" });
 db.saved_recipes.createIndex({ "match_percentage": -1 });
+// Saved-recipe search (GET /api/saved-recipes/search); the server also creates these at startup
+db.saved_recipes.createIndex({ "match_percentage": -1, "saved_at": -1, "id": -1 });
+db.saved_recipes.createIndex({ "difficulty": 1, "saved_at": -1, "id": -1 });
+db.saved_recipes.createIndex({ "available_ingredients": 1, "saved_at": -1 });
+db.saved_recipes.createIndex({ "missing_ingredients": 1, "saved_at": -1 });
 
 // Create analytics collection indexes
 db.recipe_analytics.createIndex({ "timestamp": -1 });
 db.recipe_analytics.createIndex({ "recipe_id": 1 });
 db.recipe_analytics.createIndex({ "user_id": 1 });
 
+// Daily per-ingredient query and save counts, maintained by the server's analytics flusher
+db.createCollection('ingredient_rollups');
+db.ingredient_rollups.createIndex({ "day": -1, "queries": -1 });
+db.ingredient_rollups.createIndex({ "ingredient": 1, "day": -1 });
+
 // Insert sample data (optional)
 db.saved_recipes.insertMany([
     {
@@ -35,6 +46,6 @@ db.saved_recipes.insertMany([
 ]);
 
 print("Database initialized successfully!");
-print("Collections created: saved_recipes, recipe_analytics");
+print("Collections created: saved_recipes, recipe_analytics, ingredient_rollups");
 print("Indexes created for optimal performance");
 print("Sample data inserted");
\ No newline at end of file